@@ -0,0 +1,50 @@
+"""add reservation_nights fact table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 宿泊日ファクトテーブル作成
+    op.create_table(
+        'reservation_nights',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('reservation_id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=True),
+        sa.Column('stay_date', sa.Date(), nullable=False),
+        sa.Column('ota_name', sa.String(100), nullable=True),
+        sa.Column('ota_type', sa.String(50), nullable=True),
+        sa.Column('num_adults', sa.Integer(), nullable=True),
+        sa.Column('num_children', sa.Integer(), nullable=True),
+        sa.Column('num_infants', sa.Integer(), nullable=True),
+        sa.Column('revenue', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('reservation_id', 'stay_date', name='_reservation_night_uc')
+    )
+    op.create_index(op.f('ix_reservation_nights_id'), 'reservation_nights', ['id'], unique=False)
+    op.create_index(op.f('ix_reservation_nights_reservation_id'), 'reservation_nights', ['reservation_id'], unique=False)
+    op.create_index('ix_reservation_nights_facility_stay_date', 'reservation_nights', ['facility_id', 'stay_date'], unique=False)
+    op.create_index('ix_reservation_nights_stay_date', 'reservation_nights', ['stay_date'], unique=False)
+    
+    # 既存予約からの初期データは按分カラムがそろう 009 で投入する
+
+
+def downgrade():
+    op.drop_index('ix_reservation_nights_stay_date', table_name='reservation_nights')
+    op.drop_index('ix_reservation_nights_facility_stay_date', table_name='reservation_nights')
+    op.drop_index(op.f('ix_reservation_nights_reservation_id'), table_name='reservation_nights')
+    op.drop_index(op.f('ix_reservation_nights_id'), table_name='reservation_nights')
+    op.drop_table('reservation_nights')
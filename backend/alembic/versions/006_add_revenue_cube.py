@@ -0,0 +1,45 @@
+"""add revenue_cube rollup table
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # OTA×施設×月の売上集計テーブル作成
+    op.create_table(
+        'revenue_cube',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('year_month', sa.String(7), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=True),
+        sa.Column('ota_type', sa.String(50), nullable=True),
+        sa.Column('ota_name', sa.String(100), nullable=True),
+        sa.Column('reservations', sa.Integer(), nullable=True),
+        sa.Column('nights', sa.Integer(), nullable=True),
+        sa.Column('revenue', sa.Float(), nullable=True),
+        sa.Column('guests', sa.Integer(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=True),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('year_month', 'facility_id', 'ota_type', 'ota_name', name='_revenue_cube_uc')
+    )
+    op.create_index(op.f('ix_revenue_cube_id'), 'revenue_cube', ['id'], unique=False)
+    op.create_index('ix_revenue_cube_year_month', 'revenue_cube', ['year_month'], unique=False)
+    
+    # 宿泊日テーブルからの初期データは 009 で投入する
+
+
+def downgrade():
+    op.drop_index('ix_revenue_cube_year_month', table_name='revenue_cube')
+    op.drop_index(op.f('ix_revenue_cube_id'), table_name='revenue_cube')
+    op.drop_table('revenue_cube')
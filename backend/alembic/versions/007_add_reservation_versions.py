@@ -0,0 +1,125 @@
+"""add reservation_versions history table
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import date, datetime
+import hashlib
+import json
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# 履歴に含めない予約テーブルのカラム（変更検知の対象外）
+METADATA_COLUMNS = ("id", "created_at", "updated_at", "sync_id")
+
+# 履歴テーブルに個別カラムとして複製する項目
+INDEXED_COLUMNS = [
+    "reservation_id", "reservation_type", "ota_name", "ota_type", "facility_id", "room_type",
+    "check_in_date", "check_out_date", "guest_name",
+    "num_adults", "num_children", "num_infants", "total_amount"
+]
+
+# 一度に挿入する行数
+INSERT_BATCH_SIZE = 1000
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _content_json(content):
+    return json.dumps(content, ensure_ascii=False, sort_keys=True, default=_json_default)
+
+
+def _initialize_versions(bind):
+    """既存予約の初期履歴を作成（有効開始は最終更新日時）
+
+    予約テーブルはこのリビジョン時点のカラムを読み込んで使い、
+    内容のハッシュはアプリケーションの変更検知と同じ形式で作る。
+    """
+    reservations = sa.Table('reservations', sa.MetaData(), autoload_with=bind)
+    versions = sa.table(
+        'reservation_versions',
+        sa.column('reservation_pk', sa.Integer()),
+        sa.column('valid_from', sa.DateTime()),
+        sa.column('valid_to', sa.DateTime()),
+        sa.column('content_hash', sa.String()),
+        sa.column('sync_id', sa.Integer()),
+        sa.column('data', sa.Text()),
+        *[sa.column(name, reservations.c[name].type) for name in INDEXED_COLUMNS]
+    )
+    content_columns = [c.name for c in reservations.columns if c.name not in METADATA_COLUMNS]
+
+    rows = []
+    for row in bind.execute(sa.select(reservations)).mappings():
+        content = {name: row[name] for name in content_columns}
+        data = _content_json(content)
+        rows.append({
+            "reservation_pk": row["id"],
+            "valid_from": row["updated_at"] or row["created_at"] or datetime.utcnow(),
+            "valid_to": None,
+            "content_hash": hashlib.sha256(data.encode("utf-8")).hexdigest(),
+            "sync_id": row["sync_id"],
+            **{name: content[name] for name in INDEXED_COLUMNS},
+            "data": _content_json({**content, "created_at": row["created_at"]})
+        })
+        if len(rows) >= INSERT_BATCH_SIZE:
+            bind.execute(versions.insert(), rows)
+            rows = []
+    if rows:
+        bind.execute(versions.insert(), rows)
+
+
+def upgrade():
+    # 予約履歴テーブル作成
+    op.create_table(
+        'reservation_versions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('reservation_pk', sa.Integer(), nullable=False),
+        sa.Column('valid_from', sa.DateTime(), nullable=False),
+        sa.Column('valid_to', sa.DateTime(), nullable=True),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('sync_id', sa.Integer(), nullable=True),
+        sa.Column('reservation_id', sa.String(50), nullable=True),
+        sa.Column('reservation_type', sa.String(20), nullable=True),
+        sa.Column('ota_name', sa.String(100), nullable=True),
+        sa.Column('ota_type', sa.String(50), nullable=True),
+        sa.Column('facility_id', sa.Integer(), nullable=True),
+        sa.Column('room_type', sa.String(100), nullable=True),
+        sa.Column('check_in_date', sa.Date(), nullable=True),
+        sa.Column('check_out_date', sa.Date(), nullable=True),
+        sa.Column('guest_name', sa.String(100), nullable=True),
+        sa.Column('num_adults', sa.Integer(), nullable=True),
+        sa.Column('num_children', sa.Integer(), nullable=True),
+        sa.Column('num_infants', sa.Integer(), nullable=True),
+        sa.Column('total_amount', sa.Float(), nullable=True),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(['sync_id'], ['sync_logs.id'], ),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_reservation_versions_id'), 'reservation_versions', ['id'], unique=False)
+    op.create_index('ix_reservation_versions_current', 'reservation_versions', ['reservation_pk', 'valid_to'], unique=False)
+    op.create_index('ix_reservation_versions_validity', 'reservation_versions', ['valid_from', 'valid_to'], unique=False)
+    op.create_index('ix_reservation_versions_stay', 'reservation_versions', ['check_in_date', 'check_out_date'], unique=False)
+    
+    # 既存予約の初期履歴を作成
+    _initialize_versions(op.get_bind())
+
+
+def downgrade():
+    op.drop_index('ix_reservation_versions_stay', table_name='reservation_versions')
+    op.drop_index('ix_reservation_versions_validity', table_name='reservation_versions')
+    op.drop_index('ix_reservation_versions_current', table_name='reservation_versions')
+    op.drop_index(op.f('ix_reservation_versions_id'), table_name='reservation_versions')
+    op.drop_table('reservation_versions')
@@ -0,0 +1,47 @@
+"""add booking_issues table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 予約の重複・孤立泊の検出結果テーブル作成
+    op.create_table(
+        'booking_issues',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('issue_type', sa.String(20), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.Column('reservation_id', sa.Integer(), nullable=False),
+        sa.Column('other_reservation_id', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('nights', sa.Integer(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=True),
+        sa.Column('sync_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+        sa.ForeignKeyConstraint(['reservation_id'], ['reservations.id'], ),
+        sa.ForeignKeyConstraint(['other_reservation_id'], ['reservations.id'], ),
+        sa.ForeignKeyConstraint(['sync_id'], ['sync_logs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_booking_issues_id'), 'booking_issues', ['id'], unique=False)
+    op.create_index('ix_booking_issues_type_start', 'booking_issues', ['issue_type', 'start_date'], unique=False)
+    op.create_index('ix_booking_issues_facility', 'booking_issues', ['facility_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_booking_issues_facility', table_name='booking_issues')
+    op.drop_index('ix_booking_issues_type_start', table_name='booking_issues')
+    op.drop_index(op.f('ix_booking_issues_id'), table_name='booking_issues')
+    op.drop_table('booking_issues')
@@ -0,0 +1,151 @@
+"""add option/point allocation columns to reservation_nights
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from datetime import timedelta
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+CANCELLED_TYPE = "キャンセル"
+
+# 一度に挿入する行数
+INSERT_BATCH_SIZE = 5000
+
+# このリビジョン時点のテーブル定義（アプリケーションのモデルに依存しない）
+reservations = sa.table(
+    'reservations',
+    sa.column('id', sa.Integer()),
+    sa.column('facility_id', sa.Integer()),
+    sa.column('reservation_type', sa.String()),
+    sa.column('check_in_date', sa.Date()),
+    sa.column('check_out_date', sa.Date()),
+    sa.column('ota_name', sa.String()),
+    sa.column('ota_type', sa.String()),
+    sa.column('num_adults', sa.Integer()),
+    sa.column('num_children', sa.Integer()),
+    sa.column('num_infants', sa.Integer()),
+    sa.column('total_amount', sa.Float()),
+    sa.column('option_amount', sa.Float()),
+    sa.column('point_amount', sa.Float())
+)
+
+reservation_nights = sa.table(
+    'reservation_nights',
+    sa.column('reservation_id', sa.Integer()),
+    sa.column('facility_id', sa.Integer()),
+    sa.column('stay_date', sa.Date()),
+    sa.column('ota_name', sa.String()),
+    sa.column('ota_type', sa.String()),
+    sa.column('num_adults', sa.Integer()),
+    sa.column('num_children', sa.Integer()),
+    sa.column('num_infants', sa.Integer()),
+    sa.column('revenue', sa.Float()),
+    sa.column('option_amount', sa.Float()),
+    sa.column('point_amount', sa.Float())
+)
+
+revenue_cube = sa.table(
+    'revenue_cube',
+    sa.column('year_month', sa.String()),
+    sa.column('facility_id', sa.Integer()),
+    sa.column('ota_type', sa.String()),
+    sa.column('ota_name', sa.String()),
+    sa.column('reservations', sa.Integer()),
+    sa.column('nights', sa.Integer()),
+    sa.column('revenue', sa.Float()),
+    sa.column('guests', sa.Integer())
+)
+
+
+def _insert(bind, table, rows):
+    for i in range(0, len(rows), INSERT_BATCH_SIZE):
+        bind.execute(table.insert(), rows[i:i + INSERT_BATCH_SIZE])
+
+
+def _backfill(bind):
+    """既存予約から宿泊日テーブルと集計テーブルを作り直す
+
+    宿泊日ごとに売上・オプション・ポイントを泊数で均等に按分し（キャンセル・日付不正の予約は除く）、
+    (宿泊月, 施設, OTA種別, OTA名) ごとに予約数・延べ宿泊数・売上・宿泊者数を集計する。
+    """
+    bind.execute(reservation_nights.delete())
+    bind.execute(revenue_cube.delete())
+
+    night_rows = []
+    cube = {}
+    for r in bind.execute(sa.select(reservations)).all():
+        if r.reservation_type == CANCELLED_TYPE or not r.check_in_date or not r.check_out_date:
+            continue
+        nights = (r.check_out_date - r.check_in_date).days
+        if nights <= 0:
+            continue
+
+        revenue = (r.total_amount or 0) / nights
+        option_amount = (r.option_amount or 0) / nights
+        point_amount = (r.point_amount or 0) / nights
+        guests = (r.num_adults or 0) + (r.num_children or 0) + (r.num_infants or 0)
+
+        months = set()
+        for offset in range(nights):
+            stay_date = r.check_in_date + timedelta(days=offset)
+            night_rows.append({
+                "reservation_id": r.id,
+                "facility_id": r.facility_id,
+                "stay_date": stay_date,
+                "ota_name": r.ota_name,
+                "ota_type": r.ota_type,
+                "num_adults": r.num_adults or 0,
+                "num_children": r.num_children or 0,
+                "num_infants": r.num_infants or 0,
+                "revenue": revenue,
+                "option_amount": option_amount,
+                "point_amount": point_amount
+            })
+
+            year_month = f"{stay_date.year:04d}-{stay_date.month:02d}"
+            totals = cube.setdefault(
+                (year_month, r.facility_id, r.ota_type, r.ota_name),
+                {"reservations": 0, "nights": 0, "revenue": 0.0, "guests": 0}
+            )
+            # 予約数・宿泊者数は月ごとに予約1件につき1回だけ数える
+            if year_month not in months:
+                months.add(year_month)
+                totals["reservations"] += 1
+                totals["guests"] += guests
+            totals["nights"] += 1
+            totals["revenue"] += revenue
+
+    _insert(bind, reservation_nights, night_rows)
+    _insert(bind, revenue_cube, [
+        {
+            "year_month": year_month,
+            "facility_id": facility_id,
+            "ota_type": ota_type,
+            "ota_name": ota_name,
+            **totals
+        }
+        for (year_month, facility_id, ota_type, ota_name), totals in cube.items()
+    ])
+
+
+def upgrade():
+    # 1泊あたりに按分したオプション・ポイント額
+    op.add_column('reservation_nights', sa.Column('option_amount', sa.Float(), nullable=True))
+    op.add_column('reservation_nights', sa.Column('point_amount', sa.Float(), nullable=True))
+
+    # 按分し直した宿泊日行と、それを元にした集計テーブルを作り直す
+    _backfill(op.get_bind())
+
+
+def downgrade():
+    op.drop_column('reservation_nights', 'point_amount')
+    op.drop_column('reservation_nights', 'option_amount')
@@ -0,0 +1,114 @@
+"""add staff_facilities / group_facilities tables
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-18 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+# 旧形式（JSON配列カラム）の対応可能施設 → 対応可能施設テーブル
+LEGACY_FACILITY_COLUMNS = (
+    ('cleaning_staff', 'staff_facilities', 'staff_id'),
+    ('cleaning_staff_groups', 'group_facilities', 'group_id')
+)
+
+
+def _copy_legacy_facility_links(bind):
+    """available_facilities（JSON配列）の内容を対応可能施設テーブルに移す
+
+    存在しない施設のID・数値でない要素は除外する。
+    """
+    facility_ids = {row[0] for row in bind.execute(sa.text("SELECT id FROM facilities")).all()}
+
+    for table_name, link_table, owner_column in LEGACY_FACILITY_COLUMNS:
+        rows = []
+        for owner_id, value in bind.execute(
+            sa.text(f"SELECT id, available_facilities FROM {table_name}")
+        ).all():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    value = None
+            if not isinstance(value, list):
+                continue
+            for facility_id in dict.fromkeys(value):
+                try:
+                    facility_id = int(facility_id)
+                except (TypeError, ValueError):
+                    continue
+                if facility_id in facility_ids:
+                    rows.append({owner_column: owner_id, 'facility_id': facility_id})
+        if rows:
+            table = sa.table(link_table, sa.column(owner_column, sa.Integer()), sa.column('facility_id', sa.Integer()))
+            bind.execute(table.insert(), rows)
+
+
+def upgrade():
+    # スタッフ対応可能施設テーブル
+    op.create_table(
+        'staff_facilities',
+        sa.Column('staff_id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['staff_id'], ['cleaning_staff.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('staff_id', 'facility_id')
+    )
+    op.create_index(op.f('ix_staff_facilities_facility_id'), 'staff_facilities', ['facility_id'], unique=False)
+    
+    # スタッフグループ対応可能施設テーブル
+    op.create_table(
+        'group_facilities',
+        sa.Column('group_id', sa.Integer(), nullable=False),
+        sa.Column('facility_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['group_id'], ['cleaning_staff_groups.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('group_id', 'facility_id')
+    )
+    op.create_index(op.f('ix_group_facilities_facility_id'), 'group_facilities', ['facility_id'], unique=False)
+    
+    # JSON配列カラムの内容を移してから削除（SQLiteのバッチモード使用）
+    _copy_legacy_facility_links(op.get_bind())
+    
+    with op.batch_alter_table('cleaning_staff') as batch_op:
+        batch_op.drop_column('available_facilities')
+    with op.batch_alter_table('cleaning_staff_groups') as batch_op:
+        batch_op.drop_column('available_facilities')
+
+
+def downgrade():
+    with op.batch_alter_table('cleaning_staff') as batch_op:
+        batch_op.add_column(sa.Column('available_facilities', sa.JSON(), nullable=True))
+    with op.batch_alter_table('cleaning_staff_groups') as batch_op:
+        batch_op.add_column(sa.Column('available_facilities', sa.JSON(), nullable=True))
+    
+    # 対応可能施設テーブルの内容をJSON配列に戻す
+    bind = op.get_bind()
+    for table_name, link_table, owner_column in (
+        ('cleaning_staff', 'staff_facilities', 'staff_id'),
+        ('cleaning_staff_groups', 'group_facilities', 'group_id')
+    ):
+        facilities = {}
+        for owner_id, facility_id in bind.execute(
+            sa.text(f"SELECT {owner_column}, facility_id FROM {link_table} ORDER BY {owner_column}, facility_id")
+        ).all():
+            facilities.setdefault(owner_id, []).append(facility_id)
+        table = sa.table(table_name, sa.column('id', sa.Integer()), sa.column('available_facilities', sa.JSON()))
+        for owner_id, facility_ids in facilities.items():
+            bind.execute(
+                table.update().where(table.c.id == owner_id).values(available_facilities=facility_ids)
+            )
+    
+    op.drop_index(op.f('ix_group_facilities_facility_id'), table_name='group_facilities')
+    op.drop_table('group_facilities')
+    op.drop_index(op.f('ix_staff_facilities_facility_id'), table_name='staff_facilities')
+    op.drop_table('staff_facilities')
@@ -0,0 +1,36 @@
+"""add cleaning_sync_state table and reservations.updated_at index
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 01:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 清掃タスク同期の処理済み位置テーブル作成
+    op.create_table(
+        'cleaning_sync_state',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('last_reservation_updated_at', sa.DateTime(), nullable=True),
+        sa.Column('last_sync_id', sa.Integer(), nullable=True),
+        sa.Column('last_run_at', sa.DateTime(), nullable=True),
+        sa.Column('last_full_sync_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['last_sync_id'], ['sync_logs.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # 更新された予約の差分取得用
+    op.create_index(op.f('ix_reservations_updated_at'), 'reservations', ['updated_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_reservations_updated_at'), table_name='reservations')
+    op.drop_table('cleaning_sync_state')
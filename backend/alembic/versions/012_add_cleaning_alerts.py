@@ -0,0 +1,51 @@
+"""add cleaning_alerts table
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 02:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # 清掃タスク同期アラートテーブル作成
+    op.create_table(
+        'cleaning_alerts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('alert_type', sa.String(30), nullable=False),
+        sa.Column('dedupe_key', sa.String(100), nullable=False),
+        sa.Column('task_id', sa.Integer(), nullable=True),
+        sa.Column('reservation_id', sa.Integer(), nullable=True),
+        sa.Column('alert_date', sa.Date(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('details', sa.JSON(), nullable=True),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('occurrences', sa.Integer(), nullable=False),
+        sa.Column('first_detected_at', sa.DateTime(), nullable=True),
+        sa.Column('last_detected_at', sa.DateTime(), nullable=True),
+        sa.Column('acknowledged_at', sa.DateTime(), nullable=True),
+        sa.Column('acknowledged_by', sa.String(100), nullable=True),
+        sa.Column('sync_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['task_id'], ['cleaning_tasks.id'], ),
+        sa.ForeignKeyConstraint(['sync_id'], ['sync_logs.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dedupe_key')
+    )
+    op.create_index(op.f('ix_cleaning_alerts_id'), 'cleaning_alerts', ['id'], unique=False)
+    op.create_index('ix_cleaning_alerts_status_date', 'cleaning_alerts', ['status', 'alert_date'], unique=False)
+    op.create_index('ix_cleaning_alerts_type_status', 'cleaning_alerts', ['alert_type', 'status'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_cleaning_alerts_type_status', table_name='cleaning_alerts')
+    op.drop_index('ix_cleaning_alerts_status_date', table_name='cleaning_alerts')
+    op.drop_index(op.f('ix_cleaning_alerts_id'), table_name='cleaning_alerts')
+    op.drop_table('cleaning_alerts')
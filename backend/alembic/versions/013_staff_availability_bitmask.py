@@ -0,0 +1,51 @@
+"""store staff availability days as a bitmask
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+DAY_COLUMNS = [f"day_{day}" for day in range(1, 32)]
+
+# 1-31日すべて出勤可能
+ALL_DAYS_MASK = (1 << 31) - 1
+
+
+def upgrade():
+    # ビットマスクのカラムを追加し、日ごとのカラムから移す（NULLは出勤可能として扱う）
+    op.add_column('staff_availability', sa.Column('available_days', sa.Integer(), nullable=True))
+    mask_expression = " + ".join(
+        f"(CASE WHEN {column} = FALSE THEN 0 ELSE {1 << (day - 1)} END)"
+        for day, column in enumerate(DAY_COLUMNS, start=1)
+    )
+    op.execute(f"UPDATE staff_availability SET available_days = {mask_expression}")
+    
+    with op.batch_alter_table('staff_availability') as batch_op:
+        batch_op.alter_column('available_days', existing_type=sa.Integer(), nullable=False)
+        for column in DAY_COLUMNS:
+            batch_op.drop_column(column)
+
+
+def downgrade():
+    with op.batch_alter_table('staff_availability') as batch_op:
+        for column in DAY_COLUMNS:
+            batch_op.add_column(sa.Column(column, sa.Boolean(), nullable=True))
+    
+    op.execute(
+        "UPDATE staff_availability SET " + ", ".join(
+            f"{column} = ((available_days & {1 << (day - 1)}) <> 0)"
+            for day, column in enumerate(DAY_COLUMNS, start=1)
+        )
+    )
+    
+    with op.batch_alter_table('staff_availability') as batch_op:
+        batch_op.drop_column('available_days')
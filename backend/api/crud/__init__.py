@@ -1,10 +1,12 @@
 from .reservation import (
-    get_reservation, get_reservation_by_reservation_id, get_reservations,
-    create_reservation, update_reservation
+    get_reservation, get_reservation_by_reservation_id, get_reservations, get_reservations_as_of,
+    add_reservation, create_reservation, update_reservation, delete_reservation,
+    facility_name_from_room_type, bulk_upsert_reservations, apply_reservation_batch,
+    MAX_BATCH_SIZE, EXPORT_COLUMNS, iter_reservation_rows
 )
 from .property import (
     get_facility, get_facility_by_name, get_facilities, 
-    create_facility, get_or_create_facility
+    create_facility, get_or_create_facility, get_or_create_facilities
 )
 from .sync_log import (
     create_sync_log, update_sync_log, get_latest_sync_log
@@ -14,15 +16,22 @@ from .dashboard import (
     get_monthly_stats,
     get_monthly_comparison,
     get_daily_stats,
-    get_ota_breakdown
+    get_daily_stats_range,
+    get_ota_breakdown,
+    get_calendar_reservations_columnar
 )
+from .booking_issue import get_booking_issues, count_booking_issues
 
 __all__ = [
-    "get_reservation", "get_reservation_by_reservation_id", "get_reservations",
-    "create_reservation", "update_reservation",
+    "get_reservation", "get_reservation_by_reservation_id", "get_reservations", "get_reservations_as_of",
+    "add_reservation", "create_reservation", "update_reservation", "delete_reservation",
+    "facility_name_from_room_type", "bulk_upsert_reservations", "apply_reservation_batch",
+    "MAX_BATCH_SIZE", "EXPORT_COLUMNS", "iter_reservation_rows",
     "get_facility", "get_facility_by_name", "get_facilities", 
-    "create_facility", "get_or_create_facility",
+    "create_facility", "get_or_create_facility", "get_or_create_facilities",
     "create_sync_log", "update_sync_log", "get_latest_sync_log",
     "get_dashboard_stats", "get_monthly_stats", "get_monthly_comparison",
-    "get_daily_stats", "get_ota_breakdown"
+    "get_daily_stats", "get_daily_stats_range", "get_ota_breakdown",
+    "get_calendar_reservations_columnar",
+    "get_booking_issues", "count_booking_issues"
 ]
\ No newline at end of file
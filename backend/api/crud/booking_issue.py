@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func
+from typing import Optional, List, Dict, Any
+from ..models import BookingIssue, Facility, Reservation
+
+def get_booking_issues(
+    db: Session,
+    issue_type: Optional[str] = None,
+    facility_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Dict[str, Any]]:
+    """予約の重複・孤立泊の検出結果を取得（開始日順）"""
+    first = aliased(Reservation)
+    other = aliased(Reservation)
+    query = db.query(
+        BookingIssue,
+        Facility.name.label("facility_name"),
+        first.reservation_id.label("reservation_code"),
+        first.guest_name.label("guest_name"),
+        other.reservation_id.label("other_reservation_code"),
+        other.guest_name.label("other_guest_name")
+    ).join(
+        Facility, BookingIssue.facility_id == Facility.id
+    ).join(
+        first, BookingIssue.reservation_id == first.id
+    ).join(
+        other, BookingIssue.other_reservation_id == other.id
+    )
+    
+    if issue_type:
+        query = query.filter(BookingIssue.issue_type == issue_type)
+    if facility_id:
+        query = query.filter(BookingIssue.facility_id == facility_id)
+    
+    rows = query.order_by(
+        BookingIssue.start_date, Facility.name
+    ).offset(skip).limit(limit).all()
+    
+    return [
+        {
+            "id": issue.id,
+            "issue_type": issue.issue_type,
+            "facility_id": issue.facility_id,
+            "facility_name": facility_name,
+            "reservation_id": issue.reservation_id,
+            "reservation_code": reservation_code,
+            "guest_name": guest_name,
+            "other_reservation_id": issue.other_reservation_id,
+            "other_reservation_code": other_reservation_code,
+            "other_guest_name": other_guest_name,
+            "start_date": issue.start_date,
+            "end_date": issue.end_date,
+            "nights": issue.nights,
+            "detected_at": issue.detected_at,
+            "sync_id": issue.sync_id
+        }
+        for issue, facility_name, reservation_code, guest_name, other_reservation_code, other_guest_name in rows
+    ]
+
+def count_booking_issues(db: Session) -> Dict[str, int]:
+    """検出結果の種類ごとの件数"""
+    counts = {"double_booking": 0, "orphan_gap": 0}
+    for issue_type, count in db.query(
+        BookingIssue.issue_type, func.count(BookingIssue.id)
+    ).group_by(BookingIssue.issue_type).all():
+        counts[issue_type] = count
+    return counts
@@ -1,20 +1,25 @@
 """清掃管理機能のCRUD操作"""
 
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc
+from sqlalchemy import and_, or_, func, desc, insert
 from typing import List, Optional, Dict, Any
 from datetime import datetime, date, time, timedelta
+from collections import defaultdict
+import calendar
 
 from ..models.cleaning import (
     Staff as StaffModel,
+    StaffGroupMember as StaffGroupMemberModel,
     CleaningTask as CleaningTaskModel,
     CleaningShift as CleaningShiftModel,
     FacilityCleaningSettings as FacilityCleaningSettingsModel,
     TaskStatus,
     ShiftStatus
 )
-from ..models.reservation import Reservation
+from ..models.reservation import Reservation, CANCELLED_TYPE
 from ..models.property import Facility
+from .property import get_or_create_facilities
+from ..services.facility_eligibility import get_eligible_staff_ids
 from ..schemas.cleaning import (
     StaffCreate, StaffUpdate,
     CleaningTaskCreate, CleaningTaskUpdate,
@@ -46,12 +51,10 @@ def get_staff_list(
         query = query.filter(StaffModel.is_active == is_active)
     
     if facility_id is not None:
-        # JSONフィールドの検索（SQLiteの場合）
-        query = query.filter(
-            func.json_extract(StaffModel.available_facilities, f'$[*]').like(f'%{facility_id}%')
-        )
+        # 対応可能施設インデックスで絞り込み（未登録のスタッフは全施設対応）
+        query = query.filter(StaffModel.id.in_(get_eligible_staff_ids(db, facility_id)))
     
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(StaffModel.id).offset(skip).limit(limit).all()
 
 def get_cleaning_tasks_by_date_range(
     db: Session,
@@ -203,97 +206,113 @@ def update_cleaning_task(
     db.refresh(db_task)
     return db_task
 
-def auto_create_cleaning_tasks(db: Session, checkout_date: date) -> List[CleaningTaskModel]:
-    """チェックアウト予約から清掃タスクを自動生成"""
+def _resolve_reservation_facilities(db: Session, reservations: List[Reservation]) -> List[int]:
+    """施設未設定の予約に施設を設定（部屋タイプ名の施設、なければ既定の施設）
+
+    Returns:
+        施設を設定した予約の主キー
+    """
+    unresolved = [r for r in reservations if not r.facility_id]
+    if not unresolved:
+        return []
+
+    # 部屋タイプ名の施設をまとめて取得または作成
+    facilities = get_or_create_facilities(db, (r.room_type for r in unresolved))
+
+    default_facility = None
+    for reservation in unresolved:
+        if reservation.room_type:
+            reservation.facility_id = facilities[reservation.room_type].id
+        else:
+            if default_facility is None:
+                default_facility = db.query(Facility).first()
+                if default_facility is None:
+                    default_facility = Facility(name="デフォルト施設", is_active=True)
+                    db.add(default_facility)
+                    db.flush()
+            reservation.facility_id = default_facility.id
+    return [r.id for r in unresolved]
+
+def auto_create_cleaning_tasks_for_range(db: Session, start_date: date, end_date: date) -> Dict[str, Any]:
+    """期間内にチェックアウトする予約から清掃タスクをまとめて生成
+
+    予約・作成済みタスク・施設清掃設定をそれぞれ1回のクエリで取得し、
+    タスクのない予約の分だけ一括で登録する。
+    """
     # チェックアウトする予約を取得
     reservations = db.query(Reservation).filter(
         and_(
-            Reservation.check_out_date == checkout_date,
-            Reservation.reservation_type != "キャンセル"
+            Reservation.check_out_date >= start_date,
+            Reservation.check_out_date <= end_date,
+            Reservation.reservation_type != CANCELLED_TYPE
         )
-    ).all()
-    
-    created_tasks = []
-    for reservation in reservations:
-        # facility_idがない場合の処理
-        if not reservation.facility_id:
-            # room_typeから施設を推定
-            if reservation.room_type:
-                # 施設名で検索
-                facility = db.query(Facility).filter(
-                    Facility.name == reservation.room_type
-                ).first()
-                if facility:
-                    reservation.facility_id = facility.id
-                    db.add(reservation)
-                else:
-                    # room_typeから施設を作成
-                    new_facility = Facility(
-                        name=reservation.room_type,
-                        is_active=True
-                    )
-                    db.add(new_facility)
-                    db.flush()  # IDを取得するためにflush
-                    reservation.facility_id = new_facility.id
-                    db.add(reservation)
-                    print(f"Created new facility '{reservation.room_type}' for reservation {reservation.id}")
-            else:
-                # デフォルトの施設IDを設定
-                default_facility = db.query(Facility).first()
-                if default_facility:
-                    reservation.facility_id = default_facility.id
-                    db.add(reservation)
-                else:
-                    # デフォルト施設を作成
-                    new_facility = Facility(
-                        name="デフォルト施設",
-                        is_active=True
+    ).order_by(Reservation.check_out_date, Reservation.id).all()
+
+    # 作成済みのタスクがある予約
+    existing_ids = {
+        row[0] for row in db.query(CleaningTaskModel.reservation_id).filter(
+            CleaningTaskModel.reservation_id.in_(
+                db.query(Reservation.id).filter(
+                    and_(
+                        Reservation.check_out_date >= start_date,
+                        Reservation.check_out_date <= end_date,
+                        Reservation.reservation_type != CANCELLED_TYPE
                     )
-                    db.add(new_facility)
-                    db.flush()
-                    reservation.facility_id = new_facility.id
-                    db.add(reservation)
-                    print(f"Created default facility for reservation {reservation.id}")
-        
-        # 既存タスクがないか確認
-        existing = db.query(CleaningTaskModel).filter(
-            CleaningTaskModel.reservation_id == reservation.id
-        ).first()
-        
-        if not existing:
-            # 施設の清掃設定を取得
-            settings = db.query(FacilityCleaningSettingsModel).filter(
-                FacilityCleaningSettingsModel.facility_id == reservation.facility_id
-            ).first()
-            
-            # デフォルト値
-            duration = 300  # デフォルト5時間
-            if settings:
-                duration = settings.standard_duration_minutes
-            
-            # タスク作成
-            task = CleaningTaskModel(
-                reservation_id=reservation.id,
-                facility_id=reservation.facility_id,
-                checkout_date=checkout_date,
-                checkout_time=time(10, 0),  # デフォルト10:00
-                scheduled_date=checkout_date,
-                scheduled_start_time=time(11, 0),  # デフォルト11:00開始
-                scheduled_end_time=time(16, 0),  # デフォルト16:00終了
-                estimated_duration_minutes=duration,
-                priority=3,
-                status=TaskStatus.UNASSIGNED
+                )
             )
-            
-            db.add(task)
-            created_tasks.append(task)
-    
-    if created_tasks:
+        ).distinct().all()
+    }
+    targets = [r for r in reservations if r.id not in existing_ids]
+
+    # 施設未設定の予約は施設を補完し、派生データ（宿泊日テーブル等）にも反映
+    resolved_reservation_ids = _resolve_reservation_facilities(db, reservations)
+    if resolved_reservation_ids:
+        from ..services.reservation_changes import apply_reservation_changes
+        apply_reservation_changes(db, resolved_reservation_ids)
+
+    # 施設の標準清掃時間
+    durations = {
+        row.facility_id: row.standard_duration_minutes
+        for row in db.query(
+            FacilityCleaningSettingsModel.facility_id,
+            FacilityCleaningSettingsModel.standard_duration_minutes
+        ).filter(
+            FacilityCleaningSettingsModel.facility_id.in_({r.facility_id for r in targets})
+        ).all()
+    } if targets else {}
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "reservation_id": reservation.id,
+            "facility_id": reservation.facility_id,
+            "checkout_date": reservation.check_out_date,
+            "checkout_time": time(10, 0),  # デフォルト10:00
+            "scheduled_date": reservation.check_out_date,
+            "scheduled_start_time": time(11, 0),  # デフォルト11:00開始
+            "scheduled_end_time": time(16, 0),  # デフォルト16:00終了
+            "estimated_duration_minutes": durations.get(reservation.facility_id, 300),  # デフォルト5時間
+            "priority": 3,
+            "status": TaskStatus.UNASSIGNED,
+            "created_at": now,
+            "updated_at": now
+        }
+        for reservation in targets
+    ]
+    task_ids = list(db.scalars(insert(CleaningTaskModel).returning(CleaningTaskModel.id), rows)) if rows else []
+
+    if task_ids or resolved_reservation_ids:
         db.commit()
-        for task in created_tasks:
-            db.refresh(task)
-    
-    return created_tasks
+
+    return {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "reservations": len(reservations),
+        "created": len(task_ids),
+        "skipped_existing": len(reservations) - len(targets),
+        "facilities_resolved": len(resolved_reservation_ids),
+        "task_ids": task_ids
+    }
 
 # ========== シフト関連 ==========
 
@@ -329,6 +348,33 @@ def get_cleaning_shifts(
     return query.order_by(CleaningShiftModel.assigned_date, CleaningShiftModel.scheduled_start_time)\
         .offset(skip).limit(limit).all()
 
+def _split_task_wages(shifts: List[CleaningShiftModel], staff_by_id: Dict[int, StaffModel]) -> None:
+    """タスクのシフトの報酬を割当人数で等分（スタッフのシフトのみ再計算）"""
+    num_assigned_staff = len(shifts)
+    for shift in shifts:
+        staff = staff_by_id.get(shift.staff_id)
+        if not staff:
+            continue
+        # オプション付きかどうかで報酬を選択
+        base_rate = staff.rate_per_property_with_option if shift.is_option_included else staff.rate_per_property
+        shift.calculated_wage = base_rate / num_assigned_staff
+        shift.num_assigned_staff = num_assigned_staff
+        shift.total_payment = shift.calculated_wage + (shift.transportation_fee or 0) + (shift.bonus or 0)
+
+def _get_staff_by_id(db: Session, staff_ids) -> Dict[int, StaffModel]:
+    """スタッフをまとめて取得"""
+    ids = {i for i in staff_ids if i is not None}
+    if not ids:
+        return {}
+    return {staff.id: staff for staff in db.query(StaffModel).filter(StaffModel.id.in_(ids)).all()}
+
+def _new_shift(shift: CleaningShiftCreate, staff: Optional[StaffModel]) -> CleaningShiftModel:
+    db_shift = CleaningShiftModel(**shift.dict())
+    db_shift.status = ShiftStatus.SCHEDULED
+    if staff:
+        db_shift.transportation_fee = staff.transportation_fee
+    return db_shift
+
 def create_cleaning_shift(db: Session, shift: CleaningShiftCreate) -> CleaningShiftModel:
     """シフト作成（タスクへのスタッフ割当）"""
     # タスクのステータス更新
@@ -337,42 +383,112 @@ def create_cleaning_shift(db: Session, shift: CleaningShiftCreate) -> CleaningSh
         task.status = TaskStatus.ASSIGNED
         task.updated_at = datetime.utcnow()
     
-    # 同じタスクに既に割り当てられているスタッフ数を取得
+    # 同じタスクに既に割り当てられているシフト
     existing_shifts = db.query(CleaningShiftModel).filter(
         CleaningShiftModel.task_id == shift.task_id
     ).all()
-    num_assigned_staff = len(existing_shifts) + 1
+    staff_by_id = _get_staff_by_id(db, [shift.staff_id] + [s.staff_id for s in existing_shifts])
     
     # シフト作成
-    db_shift = CleaningShiftModel(**shift.dict())
-    db_shift.status = ShiftStatus.SCHEDULED
-    db_shift.num_assigned_staff = num_assigned_staff
+    db_shift = _new_shift(shift, staff_by_id.get(shift.staff_id))
+    db_shift.num_assigned_staff = len(existing_shifts) + 1
     
-    # スタッフの1棟あたり報酬を取得して賃金計算
-    staff = db.query(StaffModel).filter(StaffModel.id == shift.staff_id).first()
-    if staff:
-        # オプション付きかどうかで報酬を選択
-        base_rate = staff.rate_per_property_with_option if shift.is_option_included else staff.rate_per_property
-        
-        # 人数で等分
-        db_shift.calculated_wage = base_rate / num_assigned_staff
-        db_shift.transportation_fee = staff.transportation_fee
-        db_shift.total_payment = db_shift.calculated_wage + staff.transportation_fee
-        
-        # 既存のシフトの報酬も更新（人数が増えたため）
-        for existing_shift in existing_shifts:
-            existing_staff = db.query(StaffModel).filter(StaffModel.id == existing_shift.staff_id).first()
-            if existing_staff:
-                base_rate = existing_staff.rate_per_property_with_option if existing_shift.is_option_included else existing_staff.rate_per_property
-                existing_shift.calculated_wage = base_rate / num_assigned_staff
-                existing_shift.num_assigned_staff = num_assigned_staff
-                existing_shift.total_payment = existing_shift.calculated_wage + existing_shift.transportation_fee + (existing_shift.bonus or 0)
+    # 人数が増えたため既存のシフトも含めて報酬を等分
+    if db_shift.staff_id in staff_by_id:
+        _split_task_wages(existing_shifts + [db_shift], staff_by_id)
     
     db.add(db_shift)
     db.commit()
     db.refresh(db_shift)
     return db_shift
 
+def create_cleaning_shifts_batch(db: Session, shifts: List[CleaningShiftCreate]) -> List[CleaningShiftModel]:
+    """シフトを一括作成（タスクへのスタッフ割当）
+    
+    対象タスク・既存シフト・関係するスタッフをそれぞれ1回のクエリで取得し、
+    タスクごとに報酬の等分を1回だけ計算して、最後に1回コミットする。
+    
+    Raises:
+        ValueError: スタッフ・タスクが存在しない、または同じ割当が既にある場合
+    """
+    task_ids = {shift.task_id for shift in shifts}
+    tasks = {
+        task.id: task
+        for task in db.query(CleaningTaskModel).filter(CleaningTaskModel.id.in_(task_ids)).all()
+    }
+    missing_tasks = sorted(task_ids - tasks.keys())
+    if missing_tasks:
+        raise ValueError(f"Task not found: {missing_tasks}")
+    
+    existing_by_task: Dict[int, List[CleaningShiftModel]] = defaultdict(list)
+    for existing in db.query(CleaningShiftModel).filter(
+        CleaningShiftModel.task_id.in_(task_ids)
+    ).order_by(CleaningShiftModel.id).all():
+        existing_by_task[existing.task_id].append(existing)
+    
+    staff_by_id = _get_staff_by_id(
+        db,
+        [shift.staff_id for shift in shifts]
+        + [s.staff_id for task_shifts in existing_by_task.values() for s in task_shifts]
+    )
+    missing_staff = sorted({shift.staff_id for shift in shifts} - staff_by_id.keys(), key=str)
+    if missing_staff:
+        raise ValueError(f"Staff not found: {missing_staff}")
+    
+    # 同じタスク・スタッフ・日付の割当の重複（既存・リクエスト内）
+    assigned = {
+        (s.task_id, s.staff_id, s.assigned_date)
+        for task_shifts in existing_by_task.values() for s in task_shifts
+    }
+    for shift in shifts:
+        key = (shift.task_id, shift.staff_id, shift.assigned_date)
+        if key in assigned:
+            raise ValueError(
+                f"Shift already exists for task {shift.task_id} and staff {shift.staff_id} on {shift.assigned_date}"
+            )
+        assigned.add(key)
+    
+    # シフト作成（報酬の計算用、登録は最後にまとめて行う）
+    new_shifts = [_new_shift(shift, staff_by_id[shift.staff_id]) for shift in shifts]
+    new_by_task: Dict[int, List[CleaningShiftModel]] = defaultdict(list)
+    for db_shift in new_shifts:
+        new_by_task[db_shift.task_id].append(db_shift)
+    
+    # タスクごとに既存のシフトも含めて報酬を等分し、タスクを割当済みにする
+    now = datetime.utcnow()
+    for task_id, task_shifts in new_by_task.items():
+        _split_task_wages(existing_by_task[task_id] + task_shifts, staff_by_id)
+        tasks[task_id].status = TaskStatus.ASSIGNED
+        tasks[task_id].updated_at = now
+    
+    # 新しいシフトは1回の INSERT でまとめて登録
+    rows = [
+        {
+            **shift.dict(),
+            "status": db_shift.status,
+            "num_assigned_staff": db_shift.num_assigned_staff,
+            "calculated_wage": db_shift.calculated_wage,
+            "transportation_fee": db_shift.transportation_fee,
+            "bonus": 0,
+            "total_payment": db_shift.total_payment,
+            "created_at": now,
+            "updated_at": now
+        }
+        for shift, db_shift in zip(shifts, new_shifts)
+    ]
+    shift_ids = sorted(db.scalars(insert(CleaningShiftModel).returning(CleaningShiftModel.id), rows))
+    db.commit()
+    
+    # 作成したシフトを関連情報付きでまとめて取得（登録順）
+    created = {
+        db_shift.id: db_shift
+        for db_shift in db.query(CleaningShiftModel)
+            .options(joinedload(CleaningShiftModel.staff))
+            .options(joinedload(CleaningShiftModel.task).joinedload(CleaningTaskModel.facility))
+            .filter(CleaningShiftModel.id.in_(shift_ids)).all()
+    }
+    return [created[shift_id] for shift_id in shift_ids]
+
 def update_cleaning_shift(
     db: Session,
     shift_id: int,
@@ -428,14 +544,7 @@ def delete_cleaning_shift(db: Session, shift_id: int) -> bool:
     
     if remaining_shifts:
         # 残りのシフトの人数と報酬を再計算
-        num_assigned_staff = len(remaining_shifts)
-        for shift in remaining_shifts:
-            staff = db.query(StaffModel).filter(StaffModel.id == shift.staff_id).first()
-            if staff:
-                base_rate = staff.rate_per_property_with_option if shift.is_option_included else staff.rate_per_property
-                shift.calculated_wage = base_rate / num_assigned_staff
-                shift.num_assigned_staff = num_assigned_staff
-                shift.total_payment = shift.calculated_wage + shift.transportation_fee + (shift.bonus or 0)
+        _split_task_wages(remaining_shifts, _get_staff_by_id(db, [s.staff_id for s in remaining_shifts]))
     else:
         # タスクのステータスを未割当に戻す
         task = db.query(CleaningTaskModel).filter(CleaningTaskModel.id == task_id).first()
@@ -567,4 +676,80 @@ def get_staff_performance(
             "total_earnings": result.total_earnings or 0
         })
     
-    return performance_list
\ No newline at end of file
+    return performance_list
+
+def get_staff_monthly_stats(db: Session, year: int, month: int) -> List[Dict[str, Any]]:
+    """スタッフ月次統計取得（出勤日数・担当棟数・作業時間）
+
+    月内の有効なシフトとグループの在籍メンバーを一括で取得し、メモリ上でスタッフごとに集計する。
+    グループのシフトは在籍メンバー全員の担当として数え、作業時間はメンバー数で按分する。
+    """
+    _, last_day = calendar.monthrange(year, month)
+    start_date = date(year, month, 1)
+    end_date = date(year, month, last_day)
+
+    staff_list = db.query(StaffModel.id, StaffModel.name)\
+        .filter(StaffModel.is_active == True)\
+        .order_by(StaffModel.id).all()
+
+    # グループごとの在籍メンバー（重複所属はシフトも重複して数える）
+    group_members = defaultdict(list)
+    for group_id, staff_id in db.query(
+        StaffGroupMemberModel.group_id, StaffGroupMemberModel.staff_id
+    ).filter(StaffGroupMemberModel.left_date.is_(None)).all():
+        group_members[group_id].append(staff_id)
+
+    shifts = db.query(
+        CleaningShiftModel.staff_id,
+        CleaningShiftModel.group_id,
+        CleaningShiftModel.assigned_date,
+        CleaningTaskModel.id.label("task_id"),
+        CleaningTaskModel.estimated_duration_minutes
+    ).outerjoin(
+        CleaningTaskModel, CleaningTaskModel.id == CleaningShiftModel.task_id
+    ).filter(
+        and_(
+            CleaningShiftModel.assigned_date >= start_date,
+            CleaningShiftModel.assigned_date <= end_date,
+            CleaningShiftModel.status != ShiftStatus.CANCELLED
+        )
+    ).order_by(CleaningShiftModel.assigned_date, CleaningShiftModel.id).all()
+
+    totals = defaultdict(lambda: {"dates": set(), "individual": 0, "group": 0, "hours": 0.0})
+    group_hours = []  # 個人分の後に加算するため（集計順を揃える）
+    for shift in shifts:
+        hours = (shift.estimated_duration_minutes or 300) / 60.0 if shift.task_id is not None else 0.0
+        if shift.staff_id is not None:
+            total = totals[shift.staff_id]
+            total["dates"].add(shift.assigned_date)
+            total["individual"] += 1
+            total["hours"] += hours
+        if shift.group_id is not None:
+            members = group_members.get(shift.group_id, [])
+            for staff_id in members:
+                total = totals[staff_id]
+                total["dates"].add(shift.assigned_date)
+                total["group"] += 1
+                group_hours.append((staff_id, hours / len(members)))
+    for staff_id, hours in group_hours:
+        totals[staff_id]["hours"] += hours
+
+    stats = []
+    for staff in staff_list:
+        total = totals[staff.id]
+        stats.append({
+            "staff_id": staff.id,
+            "staff_name": staff.name,
+            "year": year,
+            "month": month,
+            "working_days": len(total["dates"]),
+            "total_tasks": total["individual"] + total["group"],
+            "individual_tasks": total["individual"],
+            "group_tasks": total["group"],
+            "total_hours": round(total["hours"], 1),
+            "dates_worked": sorted(total["dates"])
+        })
+
+    # 出勤日数でソート（降順）
+    stats.sort(key=lambda x: x["working_days"], reverse=True)
+    return stats
@@ -0,0 +1,87 @@
+"""清掃タスク同期アラートのCRUD操作"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, update, and_
+from typing import Optional, List, Dict
+from datetime import date, datetime
+from ..models import CleaningAlert
+from ..models.cleaning_alert import ALERT_OPEN, ALERT_ACKNOWLEDGED
+
+def _filter_alerts(
+    query,
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+):
+    if status:
+        query = query.filter(CleaningAlert.status == status)
+    if alert_type:
+        query = query.filter(CleaningAlert.alert_type == alert_type)
+    if start_date:
+        query = query.filter(CleaningAlert.alert_date >= start_date)
+    if end_date:
+        query = query.filter(CleaningAlert.alert_date <= end_date)
+    return query
+
+def get_cleaning_alerts(
+    db: Session,
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[CleaningAlert]:
+    """清掃タスク同期アラートを取得（対象日順）"""
+    return _filter_alerts(
+        db.query(CleaningAlert), status, alert_type, start_date, end_date
+    ).order_by(
+        CleaningAlert.alert_date, CleaningAlert.id
+    ).offset(skip).limit(limit).all()
+
+def count_cleaning_alerts(
+    db: Session,
+    status: Optional[str] = None,
+    alert_type: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None
+) -> int:
+    """条件に一致するアラートの件数"""
+    return _filter_alerts(
+        db.query(func.count(CleaningAlert.id)), status, alert_type, start_date, end_date
+    ).scalar()
+
+def count_cleaning_alerts_by_status(db: Session) -> Dict[str, int]:
+    """ステータスごとのアラート件数"""
+    counts = {ALERT_OPEN: 0, ALERT_ACKNOWLEDGED: 0}
+    for status, count in db.query(
+        CleaningAlert.status, func.count(CleaningAlert.id)
+    ).group_by(CleaningAlert.status).all():
+        counts[status] = count
+    return counts
+
+def acknowledge_cleaning_alerts(
+    db: Session,
+    alert_ids: List[int],
+    acknowledged_by: Optional[str] = None
+) -> int:
+    """未確認のアラートをまとめて確認済みにする
+
+    Returns:
+        確認済みにした件数
+    """
+    result = db.execute(
+        update(CleaningAlert).where(
+            and_(
+                CleaningAlert.id.in_(set(alert_ids)),
+                CleaningAlert.status == ALERT_OPEN
+            )
+        ).values(
+            status=ALERT_ACKNOWLEDGED,
+            acknowledged_at=datetime.utcnow(),
+            acknowledged_by=acknowledged_by
+        )
+    )
+    db.commit()
+    return result.rowcount
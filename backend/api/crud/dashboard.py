@@ -1,8 +1,9 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, func, extract
+from sqlalchemy import and_, or_, func, case, extract
 from datetime import date, datetime, timedelta
-from typing import Dict, Any, List
-from ..models import Reservation, Facility
+from typing import Dict, Any, List, Tuple
+from ..models import Reservation, Facility, ReservationNight
+from ..models.reservation import CANCELLED_TYPE
 from .sync_log import get_latest_sync_log
 
 def get_dashboard_stats(db: Session):
@@ -36,7 +37,7 @@ def get_dashboard_stats(db: Session):
         and_(
             Reservation.check_in_date <= today,
             Reservation.check_out_date > today,
-            Reservation.reservation_type != "キャンセル"
+            Reservation.reservation_type != CANCELLED_TYPE
         )
     ).scalar() or 0
     occupancy_rate = (occupied_facilities / total_facilities) * 100 if total_facilities > 0 else 0
@@ -58,40 +59,85 @@ def get_dashboard_stats(db: Session):
         "sync_status": sync_status
     }
 
-def get_monthly_stats(db: Session, year: int, month: int) -> Dict[str, Any]:
-    """月間統計情報を取得"""
-    
-    # 月の開始日と終了日を計算
+def month_range(year: int, month: int):
+    """月の開始日と終了日（末日）を返す"""
     start_date = date(year, month, 1)
     if month == 12:
         end_date = date(year + 1, 1, 1) - timedelta(days=1)
     else:
         end_date = date(year, month + 1, 1) - timedelta(days=1)
+    return start_date, end_date
+
+def get_room_inventory(db: Session) -> int:
+    """販売可能な室数（稼働中の施設数。一棟貸のため1施設=1室）"""
+    return db.query(func.count(Facility.id)).filter(
+        Facility.is_active == True
+    ).scalar() or 0
+
+def _get_monthly_stats_for_months(db: Session, months: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+    """複数月の月間統計をまとめて集計
     
-    # 月間の予約データを取得
-    monthly_reservations = db.query(Reservation).filter(
-        and_(
+    予約数は月と重なる予約（チェックイン日 < 翌月1日 かつ チェックアウト日 > 月初）、
+    売上・延べ宿泊数は宿泊日テーブルで月内の泊に按分された分を、月ごとの条件付き集計で1クエリずつ取得する。
+    """
+    ranges = [month_range(year, month) for year, month in months]
+    
+    def overlaps(start_date, end_date):
+        return and_(
             Reservation.check_in_date <= end_date,
-            Reservation.check_out_date >= start_date,
-            Reservation.reservation_type != 'キャンセル'
+            Reservation.check_out_date > start_date
         )
-    ).all()
     
-    # 月間売上高
-    total_revenue = sum([r.total_amount or 0 for r in monthly_reservations])
+    # 予約数
+    reservation_columns = [
+        func.count(case((overlaps(start_date, end_date), Reservation.id)))
+        for start_date, end_date in ranges
+    ]
+    reservation_row = db.query(*reservation_columns).filter(
+        and_(
+            or_(*[overlaps(start_date, end_date) for start_date, end_date in ranges]),
+            Reservation.reservation_type != CANCELLED_TYPE
+        )
+    ).one()
+    
+    # 月内の延べ宿泊数・売上
+    night_columns = []
+    for start_date, end_date in ranges:
+        in_month = ReservationNight.stay_date.between(start_date, end_date)
+        night_columns.append(func.count(case((in_month, ReservationNight.id))))
+        night_columns.append(func.sum(case((in_month, ReservationNight.revenue))))
+    night_row = db.query(*night_columns).filter(
+        or_(*[ReservationNight.stay_date.between(start_date, end_date) for start_date, end_date in ranges])
+    ).one()
     
-    # 月間の延べ宿泊数（泊数×室数）
-    total_room_nights = sum([
-        (min(r.check_out_date, end_date) - max(r.check_in_date, start_date)).days
-        for r in monthly_reservations
-    ])
+    total_rooms = get_room_inventory(db)
     
+    return [
+        build_monthly_stats(
+            year, month,
+            days_in_month=(end_date - start_date).days + 1,
+            total_reservations=reservation_row[i] or 0,
+            total_revenue=night_row[i * 2 + 1] or 0,
+            total_room_nights=night_row[i * 2] or 0,
+            total_rooms=total_rooms
+        )
+        for i, ((year, month), (start_date, end_date)) in enumerate(zip(months, ranges))
+    ]
+
+def build_monthly_stats(
+    year: int,
+    month: int,
+    days_in_month: int,
+    total_reservations: int,
+    total_revenue: float,
+    total_room_nights: int,
+    total_rooms: int
+) -> Dict[str, Any]:
+    """集計値から月間統計（ADR・稼働率・RevPAR）を算出"""
     # 平均宿泊単価（ADR: Average Daily Rate）
     adr = total_revenue / total_room_nights if total_room_nights > 0 else 0
     
     # 稼働率（月間の延べ室数に対する販売室数の割合）
-    total_rooms = db.query(func.sum(Facility.total_rooms)).scalar() or 1
-    days_in_month = (end_date - start_date).days + 1
     available_room_nights = total_rooms * days_in_month
     occupancy_rate = (total_room_nights / available_room_nights * 100) if available_room_nights > 0 else 0
     
@@ -102,30 +148,47 @@ def get_monthly_stats(db: Session, year: int, month: int) -> Dict[str, Any]:
         "year": year,
         "month": month,
         "total_revenue": total_revenue,
-        "total_reservations": len(monthly_reservations),
+        "total_reservations": total_reservations,
         "total_room_nights": total_room_nights,
         "adr": round(adr, 0),
         "occupancy_rate": round(occupancy_rate, 1),
         "revpar": round(revpar, 0)
     }
 
+def get_monthly_stats(db: Session, year: int, month: int) -> Dict[str, Any]:
+    """月間統計情報を取得"""
+    return _get_monthly_stats_for_months(db, [(year, month)])[0]
+
+# 月間予算（予算管理機能が実装されるまでの暫定値）
+MONTHLY_BUDGET = {
+    "total_revenue": 8000000,  # 800万円
+    "adr": 25000,  # 2.5万円
+    "occupancy_rate": 75.0,  # 75%
+    "revpar": 18750
+}
+
 def get_monthly_comparison(db: Session, year: int, month: int) -> Dict[str, Any]:
     """月間実績・予算・前年比較データを取得"""
     
-    # 今月の実績
-    current_stats = get_monthly_stats(db, year, month)
-    
-    # 前年同月の実績
-    last_year_stats = get_monthly_stats(db, year - 1, month)
+    # 今月と前年同月の実績をまとめて集計
+    current_stats, last_year_stats = _get_monthly_stats_for_months(
+        db, [(year, month), (year - 1, month)]
+    )
     
+    return build_monthly_comparison(year, month, current_stats, last_year_stats)
+
+def build_monthly_comparison(
+    year: int,
+    month: int,
+    current_stats: Dict[str, Any],
+    last_year_stats: Dict[str, Any]
+) -> Dict[str, Any]:
+    """今月・前年同月の月間統計から予算・前年比較データを作成"""
     # 予算データ（ダミー）
     budget_data = {
         "year": year,
         "month": month,
-        "total_revenue": 8000000,  # 800万円
-        "adr": 25000,  # 2.5万円
-        "occupancy_rate": 75.0,  # 75%
-        "revpar": 18750
+        **MONTHLY_BUDGET
     }
     
     return {
@@ -144,87 +207,188 @@ def get_monthly_comparison(db: Session, year: int, month: int) -> Dict[str, Any]
 
 def get_daily_stats(db: Session, year: int, month: int) -> List[Dict[str, Any]]:
     """月間の日別統計を取得"""
+    start_date, end_date = month_range(year, month)
+    return get_daily_stats_range(db, start_date, end_date)
+
+def get_daily_stats_range(db: Session, start_date: date, end_date: date) -> List[Dict[str, Any]]:
+    """任意期間の日別統計を取得
     
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    日数に関わらずチェックイン集計と宿泊日集計の2クエリで全日分を取得し、
+    日付の連番に当てはめる（予約のない日は0）。売上は各宿泊日に按分された額。
+    """
+    # チェックイン日別の予約数
+    checkin_rows = db.query(
+        Reservation.check_in_date,
+        func.count(Reservation.id)
+    ).filter(
+        and_(
+            Reservation.check_in_date >= start_date,
+            Reservation.check_in_date <= end_date,
+            Reservation.reservation_type != CANCELLED_TYPE
+        )
+    ).group_by(Reservation.check_in_date).all()
+    checkins = {row[0]: row[1] for row in checkin_rows}
+    
+    # 宿泊日別の稼働室数・売上
+    night_rows = db.query(
+        ReservationNight.stay_date,
+        func.count(func.distinct(ReservationNight.facility_id)),
+        func.sum(ReservationNight.revenue)
+    ).filter(
+        and_(
+            ReservationNight.stay_date >= start_date,
+            ReservationNight.stay_date <= end_date
+        )
+    ).group_by(ReservationNight.stay_date).all()
+    nights = {row[0]: (row[1], row[2]) for row in night_rows}
     
     daily_stats = []
     current_date = start_date
-    
     while current_date <= end_date:
-        # その日の予約数（チェックイン）
-        checkins = db.query(func.count(Reservation.id)).filter(
-            and_(
-                Reservation.check_in_date == current_date,
-                Reservation.reservation_type != 'キャンセル'
-            )
-        ).scalar() or 0
-        
-        # その日の稼働室数
-        occupied = db.query(func.count(func.distinct(Reservation.facility_id))).filter(
-            and_(
-                Reservation.check_in_date <= current_date,
-                Reservation.check_out_date > current_date,
-                Reservation.reservation_type != 'キャンセル'
-            )
-        ).scalar() or 0
-        
-        # その日の売上
-        revenue = db.query(func.sum(Reservation.total_amount)).filter(
-            and_(
-                Reservation.check_in_date == current_date,
-                Reservation.reservation_type != 'キャンセル'
-            )
-        ).scalar() or 0
-        
+        occupied_rooms, revenue = nights.get(current_date, (0, 0))
         daily_stats.append({
             "date": current_date.isoformat(),
-            "checkins": checkins,
-            "occupied_rooms": occupied,
-            "revenue": revenue
+            "checkins": checkins.get(current_date, 0),
+            "occupied_rooms": occupied_rooms or 0,
+            "revenue": revenue or 0
         })
-        
         current_date += timedelta(days=1)
     
     return daily_stats
 
 def get_ota_breakdown(db: Session, year: int, month: int) -> List[Dict[str, Any]]:
-    """OTA別の月間統計を取得"""
+    """OTA別の月間統計を取得（月内に宿泊日がある予約、売上は月内の泊に按分された額）"""
     
-    start_date = date(year, month, 1)
-    if month == 12:
-        end_date = date(year + 1, 1, 1) - timedelta(days=1)
-    else:
-        end_date = date(year, month + 1, 1) - timedelta(days=1)
+    start_date, end_date = month_range(year, month)
+    
+    # 予約ごとの月内の売上・宿泊者数
+    per_reservation = db.query(
+        ReservationNight.reservation_id,
+        ReservationNight.ota_name,
+        func.sum(ReservationNight.revenue).label('revenue'),
+        func.max(ReservationNight.num_adults + ReservationNight.num_children + ReservationNight.num_infants).label('guests')
+    ).filter(
+        ReservationNight.stay_date.between(start_date, end_date)
+    ).group_by(
+        ReservationNight.reservation_id, ReservationNight.ota_name
+    ).subquery()
     
     # OTA別の集計
     ota_stats = db.query(
-        Reservation.ota_name,
-        func.count(Reservation.id).label('reservation_count'),
-        func.sum(Reservation.total_amount).label('total_revenue'),
-        func.sum(Reservation.num_adults + Reservation.num_children + Reservation.num_infants).label('total_guests')
-    ).filter(
-        and_(
-            Reservation.check_in_date <= end_date,
-            Reservation.check_out_date >= start_date,
-            Reservation.reservation_type != 'キャンセル'
-        )
-    ).group_by(Reservation.ota_name).all()
+        per_reservation.c.ota_name,
+        func.count(per_reservation.c.reservation_id).label('reservation_count'),
+        func.sum(per_reservation.c.revenue).label('total_revenue'),
+        func.sum(per_reservation.c.guests).label('total_guests')
+    ).group_by(per_reservation.c.ota_name).all()
     
     breakdown = []
     for stat in ota_stats:
+        total_revenue = stat.total_revenue or 0
         breakdown.append({
             "ota_name": stat.ota_name or "直接予約",
             "reservation_count": stat.reservation_count or 0,
-            "total_revenue": stat.total_revenue or 0,
+            "total_revenue": total_revenue,
             "total_guests": stat.total_guests or 0,
-            "average_revenue": (stat.total_revenue / stat.reservation_count) if stat.reservation_count > 0 else 0
+            "average_revenue": (total_revenue / stat.reservation_count) if stat.reservation_count > 0 else 0
         })
     
     # 売上高で降順ソート
     breakdown.sort(key=lambda x: x['total_revenue'], reverse=True)
     
-    return breakdown
\ No newline at end of file
+    return breakdown
+
+def _dictionary_encode(values: List) -> Tuple[List, List[int]]:
+    """値の配列を（重複なしの辞書, 辞書の添字の配列）に変換（Noneは-1）"""
+    dictionary = []
+    positions = {}
+    codes = []
+    for value in values:
+        if value is None:
+            codes.append(-1)
+            continue
+        if value not in positions:
+            positions[value] = len(dictionary)
+            dictionary.append(value)
+        codes.append(positions[value])
+    return dictionary, codes
+
+def get_calendar_reservations_columnar(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    room_type: str = None
+) -> Dict[str, Any]:
+    """カレンダー表示用の予約データを列指向で取得
+    
+    施設・部屋タイプ・OTA・予約種別は辞書テーブルの添字、日付は start_date からの日数で表し、
+    予約ごとの値は同じ順序の配列で返す（施設名・チェックイン日順）。
+    """
+    query = db.query(
+        Reservation.id,
+        Reservation.facility_id,
+        Facility.name.label("facility_name"),
+        Reservation.room_type,
+        Reservation.reservation_type,
+        Reservation.ota_name,
+        Reservation.ota_type,
+        Reservation.guest_name,
+        Reservation.check_in_date,
+        Reservation.check_out_date,
+        Reservation.num_adults,
+        Reservation.num_children,
+        Reservation.num_infants
+    ).outerjoin(
+        Facility, Reservation.facility_id == Facility.id
+    ).filter(
+        and_(
+            Reservation.check_in_date <= end_date,
+            Reservation.check_out_date >= start_date
+        )
+    )
+    
+    if room_type:
+        query = query.filter(Reservation.room_type == room_type)
+    
+    # 施設未設定の予約は最後
+    rows = query.order_by(
+        Facility.name.is_(None),
+        Facility.name,
+        Reservation.check_in_date,
+        Reservation.id
+    ).all()
+    
+    facility_keys, facility_codes = _dictionary_encode(
+        [(r.facility_id, r.facility_name) if r.facility_id is not None else None for r in rows]
+    )
+    room_types, room_type_codes = _dictionary_encode([r.room_type for r in rows])
+    ota_keys, ota_codes = _dictionary_encode([(r.ota_name, r.ota_type) for r in rows])
+    reservation_types, reservation_type_codes = _dictionary_encode([r.reservation_type for r in rows])
+    
+    adults = [r.num_adults or 0 for r in rows]
+    children = [r.num_children or 0 for r in rows]
+    infants = [r.num_infants or 0 for r in rows]
+    
+    return {
+        "format": "columnar",
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "count": len(rows),
+        "facilities": [{"id": facility_id, "name": name} for facility_id, name in facility_keys],
+        "room_types": room_types,
+        "otas": [{"name": name, "type": ota_type} for name, ota_type in ota_keys],
+        "reservation_types": reservation_types,
+        "columns": {
+            "id": [r.id for r in rows],
+            "facility": facility_codes,
+            "room_type": room_type_codes,
+            "ota": ota_codes,
+            "reservation_type": reservation_type_codes,
+            "guest_name": [r.guest_name for r in rows],
+            "start": [(r.check_in_date - start_date).days for r in rows],
+            "end": [(r.check_out_date - start_date).days for r in rows],
+            "guest_count": [a + c + i for a, c, i in zip(adults, children, infants)],
+            "num_adults": adults,
+            "num_children": children,
+            "num_infants": infants
+        }
+    }
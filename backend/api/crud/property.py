@@ -1,4 +1,5 @@
 from sqlalchemy.orm import Session
+from typing import Dict, Iterable
 from ..models import Facility
 from ..schemas import FacilityCreate
 
@@ -28,4 +29,25 @@ def get_or_create_facility(db: Session, name: str, room_type_identifier: str):
                 room_type_identifier=room_type_identifier
             )
         )
-    return facility
\ No newline at end of file
+    return facility
+
+def get_or_create_facilities(db: Session, names: Iterable[str]) -> Dict[str, Facility]:
+    """施設名の一覧から施設をまとめて取得または作成（コミットはしない）"""
+    unique_names = {name for name in names if name}
+    if not unique_names:
+        return {}
+    
+    facilities = {
+        f.name: f
+        for f in db.query(Facility).filter(Facility.name.in_(unique_names)).all()
+    }
+    
+    missing = [name for name in unique_names if name not in facilities]
+    for name in missing:
+        facility = Facility(name=name, is_active=True)
+        db.add(facility)
+        facilities[name] = facility
+    if missing:
+        db.flush()  # IDを取得するためにflush
+    
+    return facilities
@@ -1,9 +1,13 @@
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import and_, func
 from datetime import date, datetime
-from typing import List, Optional
-from ..models import Reservation
-from ..schemas import ReservationCreate, ReservationUpdate
+from typing import List, Optional, Dict, Tuple, Iterable
+from ..models import Reservation, Facility, ReservationVersion
+from ..schemas import ReservationCreate, ReservationUpdate, ReservationBatchRequest
+from .property import get_or_create_facilities
+
+# 一括処理で受け付ける最大件数（作成・更新・削除の合計）
+MAX_BATCH_SIZE = 5000
 
 def get_reservation(db: Session, reservation_id: int):
     return db.query(Reservation).options(joinedload(Reservation.facility)).filter(Reservation.id == reservation_id).first()
@@ -11,10 +15,9 @@ def get_reservation(db: Session, reservation_id: int):
 def get_reservation_by_reservation_id(db: Session, reservation_id: str):
     return db.query(Reservation).options(joinedload(Reservation.facility)).filter(Reservation.reservation_id == reservation_id).first()
 
-def get_reservations(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def _apply_reservation_filters(
+    query,
+    model=Reservation,
     ota_name: Optional[List[str]] = None,
     facility_id: Optional[int] = None,
     room_type: Optional[str] = None,
@@ -24,41 +27,118 @@ def get_reservations(
     sort_by: Optional[str] = None,
     sort_order: Optional[str] = None
 ):
-    query = db.query(Reservation).options(joinedload(Reservation.facility))
+    """予約一覧・エクスポート共通のフィルタとソートを適用
     
+    model には同名のカラムを持つ予約履歴テーブルも指定できる。
+    """
     if ota_name and len(ota_name) > 0:
-        query = query.filter(Reservation.ota_name.in_(ota_name))
+        query = query.filter(model.ota_name.in_(ota_name))
     if facility_id:
-        query = query.filter(Reservation.facility_id == facility_id)
+        query = query.filter(model.facility_id == facility_id)
     if room_type:
-        query = query.filter(Reservation.room_type.contains(room_type))
+        query = query.filter(model.room_type.contains(room_type))
     if check_in_date_from:
-        query = query.filter(Reservation.check_in_date >= check_in_date_from)
+        query = query.filter(model.check_in_date >= check_in_date_from)
     if check_in_date_to:
-        query = query.filter(Reservation.check_in_date <= check_in_date_to)
+        query = query.filter(model.check_in_date <= check_in_date_to)
     if guest_name:
-        query = query.filter(Reservation.guest_name.contains(guest_name))
+        query = query.filter(model.guest_name.contains(guest_name))
     
     # ソート処理
-    if sort_by and hasattr(Reservation, sort_by):
-        sort_column = getattr(Reservation, sort_by)
+    if sort_by and hasattr(model, sort_by):
+        sort_column = getattr(model, sort_by)
         if sort_order == 'asc':
             query = query.order_by(sort_column.asc())
         else:
             query = query.order_by(sort_column.desc())
     else:
         # デフォルトはチェックイン日の降順
-        query = query.order_by(Reservation.check_in_date.desc())
+        query = query.order_by(model.check_in_date.desc())
     
+    return query
+
+def get_reservations(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    ota_name: Optional[List[str]] = None,
+    facility_id: Optional[int] = None,
+    room_type: Optional[str] = None,
+    check_in_date_from: Optional[date] = None,
+    check_in_date_to: Optional[date] = None,
+    guest_name: Optional[str] = None,
+    sort_by: Optional[str] = None,
+    sort_order: Optional[str] = None
+):
+    query = db.query(Reservation).options(joinedload(Reservation.facility))
+    query = _apply_reservation_filters(
+        query,
+        ota_name=ota_name,
+        facility_id=facility_id,
+        room_type=room_type,
+        check_in_date_from=check_in_date_from,
+        check_in_date_to=check_in_date_to,
+        guest_name=guest_name,
+        sort_by=sort_by,
+        sort_order=sort_order
+    )
     return query.offset(skip).limit(limit).all()
 
-def create_reservation(db: Session, reservation: ReservationCreate, facility_id: Optional[int] = None, sync_id: Optional[int] = None):
+def get_reservations_as_of(
+    db: Session,
+    as_of: datetime,
+    skip: int = 0,
+    limit: int = 100,
+    **filters
+) -> List[Dict]:
+    """指定時点の予約一覧を履歴テーブルから取得（削除済み・変更前の内容を含む）"""
+    from ..services.reservation_versions import as_of_filter, version_to_reservation
+    
+    query = db.query(ReservationVersion).filter(as_of_filter(as_of))
+    query = _apply_reservation_filters(query, model=ReservationVersion, **filters)
+    versions = query.offset(skip).limit(limit).all()
+    
+    facility_ids = {version.facility_id for version in versions if version.facility_id}
+    facilities = {
+        facility.id: facility
+        for facility in db.query(Facility).filter(Facility.id.in_(facility_ids)).all()
+    } if facility_ids else {}
+    
+    return [
+        {**version_to_reservation(version), "facility": facilities.get(version.facility_id)}
+        for version in versions
+    ]
+
+# エクスポート対象のカラム（予約テーブルの全カラム + 施設名）
+EXPORT_COLUMNS = [column.name for column in Reservation.__table__.columns] + ["facility_name"]
+
+def iter_reservation_rows(db: Session, batch_size: int = 1000, **filters):
+    """エクスポート用に予約をサーバーサイドカーソルで逐次取得
+    
+    ORMオブジェクトを生成せずカラム値のタプルを返すため、
+    件数に関わらずメモリ使用量は batch_size 分に抑えられる。
+    """
+    columns = [getattr(Reservation, name) for name in EXPORT_COLUMNS[:-1]]
+    query = db.query(*columns, Facility.name.label("facility_name"))\
+        .outerjoin(Facility, Reservation.facility_id == Facility.id)
+    query = _apply_reservation_filters(query, **filters)
+    
+    return query.execution_options(stream_results=True).yield_per(batch_size)
+
+def add_reservation(db: Session, reservation: ReservationCreate, facility_id: Optional[int] = None, sync_id: Optional[int] = None):
+    """予約を追加（派生データへの反映・コミットは呼び出し側で行う）"""
     db_reservation = Reservation(
         **reservation.dict(),
         facility_id=facility_id,
         sync_id=sync_id
     )
     db.add(db_reservation)
+    db.flush()
+    return db_reservation
+
+def create_reservation(db: Session, reservation: ReservationCreate, facility_id: Optional[int] = None, sync_id: Optional[int] = None):
+    db_reservation = add_reservation(db, reservation, facility_id=facility_id, sync_id=sync_id)
+    _apply_changes(db, [db_reservation.id])
     db.commit()
     db.refresh(db_reservation)
     return db_reservation
@@ -75,6 +155,263 @@ def update_reservation(db: Session, reservation_id: str, reservation: Reservatio
         for key, value in reservation.dict(exclude_unset=True).items():
             setattr(db_reservation, key, value)
         db_reservation.updated_at = datetime.utcnow()
+        _apply_changes(db, [db_reservation.id])
         db.commit()
         db.refresh(db_reservation)
-    return db_reservation
\ No newline at end of file
+    return db_reservation
+
+def delete_reservation(db: Session, reservation_id: int) -> bool:
+    """予約を削除（派生データも削除）"""
+    db_reservation = db.query(Reservation).filter(Reservation.id == reservation_id).first()
+    if not db_reservation:
+        return False
+    
+    _apply_changes(db, [db_reservation.id], deleted=True)
+    db.delete(db_reservation)
+    db.commit()
+    return True
+
+def _apply_changes(db: Session, reservation_ids, deleted: bool = False):
+    """予約変更を派生データ（宿泊日テーブル等）に反映"""
+    # services -> crud の循環importを避けるため関数内でimport
+    from ..services.reservation_changes import apply_reservation_changes
+    apply_reservation_changes(db, reservation_ids, deleted=deleted)
+
+def facility_name_from_room_type(room_type: Optional[str]) -> Optional[str]:
+    """部屋タイプ名から施設名を取得（「施設名 - プラン」形式に対応）"""
+    if not room_type:
+        return None
+    return room_type.split(" - ")[0] if " - " in room_type else room_type
+
+def _find_reservations(db: Session, identifiers: Iterable[str]) -> Dict[str, Reservation]:
+    """主キーまたは予約IDのリストから予約をまとめて取得"""
+    identifiers = set(identifiers)
+    numeric_ids = {int(i) for i in identifiers if i.isdigit()}
+    string_ids = {i for i in identifiers if not i.isdigit()}
+    
+    found = {}
+    if numeric_ids:
+        for r in db.query(Reservation).filter(Reservation.id.in_(numeric_ids)).all():
+            found[str(r.id)] = r
+    if string_ids:
+        for r in db.query(Reservation).filter(Reservation.reservation_id.in_(string_ids)).all():
+            found[r.reservation_id] = r
+    return found
+
+def bulk_upsert_reservations(
+    db: Session,
+    reservations: List[ReservationCreate],
+    sync_id: Optional[int] = None
+) -> List[Tuple[str, Reservation]]:
+    """予約をまとめて作成または更新（reservation_idで照合、コミットはしない）
+    
+    Returns:
+        入力と同じ順序の (action, 予約モデル) のリスト。actionは created/updated
+    """
+    if not reservations:
+        return []
+    
+    # 施設をまとめて解決
+    facilities = get_or_create_facilities(
+        db, (facility_name_from_room_type(r.room_type) for r in reservations)
+    )
+    
+    # 既存予約をまとめて取得
+    reservation_ids = {r.reservation_id for r in reservations}
+    existing = {
+        r.reservation_id: r
+        for r in db.query(Reservation).filter(Reservation.reservation_id.in_(reservation_ids)).all()
+    }
+    
+    now = datetime.utcnow()
+    results = []
+    for reservation in reservations:
+        facility = facilities.get(facility_name_from_room_type(reservation.room_type))
+        data = reservation.dict()
+        db_reservation = existing.get(reservation.reservation_id)
+        
+        if db_reservation:
+            for key, value in data.items():
+                setattr(db_reservation, key, value)
+            db_reservation.updated_at = now
+            action = "updated"
+        else:
+            db_reservation = Reservation(**data)
+            db.add(db_reservation)
+            existing[reservation.reservation_id] = db_reservation
+            action = "created"
+        
+        db_reservation.facility_id = facility.id if facility else None
+        if sync_id is not None:
+            db_reservation.sync_id = sync_id
+        results.append((action, db_reservation))
+    
+    db.flush()
+    _apply_changes(db, [r.id for _, r in results])
+    return results
+
+def _batch_result_order(result: Dict) -> Tuple[int, int]:
+    """結果を作成→更新→削除、各リスト内の順序で並べる"""
+    return ({"create": 0, "update": 1, "delete": 2}[result["operation"]], result["index"])
+
+def apply_reservation_batch(db: Session, batch: ReservationBatchRequest) -> Dict:
+    """作成・更新・削除を1トランザクションでまとめて実行
+    
+    入力検証で弾かれた項目はエラーとして結果に記録し、残りを実行する。
+    all_or_nothing の場合はエラーが1件でもあれば何も変更しない。
+    """
+    results = []
+    
+    def add_result(index, operation, status, reservation=None, reservation_id=None, error=None):
+        results.append({
+            "index": index,
+            "operation": operation,
+            "status": status,
+            "id": reservation.id if reservation is not None else None,
+            "reservation_id": reservation.reservation_id if reservation is not None else reservation_id,
+            "error": error
+        })
+    
+    # 作成：同一リクエスト内の予約ID重複を検出
+    valid_creates = []
+    seen_reservation_ids = set()
+    for index, item in enumerate(batch.creates):
+        if item.reservation_id in seen_reservation_ids:
+            add_result(index, "create", "error", reservation_id=item.reservation_id,
+                       error="Duplicate reservation_id in batch")
+            continue
+        seen_reservation_ids.add(item.reservation_id)
+        valid_creates.append((index, item))
+    
+    # 更新・削除の対象をまとめて取得
+    targets = _find_reservations(
+        db, [item.id for item in batch.updates] + list(batch.deletes)
+    )
+    
+    # 作成は予約IDで既存予約に上書きされるため、照合先の予約も取得する
+    create_targets = {}
+    if valid_creates:
+        create_targets = {
+            r.reservation_id: r
+            for r in db.query(Reservation).filter(
+                Reservation.reservation_id.in_({item.reservation_id for _, item in valid_creates})
+            ).all()
+        }
+    
+    # 同じ予約への作成・更新・削除は順序が決まらないため、両方ともエラーにする
+    delete_target_ids = {targets[i].id for i in batch.deletes if i in targets}
+    update_target_ids = {targets[item.id].id for item in batch.updates if item.id in targets}
+    conflicting_ids = delete_target_ids & update_target_ids
+    create_conflicting_ids = (
+        {r.id for r in create_targets.values()} & (delete_target_ids | update_target_ids)
+    )
+    
+    checked_creates = []
+    for index, item in valid_creates:
+        reservation = create_targets.get(item.reservation_id)
+        if reservation is not None and reservation.id in create_conflicting_ids:
+            add_result(index, "create", "error", reservation_id=item.reservation_id,
+                       error="Reservation is also updated or deleted in batch")
+            continue
+        checked_creates.append((index, item))
+    valid_creates = checked_creates
+    
+    valid_updates = []
+    updated_ids = set()
+    for index, item in enumerate(batch.updates):
+        reservation = targets.get(item.id)
+        if not reservation:
+            add_result(index, "update", "error", reservation_id=item.id, error="Reservation not found")
+            continue
+        if reservation.id in conflicting_ids:
+            add_result(index, "update", "error", reservation_id=item.id,
+                       error="Reservation is both updated and deleted in batch")
+            continue
+        if reservation.id in create_conflicting_ids:
+            add_result(index, "update", "error", reservation_id=item.id,
+                       error="Reservation is also created in batch")
+            continue
+        if reservation.id in updated_ids:
+            add_result(index, "update", "error", reservation_id=item.id, error="Duplicate update in batch")
+            continue
+        updated_ids.add(reservation.id)
+        valid_updates.append((index, item, reservation))
+    
+    valid_deletes = []
+    deleted_ids = set()
+    for index, identifier in enumerate(batch.deletes):
+        reservation = targets.get(identifier)
+        if not reservation:
+            add_result(index, "delete", "error", reservation_id=identifier, error="Reservation not found")
+            continue
+        if reservation.id in conflicting_ids:
+            add_result(index, "delete", "error", reservation_id=identifier,
+                       error="Reservation is both updated and deleted in batch")
+            continue
+        if reservation.id in create_conflicting_ids:
+            add_result(index, "delete", "error", reservation_id=identifier,
+                       error="Reservation is also created in batch")
+            continue
+        if reservation.id in deleted_ids:
+            add_result(index, "delete", "error", reservation_id=identifier, error="Duplicate delete in batch")
+            continue
+        deleted_ids.add(reservation.id)
+        valid_deletes.append((index, reservation))
+    
+    error_count = len(results)
+    if error_count and batch.all_or_nothing:
+        db.rollback()
+        return {
+            "success": False,
+            "error_count": error_count,
+            "results": sorted(results, key=_batch_result_order)
+        }
+    
+    # 作成（既存の予約IDは更新として扱う）
+    upserted = bulk_upsert_reservations(db, [item for _, item in valid_creates])
+    created_count = 0
+    updated_count = 0
+    for (index, _), (action, reservation) in zip(valid_creates, upserted):
+        if action == "created":
+            created_count += 1
+        else:
+            updated_count += 1
+        add_result(index, "create", action, reservation)
+    
+    # 更新（部屋タイプが変わった予約は施設を解決し直す）
+    now = datetime.utcnow()
+    room_type_changed = []
+    for index, item, reservation in valid_updates:
+        changes = item.dict(exclude_unset=True, exclude={"id"})
+        if "room_type" in changes and changes["room_type"] != reservation.room_type:
+            room_type_changed.append(reservation)
+        for key, value in changes.items():
+            setattr(reservation, key, value)
+        reservation.updated_at = now
+        updated_count += 1
+        add_result(index, "update", "updated", reservation)
+    if room_type_changed:
+        facilities = get_or_create_facilities(
+            db, (facility_name_from_room_type(r.room_type) for r in room_type_changed)
+        )
+        for reservation in room_type_changed:
+            facility = facilities.get(facility_name_from_room_type(reservation.room_type))
+            reservation.facility_id = facility.id if facility else None
+    _apply_changes(db, [reservation.id for _, _, reservation in valid_updates])
+    
+    # 削除
+    _apply_changes(db, [reservation.id for _, reservation in valid_deletes], deleted=True)
+    for index, reservation in valid_deletes:
+        add_result(index, "delete", "deleted", reservation)
+        db.delete(reservation)
+    
+    db.commit()
+    
+    return {
+        "success": error_count == 0,
+        "created_count": created_count,
+        "updated_count": updated_count,
+        "deleted_count": len(valid_deletes),
+        "error_count": error_count,
+        "results": sorted(results, key=_batch_result_order)
+    }
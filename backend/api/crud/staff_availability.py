@@ -1,15 +1,23 @@
 """スタッフ出勤可能日のCRUD操作"""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import Optional, List, Dict
+from sqlalchemy import and_, insert, update
+from typing import Optional, List, Dict, Any
 from datetime import datetime
 import calendar
+import numpy as np
 
-from ..models.staff_availability import StaffAvailability as StaffAvailabilityModel
+from ..models.cleaning import Staff as StaffModel
+from ..models.staff_availability import (
+    StaffAvailability as StaffAvailabilityModel,
+    ALL_DAYS_MASK,
+    apply_availability_days
+)
+from ..services.staff_schedule import mark_staff_schedule_changed
 from ..schemas.staff_availability import (
     StaffAvailabilityCreate,
-    StaffAvailabilityUpdate
+    StaffAvailabilityUpdate,
+    StaffAvailabilityBulkItem
 )
 
 def get_staff_availability(
@@ -56,11 +64,7 @@ def create_or_update_staff_availability(
     
     if existing:
         # 更新
-        for day, is_available in availability.availability_days.items():
-            day_column = f"day_{day}"
-            if hasattr(existing, day_column):
-                setattr(existing, day_column, is_available)
-        
+        existing.available_days = apply_availability_days(existing.available_days, availability.availability_days)
         existing.updated_at = datetime.utcnow()
         db.commit()
         db.refresh(existing)
@@ -70,15 +74,11 @@ def create_or_update_staff_availability(
         db_availability = StaffAvailabilityModel(
             staff_id=availability.staff_id,
             year=availability.year,
-            month=availability.month
+            month=availability.month,
+            # 各日の設定（指定のない日は出勤可能）
+            available_days=apply_availability_days(ALL_DAYS_MASK, availability.availability_days)
         )
         
-        # 各日の設定
-        for day, is_available in availability.availability_days.items():
-            day_column = f"day_{day}"
-            if hasattr(db_availability, day_column):
-                setattr(db_availability, day_column, is_available)
-        
         db.add(db_availability)
         db.commit()
         db.refresh(db_availability)
@@ -98,10 +98,9 @@ def update_staff_availability(
         return None
     
     # 各日の更新
-    for day, is_available in update_data.availability_days.items():
-        day_column = f"day_{day}"
-        if hasattr(db_availability, day_column):
-            setattr(db_availability, day_column, is_available)
+    db_availability.available_days = apply_availability_days(
+        db_availability.available_days, update_data.availability_days
+    )
     
     db_availability.updated_at = datetime.utcnow()
     db.commit()
@@ -116,16 +115,15 @@ def get_available_staff_for_date(
 ) -> List[int]:
     """特定日に出勤可能なスタッフIDのリストを取得"""
     
-    day_column = f"day_{day}"
-    availabilities = db.query(StaffAvailabilityModel).filter(
+    rows = db.query(StaffAvailabilityModel.staff_id).filter(
         and_(
             StaffAvailabilityModel.year == year,
             StaffAvailabilityModel.month == month,
-            getattr(StaffAvailabilityModel, day_column) == True
+            StaffAvailabilityModel.available_days.bitwise_and(1 << (day - 1)) != 0
         )
     ).all()
     
-    return [avail.staff_id for avail in availabilities]
+    return [row[0] for row in rows]
 
 def convert_model_to_dict(availability: StaffAvailabilityModel) -> Dict:
     """モデルをdictionary形式に変換"""
@@ -133,11 +131,9 @@ def convert_model_to_dict(availability: StaffAvailabilityModel) -> Dict:
     # 該当月の日数を取得
     _, days_in_month = calendar.monthrange(availability.year, availability.month)
     
-    availability_days = {}
-    for day in range(1, days_in_month + 1):
-        day_column = f"day_{day}"
-        if hasattr(availability, day_column):
-            availability_days[day] = getattr(availability, day_column)
+    availability_days = {
+        day: availability.is_available(day) for day in range(1, days_in_month + 1)
+    }
     
     return {
         "id": availability.id,
@@ -171,4 +167,121 @@ def initialize_month_availability(
         availability_days=availability_days
     )
     
-    return create_or_update_staff_availability(db, availability_create)
\ No newline at end of file
+    return create_or_update_staff_availability(db, availability_create)
+
+def get_availability_matrix(db: Session, year: int, month: int) -> Dict[str, Any]:
+    """特定月の有効なスタッフ × 日の出勤可能ビットマップを1回のクエリで取得
+    
+    出勤可能日が未登録のスタッフは全日出勤可能として扱う。
+    """
+    _, days_in_month = calendar.monthrange(year, month)
+    
+    rows = db.query(
+        StaffModel.id,
+        StaffModel.name,
+        StaffAvailabilityModel.available_days
+    ).outerjoin(
+        StaffAvailabilityModel,
+        and_(
+            StaffAvailabilityModel.staff_id == StaffModel.id,
+            StaffAvailabilityModel.year == year,
+            StaffAvailabilityModel.month == month
+        )
+    ).filter(
+        StaffModel.is_active == True
+    ).order_by(StaffModel.id).all()
+    
+    masks = np.array(
+        [ALL_DAYS_MASK if row.available_days is None else row.available_days for row in rows],
+        dtype=np.int64
+    )
+    # 行 = スタッフ、列 = 日（1日から）
+    matrix = (masks[:, None] >> np.arange(days_in_month)) & 1
+    
+    return {
+        "year": year,
+        "month": month,
+        "days_in_month": days_in_month,
+        "staff": [
+            {
+                "staff_id": row.id,
+                "staff_name": row.name,
+                "registered": row.available_days is not None,
+                "mask": int(mask) & ((1 << days_in_month) - 1)
+            }
+            for row, mask in zip(rows, masks)
+        ],
+        "matrix": matrix.astype(np.uint8).tolist(),
+        "available_counts": matrix.sum(axis=0).astype(int).tolist()
+    }
+
+def bulk_upsert_staff_availabilities(
+    db: Session,
+    year: int,
+    month: int,
+    items: List[StaffAvailabilityBulkItem]
+) -> Dict[str, int]:
+    """特定月の複数スタッフの出勤可能日をまとめて作成または更新（1回でコミット）
+    
+    Raises:
+        ValueError: 存在しないスタッフが含まれる場合
+    """
+    # 同じスタッフが複数回指定された場合は順に反映する
+    changes: Dict[int, List[Dict[int, bool]]] = {}
+    for item in items:
+        changes.setdefault(item.staff_id, []).append(item.availability_days)
+    
+    staff_ids = sorted(changes)
+    found = {row[0] for row in db.query(StaffModel.id).filter(StaffModel.id.in_(staff_ids)).all()}
+    missing = [staff_id for staff_id in staff_ids if staff_id not in found]
+    if missing:
+        raise ValueError(f"Staff not found: {missing}")
+    
+    existing = {
+        row.staff_id: row
+        for row in db.query(
+            StaffAvailabilityModel.id,
+            StaffAvailabilityModel.staff_id,
+            StaffAvailabilityModel.available_days
+        ).filter(
+            and_(
+                StaffAvailabilityModel.year == year,
+                StaffAvailabilityModel.month == month,
+                StaffAvailabilityModel.staff_id.in_(staff_ids)
+            )
+        ).all()
+    }
+    
+    now = datetime.utcnow()
+    inserts = []
+    updates = []
+    for staff_id in staff_ids:
+        row = existing.get(staff_id)
+        mask = row.available_days if row else ALL_DAYS_MASK
+        for availability_days in changes[staff_id]:
+            mask = apply_availability_days(mask, availability_days)
+        if row:
+            if mask != row.available_days:
+                updates.append({"id": row.id, "available_days": mask, "updated_at": now})
+        else:
+            inserts.append({
+                "staff_id": staff_id,
+                "year": year,
+                "month": month,
+                "available_days": mask,
+                "created_at": now,
+                "updated_at": now
+            })
+    
+    if inserts:
+        db.execute(insert(StaffAvailabilityModel), inserts)
+    if updates:
+        db.execute(update(StaffAvailabilityModel), updates)
+    mark_staff_schedule_changed(db, staff_ids)
+    db.commit()
+    
+    return {
+        "created": len(inserts),
+        "updated": len(updates),
+        "unchanged": len(existing) - len(updates)
+    }
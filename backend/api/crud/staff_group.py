@@ -14,6 +14,7 @@ from ..models.cleaning import (
     TaskStatus,
     ShiftStatus
 )
+from ..services.facility_eligibility import get_eligible_group_ids
 from ..schemas.staff_group import (
     StaffGroupCreate, StaffGroupUpdate,
     AddGroupMembers, RemoveGroupMembers,
@@ -43,12 +44,10 @@ def get_staff_groups(
         query = query.filter(StaffGroupModel.is_active == is_active)
     
     if facility_id is not None:
-        # JSONフィールドの検索
-        query = query.filter(
-            StaffGroupModel.available_facilities.contains([facility_id])
-        )
+        # 対応可能施設インデックスで絞り込み（未登録のグループは全施設対応）
+        query = query.filter(StaffGroupModel.id.in_(get_eligible_group_ids(db, facility_id)))
     
-    return query.offset(skip).limit(limit).all()
+    return query.order_by(StaffGroupModel.id).offset(skip).limit(limit).all()
 
 def create_staff_group(db: Session, group: StaffGroupCreate) -> StaffGroupModel:
     """スタッフグループ作成"""
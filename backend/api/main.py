@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pathlib import Path
+from contextlib import asynccontextmanager
 import logging
 import os
 import json
@@ -17,12 +18,54 @@ logger = logging.getLogger(__name__)
 # データベーステーブルの作成
 Base.metadata.create_all(bind=engine)
 
+def _needs_backfill(table_id, source_id):
+    """派生テーブルが空で、元になるテーブルにデータがあるか"""
+    return lambda db: db.query(table_id).first() is None and db.query(source_id).first() is not None
+
+def _run_backfills():
+    """マイグレーションを経由せず作成された既存DBの派生テーブルに初期データを投入
+
+    (名前, 要否の判定, 投入処理) の順に実行し、失敗した処理はログに残して次に進む。
+    """
+    from .database import SessionLocal
+    from .models import Reservation, ReservationNight, RevenueCube, ReservationVersion
+    from .services.reservation_nights import rebuild_all_reservation_nights
+    from .services.revenue_cube import rebuild_revenue_cube
+    from .services.reservation_versions import initialize_reservation_versions
+    from .services.facility_eligibility import copy_legacy_facility_links
+
+    backfills = [
+        ("reservation_nights", _needs_backfill(ReservationNight.id, Reservation.id), rebuild_all_reservation_nights),
+        ("revenue_cube", _needs_backfill(RevenueCube.id, ReservationNight.id), rebuild_revenue_cube),
+        ("reservation_versions", _needs_backfill(ReservationVersion.id, Reservation.id), initialize_reservation_versions),
+        # 旧形式（JSON配列）の対応可能施設が残っていれば対応可能施設テーブルに移す
+        ("facility links", lambda db: True, copy_legacy_facility_links),
+    ]
+    for name, needs_backfill, backfill in backfills:
+        db = SessionLocal()
+        try:
+            if needs_backfill(db):
+                backfill(db)
+                db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to backfill {name}: {e}")
+        finally:
+            db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 初期データの投入はimport時ではなくアプリケーションの起動時に行う
+    _run_backfills()
+    yield
+
 # FastAPIアプリケーション
 app = FastAPI(
     title="Vacation Rental PMS",
     description="一棟貸の貸別荘に特化したPMSシステム",
     version="1.0.0",
-    default_response_class=JSONResponse
+    default_response_class=JSONResponse,
+    lifespan=lifespan
 )
 
 # CORS設定
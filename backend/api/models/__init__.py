@@ -2,6 +2,11 @@ from ..database import Base
 from .reservation import Reservation
 from .property import Facility
 from .sync_log import SyncLog
+from .reservation_night import ReservationNight
+from .revenue_cube import RevenueCube
+from .reservation_version import ReservationVersion
+from .booking_issue import BookingIssue
+from .cleaning_alert import CleaningAlert
 from .cleaning import (
     Staff, 
     CleaningTask, 
@@ -16,6 +21,11 @@ __all__ = [
     "Reservation", 
     "Facility", 
     "SyncLog",
+    "ReservationNight",
+    "RevenueCube",
+    "ReservationVersion",
+    "BookingIssue",
+    "CleaningAlert",
     "Staff",
     "CleaningTask",
     "CleaningShift",
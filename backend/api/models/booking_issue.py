@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+class BookingIssue(Base):
+    """予約の重複・孤立泊の検出結果
+    
+    検出のたびに全件作り直す（本日以降の予約が対象）。
+    - double_booking: 同一施設で宿泊期間が重なる予約の組（start_date〜end_date は重なる期間）
+    - orphan_gap: 同一施設の予約間に残った短い空き（start_date〜end_date は空いている期間）
+    """
+    __tablename__ = "booking_issues"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    issue_type = Column(String(20), nullable=False)  # double_booking/orphan_gap
+    facility_id = Column(Integer, ForeignKey("facilities.id"), nullable=False)
+    
+    # 対象の予約（重複は重なる2件、孤立泊は前後の2件）
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False)
+    other_reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False)
+    
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)  # この日を含まない
+    nights = Column(Integer, nullable=False)
+    
+    detected_at = Column(DateTime, default=datetime.utcnow)
+    sync_id = Column(Integer, ForeignKey("sync_logs.id"))  # 検出のきっかけになった同期
+    
+    __table_args__ = (
+        Index('ix_booking_issues_type_start', 'issue_type', 'start_date'),
+        Index('ix_booking_issues_facility', 'facility_id'),
+    )
@@ -1,6 +1,7 @@
 from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, Boolean, ForeignKey, Time, JSON, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime, date
+from typing import List, Optional
 import enum
 from ..database import Base
 
@@ -35,9 +36,6 @@ class StaffGroup(Base):
     can_handle_multiple_properties = Column(Boolean, default=True)  # 複数物件同時対応可能
     max_properties_per_day = Column(Integer, default=1)  # 1日の最大物件数
     
-    # 対応可能施設（JSON配列でfacility_idのリストを保存）
-    available_facilities = Column(JSON, default=list)
-    
     # 報酬設定（グループ全体への支払い）
     rate_per_property = Column(Float, default=8000)  # 1棟あたりの基本報酬
     rate_per_property_with_option = Column(Float, default=9000)  # オプション付き1棟あたりの報酬
@@ -54,6 +52,18 @@ class StaffGroup(Base):
     # リレーション
     members = relationship("StaffGroupMember", back_populates="group", cascade="all, delete-orphan")
     shifts = relationship("CleaningShift", back_populates="group")
+    facility_links = relationship(
+        "GroupFacility", cascade="all, delete-orphan", lazy="selectin", order_by="GroupFacility.facility_id"
+    )
+    
+    # 対応可能施設（facility_idのリスト。未登録は全施設対応）
+    @property
+    def available_facilities(self) -> List[int]:
+        return [link.facility_id for link in self.facility_links]
+    
+    @available_facilities.setter
+    def available_facilities(self, facility_ids: Optional[List[int]]):
+        self.facility_links = _replace_facility_links(self.facility_links, facility_ids, GroupFacility)
 
 class StaffGroupMember(Base):
     """スタッフグループメンバーテーブル"""
@@ -94,9 +104,6 @@ class Staff(Base):
     can_drive = Column(Boolean, default=False)  # 運転可能か
     has_car = Column(Boolean, default=False)  # 車保有か
     
-    # 対応可能施設（JSON配列でfacility_idのリストを保存）
-    available_facilities = Column(JSON, default=list)
-    
     # 稼働可能情報（JSON形式で曜日・時間帯を保存）
     # 例: {"monday": {"start": "09:00", "end": "18:00"}, ...}
     available_schedule = Column(JSON, default=dict)
@@ -118,6 +125,40 @@ class Staff(Base):
     shifts = relationship("CleaningShift", back_populates="staff", overlaps="tasks,assigned_staff")
     tasks = relationship("CleaningTask", secondary="cleaning_shifts", back_populates="assigned_staff", overlaps="shifts")
     group_memberships = relationship("StaffGroupMember", back_populates="staff")
+    facility_links = relationship(
+        "StaffFacility", cascade="all, delete-orphan", lazy="selectin", order_by="StaffFacility.facility_id"
+    )
+    
+    # 対応可能施設（facility_idのリスト。未登録は全施設対応）
+    @property
+    def available_facilities(self) -> List[int]:
+        return [link.facility_id for link in self.facility_links]
+    
+    @available_facilities.setter
+    def available_facilities(self, facility_ids: Optional[List[int]]):
+        self.facility_links = _replace_facility_links(self.facility_links, facility_ids, StaffFacility)
+
+class StaffFacility(Base):
+    """スタッフ対応可能施設テーブル"""
+    __tablename__ = "staff_facilities"
+    
+    staff_id = Column(Integer, ForeignKey("cleaning_staff.id", ondelete="CASCADE"), primary_key=True)
+    facility_id = Column(Integer, ForeignKey("facilities.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+class GroupFacility(Base):
+    """スタッフグループ対応可能施設テーブル"""
+    __tablename__ = "group_facilities"
+    
+    group_id = Column(Integer, ForeignKey("cleaning_staff_groups.id", ondelete="CASCADE"), primary_key=True)
+    facility_id = Column(Integer, ForeignKey("facilities.id", ondelete="CASCADE"), primary_key=True, index=True)
+
+def _replace_facility_links(links, facility_ids, link_class):
+    """対応可能施設の関連行を facility_ids に合わせる（変わらない施設の行はそのまま使う）"""
+    existing = {link.facility_id: link for link in links}
+    return [
+        existing.get(facility_id) or link_class(facility_id=facility_id)
+        for facility_id in dict.fromkeys(int(i) for i in facility_ids or [])
+    ]
 
 class CleaningTask(Base):
     """清掃タスクテーブル"""
@@ -261,4 +302,18 @@ class FacilityCleaningSettings(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # リレーション
-    facility = relationship("Facility", backref="cleaning_settings", uselist=False)
\ No newline at end of file
+    facility = relationship("Facility", backref="cleaning_settings", uselist=False)
+
+class CleaningSyncState(Base):
+    """清掃タスク同期の処理済み位置（1行のみ）
+
+    前回の同期で処理した予約の最終更新日時（ハイウォーターマーク）を保持し、
+    次回はそれ以降に更新された予約だけを処理する。
+    """
+    __tablename__ = "cleaning_sync_state"
+    
+    id = Column(Integer, primary_key=True)
+    last_reservation_updated_at = Column(DateTime)  # 処理済みの予約の最終更新日時
+    last_sync_id = Column(Integer, ForeignKey("sync_logs.id"))  # 前回のきっかけになったCSV同期
+    last_run_at = Column(DateTime)
+    last_full_sync_at = Column(DateTime)  # 全件同期した日時
@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Text, JSON, ForeignKey, Index
+from datetime import datetime
+from ..database import Base
+
+# アラートの状態
+ALERT_OPEN = "open"  # 未確認
+ALERT_ACKNOWLEDGED = "acknowledged"  # 確認済み
+
+class CleaningAlert(Base):
+    """清掃タスク同期のアラート
+    
+    同じ種類・同じ対象（タスク、タスク作成前は予約）のアラートは dedupe_key で1行にまとめ、
+    再検出のたびに最終検出日時と検出回数を更新する。内容が変わった場合は未確認に戻す。
+    - status: open（未確認）/acknowledged（確認済み）
+    - alert_date: 対象の清掃予定日（チェックアウト日）
+    """
+    __tablename__ = "cleaning_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    alert_type = Column(String(30), nullable=False)  # task_created/task_cancelled/task_modified/conflict_detected/staff_reassign_needed
+    dedupe_key = Column(String(100), nullable=False, unique=True)  # 種類 + 対象
+    
+    # 対象
+    task_id = Column(Integer, ForeignKey("cleaning_tasks.id"))
+    reservation_id = Column(Integer)  # 予約は削除されることがあるため外部キーにしない
+    alert_date = Column(Date)
+    
+    message = Column(Text, nullable=False)
+    details = Column(JSON)
+    
+    status = Column(String(20), nullable=False, default=ALERT_OPEN)
+    occurrences = Column(Integer, nullable=False, default=1)  # 検出回数
+    first_detected_at = Column(DateTime, default=datetime.utcnow)
+    last_detected_at = Column(DateTime, default=datetime.utcnow)
+    acknowledged_at = Column(DateTime)
+    acknowledged_by = Column(String(100))
+    sync_id = Column(Integer, ForeignKey("sync_logs.id"))  # 最後に検出したCSV同期
+    
+    __table_args__ = (
+        Index('ix_cleaning_alerts_status_date', 'status', 'alert_date'),
+        Index('ix_cleaning_alerts_type_status', 'alert_type', 'status'),
+    )
@@ -3,6 +3,9 @@ from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..database import Base
 
+# キャンセル済みの予約区分
+CANCELLED_TYPE = "キャンセル"
+
 class Reservation(Base):
     __tablename__ = "reservations"
     
@@ -77,7 +80,7 @@ class Reservation(Base):
     
     # メタデータ
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)  # 清掃タスク同期の差分取得に使う
     sync_id = Column(Integer, ForeignKey("sync_logs.id"))
     
     # リレーション
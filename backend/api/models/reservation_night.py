@@ -0,0 +1,33 @@
+from sqlalchemy import Column, Integer, String, Date, Float, ForeignKey, Index, UniqueConstraint
+from ..database import Base
+
+class ReservationNight(Base):
+    """宿泊日単位の予約ファクトテーブル（1予約×1泊 = 1行）
+    
+    予約の作成・変更・キャンセル時に差分更新され、稼働率・ADR・RevPARなどの
+    期間集計を日付範囲の重なり計算なしで GROUP BY できるようにする。
+    """
+    __tablename__ = "reservation_nights"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_id = Column(Integer, ForeignKey("reservations.id"), nullable=False, index=True)
+    facility_id = Column(Integer, ForeignKey("facilities.id"))
+    stay_date = Column(Date, nullable=False)  # 宿泊日（チェックイン日〜チェックアウト前日）
+    
+    # 集計用に予約から複製する項目
+    ota_name = Column(String(100))
+    ota_type = Column(String(50))
+    num_adults = Column(Integer, default=0)
+    num_children = Column(Integer, default=0)
+    num_infants = Column(Integer, default=0)
+    
+    # 1泊あたりに按分した金額（売上・オプション・ポイント）
+    revenue = Column(Float, default=0)
+    option_amount = Column(Float, default=0)
+    point_amount = Column(Float, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint('reservation_id', 'stay_date', name='_reservation_night_uc'),
+        Index('ix_reservation_nights_facility_stay_date', 'facility_id', 'stay_date'),
+        Index('ix_reservation_nights_stay_date', 'stay_date'),
+    )
@@ -0,0 +1,44 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Text, ForeignKey, Index
+from ..database import Base
+
+class ReservationVersion(Base):
+    """予約の履歴テーブル（内容が変わるたびに1行、有効期間 valid_from〜valid_to）
+    
+    valid_to が NULL の行が現在の内容。予約の削除時は valid_to を設定して閉じる。
+    任意の時点（as_of）の予約台帳は valid_from <= as_of < valid_to の行で再現できる。
+    """
+    __tablename__ = "reservation_versions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    reservation_pk = Column(Integer, nullable=False)  # reservations.id（削除後も履歴を残すため外部キーにしない）
+    
+    # 有効期間（UTC）
+    valid_from = Column(DateTime, nullable=False)
+    valid_to = Column(DateTime)
+    
+    content_hash = Column(String(64), nullable=False)  # 内容カラムのハッシュ（変更検知用）
+    sync_id = Column(Integer, ForeignKey("sync_logs.id"))
+    
+    # 検索・集計に使う項目（予約テーブルと同名）
+    reservation_id = Column(String(50))
+    reservation_type = Column(String(20))
+    ota_name = Column(String(100))
+    ota_type = Column(String(50))
+    facility_id = Column(Integer, ForeignKey("facilities.id"))
+    room_type = Column(String(100))
+    check_in_date = Column(Date)
+    check_out_date = Column(Date)
+    guest_name = Column(String(100))
+    num_adults = Column(Integer)
+    num_children = Column(Integer)
+    num_infants = Column(Integer)
+    total_amount = Column(Float)
+    
+    # 予約の全内容（JSON）
+    data = Column(Text, nullable=False)
+    
+    __table_args__ = (
+        Index('ix_reservation_versions_current', 'reservation_pk', 'valid_to'),
+        Index('ix_reservation_versions_validity', 'valid_from', 'valid_to'),
+        Index('ix_reservation_versions_stay', 'check_in_date', 'check_out_date'),
+    )
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from ..database import Base
+
+class RevenueCube(Base):
+    """OTA×施設×月の売上集計テーブル
+    
+    宿泊日テーブルを (宿泊月, 施設, OTA種別, OTA名) で集計したもの。
+    予約変更時に影響する月だけ再集計され、任意の軸でのピボット表示に使う。
+    """
+    __tablename__ = "revenue_cube"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    year_month = Column(String(7), nullable=False)  # 宿泊月（YYYY-MM）
+    facility_id = Column(Integer, ForeignKey("facilities.id"))
+    ota_type = Column(String(50))
+    ota_name = Column(String(100))
+    
+    reservations = Column(Integer, default=0)  # 当月に宿泊日を含む予約数
+    nights = Column(Integer, default=0)  # 当月の延べ宿泊数
+    revenue = Column(Float, default=0)  # 当月に按分された売上
+    guests = Column(Integer, default=0)  # 予約ごとの宿泊者数の合計
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint('year_month', 'facility_id', 'ota_type', 'ota_name', name='_revenue_cube_uc'),
+        Index('ix_revenue_cube_year_month', 'year_month'),
+    )
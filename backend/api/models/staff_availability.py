@@ -1,10 +1,24 @@
 """スタッフ出勤可能日管理モデル"""
 
-from sqlalchemy import Column, Integer, String, Date, Boolean, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, Date, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Dict
 from ..database import Base
 
+# 1-31日すべて出勤可能
+ALL_DAYS_MASK = (1 << 31) - 1
+
+def apply_availability_days(mask: int, availability_days: Dict[int, bool]) -> int:
+    """{日: 出勤可否} をビットマスクに反映（1-31日以外は無視）"""
+    for day, is_available in availability_days.items():
+        if 1 <= day <= 31:
+            if is_available:
+                mask |= 1 << (day - 1)
+            else:
+                mask &= ~(1 << (day - 1))
+    return mask
+
 class StaffAvailability(Base):
     """スタッフ月別出勤可能日テーブル"""
     __tablename__ = "staff_availability"
@@ -14,43 +28,17 @@ class StaffAvailability(Base):
     year = Column(Integer, nullable=False)
     month = Column(Integer, nullable=False)
     
-    # 各日の出勤可否（1-31日）
-    day_1 = Column(Boolean, default=True)
-    day_2 = Column(Boolean, default=True)
-    day_3 = Column(Boolean, default=True)
-    day_4 = Column(Boolean, default=True)
-    day_5 = Column(Boolean, default=True)
-    day_6 = Column(Boolean, default=True)
-    day_7 = Column(Boolean, default=True)
-    day_8 = Column(Boolean, default=True)
-    day_9 = Column(Boolean, default=True)
-    day_10 = Column(Boolean, default=True)
-    day_11 = Column(Boolean, default=True)
-    day_12 = Column(Boolean, default=True)
-    day_13 = Column(Boolean, default=True)
-    day_14 = Column(Boolean, default=True)
-    day_15 = Column(Boolean, default=True)
-    day_16 = Column(Boolean, default=True)
-    day_17 = Column(Boolean, default=True)
-    day_18 = Column(Boolean, default=True)
-    day_19 = Column(Boolean, default=True)
-    day_20 = Column(Boolean, default=True)
-    day_21 = Column(Boolean, default=True)
-    day_22 = Column(Boolean, default=True)
-    day_23 = Column(Boolean, default=True)
-    day_24 = Column(Boolean, default=True)
-    day_25 = Column(Boolean, default=True)
-    day_26 = Column(Boolean, default=True)
-    day_27 = Column(Boolean, default=True)
-    day_28 = Column(Boolean, default=True)
-    day_29 = Column(Boolean, default=True)
-    day_30 = Column(Boolean, default=True)
-    day_31 = Column(Boolean, default=True)
+    # 各日の出勤可否（ビットi = i+1日、1なら出勤可能）
+    available_days = Column(Integer, nullable=False, default=ALL_DAYS_MASK)
     
     # メタデータ
     created_at = Column(Date, default=datetime.utcnow)
     updated_at = Column(Date, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    def is_available(self, day: int) -> bool:
+        """その日に出勤可能か"""
+        return bool(self.available_days >> (day - 1) & 1)
+    
     # リレーション
     staff = relationship("Staff", backref="availability_records")
     
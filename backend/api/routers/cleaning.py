@@ -13,20 +13,26 @@ from ..schemas.cleaning import (
     CleaningTask, CleaningTaskCreate, CleaningTaskUpdate,
     # CleaningShift
     CleaningShift, CleaningShiftCreate, CleaningShiftUpdate,
+    CleaningShiftBatchCreate, CleaningShiftBatchResponse,
     # FacilityCleaningSettings
     FacilityCleaningSettings, FacilityCleaningSettingsCreate, FacilityCleaningSettingsUpdate,
     # Dashboard
     CleaningDashboardStats, StaffPerformance, StaffMonthlyStats,
     TaskAutoAssignRequest, TaskAutoAssignResponse,
+    # Alerts
+    CleaningAlertList, CleaningAlertAcknowledge,
     # Enums
     TaskStatus, ShiftStatus
 )
 from ..crud import cleaning as crud
 from ..crud import staff_availability as availability_crud
+from ..crud import cleaning_alert as alert_crud
 from ..schemas.staff_availability import (
-    StaffAvailability, StaffAvailabilityCreate, StaffAvailabilityUpdate
+    StaffAvailability, StaffAvailabilityCreate, StaffAvailabilityUpdate,
+    StaffAvailabilityBulkUpsert, StaffAvailabilityMatrix
 )
 from ..services.cleaning_sync import CleaningSyncService
+from ..services.cleaning_assignment import build_assignment_plan, apply_assignment_plan
 
 router = APIRouter(prefix="/api/cleaning", tags=["cleaning"])
 
@@ -195,6 +201,17 @@ def get_tasks_for_calendar(
         "facilities": [{"id": f.id, "name": f.name} for f in facilities]
     }
 
+# /tasks/{task_id} より前に定義する（パスがtask_idとして解釈されないように）
+@router.get("/tasks/sync-preview")
+def preview_sync_cleaning_tasks(
+    full: bool = Query(False, description="前回の同期位置を使わずに今日以降の全予約を対象にする"),
+    db: Session = Depends(get_db)
+):
+    """同期のプレビュー（読み取りのみで差分とアラートを計算し、実際の変更は行わない）"""
+    sync_service = CleaningSyncService(db)
+    result = sync_service.get_sync_preview(full=full)
+    return result
+
 @router.get("/tasks/{task_id}", response_model=CleaningTask)
 def get_cleaning_task(
     task_id: int = Path(..., ge=1),
@@ -259,14 +276,23 @@ def update_task_status(
 
 @router.post("/tasks/auto-create")
 def auto_create_tasks(
-    checkout_date: date = Query(...),
+    start: Optional[date] = Query(None, description="チェックアウト日の開始"),
+    end: Optional[date] = Query(None, description="チェックアウト日の終了（省略時は開始日のみ）"),
+    checkout_date: Optional[date] = Query(None, description="1日分だけ生成する場合のチェックアウト日"),
     db: Session = Depends(get_db)
 ):
-    """チェックアウト日から清掃タスクを自動生成"""
-    created_tasks = crud.auto_create_cleaning_tasks(db, checkout_date)
+    """チェックアウト日（期間）から清掃タスクを自動生成"""
+    start = start or checkout_date
+    end = end or start
+    if start is None:
+        raise HTTPException(status_code=400, detail="start or checkout_date is required")
+    if end < start:
+        raise HTTPException(status_code=400, detail="end must be on or after start")
+    
+    result = crud.auto_create_cleaning_tasks_for_range(db, start, end)
     return {
-        "message": f"{len(created_tasks)} tasks created",
-        "task_ids": [task.id for task in created_tasks]
+        "message": f"{result['created']} tasks created",
+        **result
     }
 
 # ========== シフト管理 ==========
@@ -337,6 +363,38 @@ def create_cleaning_shift(
     
     return crud.create_cleaning_shift(db, shift)
 
+@router.post("/shifts/batch", response_model=CleaningShiftBatchResponse)
+def create_cleaning_shifts_batch(
+    request: CleaningShiftBatchCreate,
+    db: Session = Depends(get_db)
+):
+    """シフト一括作成（複数のスタッフ・タスクの割当をまとめて登録）
+    
+    タスクごとの報酬の等分を一度に再計算し、1回のコミットで登録する。
+    いずれかの割当が不正な場合は何も登録しない。
+    """
+    for shift in request.shifts:
+        if shift.staff_id is None:
+            raise HTTPException(status_code=400, detail="staff_id is required")
+    
+    try:
+        shifts = crud.create_cleaning_shifts_batch(db, request.shifts)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # リレーション情報を追加
+    for shift in shifts:
+        if shift.staff:
+            shift.staff_name = shift.staff.name
+        if shift.task and shift.task.facility:
+            shift.facility_name = shift.task.facility.name
+    
+    return {
+        "created_count": len(shifts),
+        "task_count": len({shift.task_id for shift in shifts}),
+        "shifts": shifts
+    }
+
 @router.put("/shifts/{shift_id}", response_model=CleaningShift)
 def update_cleaning_shift(
     shift_id: int = Path(..., ge=1),
@@ -470,114 +528,20 @@ def get_staff_monthly_stats(
     
     指定月のスタッフごとの出勤日数、担当棟数を集計
     """
-    from ..models.cleaning import Staff as StaffModel, CleaningShift as ShiftModel, StaffGroupMember, CleaningTask as TaskModel
-    from sqlalchemy import func, and_, extract
-    from datetime import datetime, date
-    import calendar
-    
-    # 月の開始日と終了日を計算
-    _, last_day = calendar.monthrange(year, month)
-    start_date = date(year, month, 1)
-    end_date = date(year, month, last_day)
-    
-    # アクティブなスタッフを取得
-    staff_list = db.query(StaffModel).filter(StaffModel.is_active == True).all()
-    
-    stats = []
-    for staff in staff_list:
-        # 個人割当のシフトを取得
-        individual_shifts = db.query(ShiftModel).filter(
-            and_(
-                ShiftModel.staff_id == staff.id,
-                ShiftModel.assigned_date >= start_date,
-                ShiftModel.assigned_date <= end_date,
-                ShiftModel.status != "cancelled"
-            )
-        ).all()
-        
-        # グループ割当のシフトを取得（スタッフが所属するグループ経由）
-        group_shifts = db.query(ShiftModel).join(
-            StaffGroupMember,
-            and_(
-                ShiftModel.group_id == StaffGroupMember.group_id,
-                StaffGroupMember.staff_id == staff.id,
-                StaffGroupMember.left_date.is_(None)
-            )
-        ).filter(
-            and_(
-                ShiftModel.assigned_date >= start_date,
-                ShiftModel.assigned_date <= end_date,
-                ShiftModel.status != "cancelled"
-            )
-        ).all()
-        
-        # 出勤日を集計
-        dates_worked = set()
-        individual_task_count = 0
-        group_task_count = 0
-        total_hours = 0.0
-        
-        for shift in individual_shifts:
-            dates_worked.add(shift.assigned_date)
-            individual_task_count += 1
-            # タスクから推定時間を取得
-            task = db.query(TaskModel).filter(TaskModel.id == shift.task_id).first()
-            if task:
-                total_hours += (task.estimated_duration_minutes or 300) / 60.0
-        
-        for shift in group_shifts:
-            dates_worked.add(shift.assigned_date)
-            group_task_count += 1
-            # グループタスクの場合は時間を按分
-            task = db.query(TaskModel).filter(TaskModel.id == shift.task_id).first()
-            if task:
-                # グループメンバー数で按分
-                group_member_count = db.query(func.count(StaffGroupMember.id)).filter(
-                    and_(
-                        StaffGroupMember.group_id == shift.group_id,
-                        StaffGroupMember.left_date.is_(None)
-                    )
-                ).scalar() or 1
-                total_hours += ((task.estimated_duration_minutes or 300) / 60.0) / group_member_count
-        
-        stats.append(StaffMonthlyStats(
-            staff_id=staff.id,
-            staff_name=staff.name,
-            year=year,
-            month=month,
-            working_days=len(dates_worked),
-            total_tasks=individual_task_count + group_task_count,
-            individual_tasks=individual_task_count,
-            group_tasks=group_task_count,
-            total_hours=round(total_hours, 1),
-            dates_worked=sorted(list(dates_worked))
-        ))
-    
-    # 出勤日数でソート（降順）
-    stats.sort(key=lambda x: x.working_days, reverse=True)
-    
-    return stats
+    return crud.get_staff_monthly_stats(db, year, month)
 
 @router.post("/tasks/sync-all")
 def sync_all_cleaning_tasks(
+    full: bool = Query(False, description="前回の同期位置を使わずに今日以降の全予約を同期"),
     db: Session = Depends(get_db)
 ):
-    """全清掃タスクを最新の予約データと同期
+    """清掃タスクを最新の予約データと同期
     
-    新規予約の追加、キャンセル検知、変更検知を行い、
-    割当済みタスクへの影響がある場合はアラートを生成する
+    前回の同期以降に更新された予約について新規予約の追加、キャンセル検知、変更検知を行い、
+    割当済みタスクへの影響がある場合はアラートを生成する（CSV同期の後にも自動で実行される）
     """
     sync_service = CleaningSyncService(db)
-    result = sync_service.sync_all_tasks()
-    return result
-
-@router.get("/tasks/sync-preview")
-def preview_sync_cleaning_tasks(
-    db: Session = Depends(get_db)
-):
-    """同期のプレビュー（実際の変更は行わない）"""
-    sync_service = CleaningSyncService(db)
-    result = sync_service.get_sync_preview()
+    result = sync_service.sync_all_tasks(full=full)
     return result
 
 @router.post("/tasks/auto-assign", response_model=TaskAutoAssignResponse)
@@ -585,66 +549,53 @@ def auto_assign_tasks(
     request: TaskAutoAssignRequest,
     db: Session = Depends(get_db)
 ):
-    """タスク自動割当（簡易版）"""
-    # TODO: 実装する自動割当アルゴリズム
-    # 現在は簡易的な実装
-    
-    assigned_count = 0
-    failed_count = 0
-    assignments = []
-    errors = []
-    
-    for task_id in request.task_ids:
-        task = crud.get_cleaning_task(db, task_id)
-        if not task:
-            failed_count += 1
-            errors.append(f"Task {task_id} not found")
-            continue
-        
-        if task.status != TaskStatus.UNASSIGNED:
-            failed_count += 1
-            errors.append(f"Task {task_id} is already assigned")
-            continue
-        
-        # 利用可能なスタッフを探す（簡易版）
-        available_staff = crud.get_staff_list(db, is_active=True, facility_id=task.facility_id)
-        
-        if not available_staff:
-            failed_count += 1
-            errors.append(f"No available staff for task {task_id}")
-            continue
-        
-        # 最初のスタッフに割り当て（簡易版）
-        staff = available_staff[0]
-        
-        shift_create = CleaningShiftCreate(
-            staff_id=staff.id,
-            task_id=task.id,
-            assigned_date=request.date,
-            scheduled_start_time=task.scheduled_start_time or "11:00",
-            scheduled_end_time=task.scheduled_end_time or "16:00",
-            created_by="auto_assign"
-        )
-        
+    """タスク自動割当
+
+    対象タスクを清掃予定日ごとに、対応可能施設・出勤可能日・1日の受け持ち上限・既存シフトを
+    制約とする最小コスト割当で一括して割り当てる。
+    """
+    start_date = request.start_date or request.target_date
+    end_date = request.end_date or start_date
+    if not request.task_ids:
+        if start_date is None:
+            raise HTTPException(status_code=400, detail="task_ids or date range is required")
+        if end_date < start_date:
+            raise HTTPException(status_code=400, detail="end_date must be on or after start_date")
+
+    plan = build_assignment_plan(
+        db,
+        task_ids=request.task_ids or None,
+        start_date=start_date,
+        end_date=end_date,
+        consider_skills=request.consider_skills,
+        consider_availability=request.consider_availability
+    )
+
+    assignments = plan["assignments"]
+    if not request.dry_run and assignments:
         try:
-            shift = crud.create_cleaning_shift(db, shift_create)
-            assigned_count += 1
-            assignments.append({
-                "task_id": task.id,
-                "staff_id": staff.id,
-                "staff_name": staff.name,
-                "shift_id": shift.id
-            })
+            shifts = apply_assignment_plan(db, plan)
+            db.commit()
         except Exception as e:
-            failed_count += 1
-            errors.append(f"Failed to assign task {task_id}: {str(e)}")
-    
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Failed to assign tasks: {str(e)}")
+        for assignment, shift in zip(assignments, shifts):
+            assignment["shift_id"] = shift.id
+
+    errors = [
+        f"Task {item['task_id']}: {item['reason']}"
+        for item in plan["unassigned"]
+    ]
+
     return TaskAutoAssignResponse(
-        success=assigned_count > 0,
-        assigned_count=assigned_count,
-        failed_count=failed_count,
+        success=len(assignments) > 0,
+        assigned_count=len(assignments),
+        failed_count=len(plan["unassigned"]),
         assignments=assignments,
-        errors=errors
+        unassigned=plan["unassigned"],
+        errors=errors,
+        dry_run=request.dry_run,
+        solve_ms=plan["solve_ms"]
     )
 
 # ========== スタッフ出勤可能日管理 ==========
@@ -708,6 +659,28 @@ def get_monthly_availability(
     availabilities = availability_crud.get_staff_availabilities_by_month(db, year, month)
     return [availability_crud.convert_model_to_dict(a) for a in availabilities]
 
+@router.put("/availability/{year}/{month}")
+def bulk_upsert_monthly_availability(
+    year: int = Path(..., ge=2020, le=2100),
+    month: int = Path(..., ge=1, le=12),
+    request: StaffAvailabilityBulkUpsert = ...,
+    db: Session = Depends(get_db)
+):
+    """特定月の複数スタッフの出勤可能日をまとめて作成または更新"""
+    try:
+        return availability_crud.bulk_upsert_staff_availabilities(db, year, month, request.items)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/availability/{year}/{month}/matrix", response_model=StaffAvailabilityMatrix)
+def get_monthly_availability_matrix(
+    year: int = Path(..., ge=2020, le=2100),
+    month: int = Path(..., ge=1, le=12),
+    db: Session = Depends(get_db)
+):
+    """特定月の有効なスタッフ × 日の出勤可能ビットマップを取得"""
+    return availability_crud.get_availability_matrix(db, year, month)
+
 @router.get("/availability/{year}/{month}/{day}/staff", response_model=List[int])
 def get_available_staff_for_date(
     year: int = Path(..., ge=2020, le=2100),
@@ -717,4 +690,35 @@ def get_available_staff_for_date(
 ):
     """特定日に出勤可能なスタッフIDリストを取得"""
     staff_ids = availability_crud.get_available_staff_for_date(db, year, month, day)
-    return staff_ids
\ No newline at end of file
+    return staff_ids
+
+# ========== 同期アラート ==========
+
+@router.get("/alerts", response_model=CleaningAlertList)
+def list_cleaning_alerts(
+    status: str = Query("open", pattern="^(open|acknowledged|all)$"),
+    alert_type: Optional[str] = Query(None),
+    start_date: Optional[date] = Query(None, description="対象日（清掃予定日）の開始"),
+    end_date: Optional[date] = Query(None, description="対象日（清掃予定日）の終了"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """清掃タスク同期で保存したアラートを取得（同期は実行しない）"""
+    filters = {"status": None if status == "all" else status, "alert_type": alert_type, "start_date": start_date, "end_date": end_date}
+    return {
+        "total": alert_crud.count_cleaning_alerts(db, **filters),
+        "skip": skip,
+        "limit": limit,
+        "counts": alert_crud.count_cleaning_alerts_by_status(db),
+        "items": alert_crud.get_cleaning_alerts(db, **filters, skip=skip, limit=limit)
+    }
+
+@router.post("/alerts/acknowledge")
+def acknowledge_cleaning_alerts(
+    request: CleaningAlertAcknowledge,
+    db: Session = Depends(get_db)
+):
+    """アラートをまとめて確認済みにする"""
+    acknowledged = alert_crud.acknowledge_cleaning_alerts(db, request.alert_ids, request.acknowledged_by)
+    return {"acknowledged": acknowledged}
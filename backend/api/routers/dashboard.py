@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from typing import Optional
 from datetime import date, datetime
 
 from ..database import get_db
-from ..schemas import DashboardStats
+from ..schemas import DashboardStats, DashboardSummary, BookingIssueList
 from ..crud import (
     get_dashboard_stats, 
     get_monthly_stats,
     get_monthly_comparison,
     get_daily_stats,
-    get_ota_breakdown
+    get_daily_stats_range,
+    get_ota_breakdown,
+    get_calendar_reservations_columnar,
+    get_booking_issues,
+    count_booking_issues
 )
 from ..models import Reservation
+from ..services.revenue_trend import get_revenue_trend
+from ..services.dashboard_summary import get_dashboard_summary
+from ..services.revenue_cube import pivot_revenue_cube
+from ..services.booking_pace import get_booking_pace
+from ..services.booking_issues import detect_booking_issues
 
 router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
 
@@ -22,14 +31,33 @@ def get_dashboard_statistics(db: Session = Depends(get_db)):
     """ダッシュボードの統計情報を取得"""
     return get_dashboard_stats(db)
 
+@router.get("/summary", response_model=DashboardSummary)
+def get_dashboard_summary_data(
+    year: int = Query(default=None, description="Year for summary"),
+    month: int = Query(default=None, description="Month for summary (1-12)"),
+    as_of: Optional[datetime] = Query(default=None, description="Point in time (UTC) to reconstruct the books at"),
+    db: Session = Depends(get_db)
+):
+    """ダッシュボードの全ウィジェットを一括取得（予約データの読み込みは1回）"""
+    if not year or not month:
+        now = datetime.now()
+        year = year or now.year
+        month = month or now.month
+    
+    return get_dashboard_summary(db, year, month, as_of)
+
 @router.get("/calendar/reservations")
 def get_calendar_reservations(
     start_date: date,
     end_date: date,
     room_type: Optional[str] = None,
+    format: str = Query(default="json", pattern="^(json|columnar)$"),
     db: Session = Depends(get_db)
 ):
-    """カレンダー表示用の予約データを取得"""
+    """カレンダー表示用の予約データを取得（format=columnar で辞書エンコードした列指向形式）"""
+    if format == "columnar":
+        return get_calendar_reservations_columnar(db, start_date, end_date, room_type)
+    
     query = db.query(Reservation).filter(
         and_(
             Reservation.check_in_date <= end_date,
@@ -105,13 +133,27 @@ def get_monthly_comparison_data(
     
     return get_monthly_comparison(db, year, month)
 
+# 日別統計で一度に取得できる最大日数
+MAX_DAILY_STATS_DAYS = 1096
+
 @router.get("/daily-stats")
 def get_daily_statistics(
     year: int = Query(default=None, description="Year for statistics"),
     month: int = Query(default=None, description="Month for statistics (1-12)"),
+    start_date: Optional[date] = Query(default=None, description="Range start (overrides year/month)"),
+    end_date: Optional[date] = Query(default=None, description="Range end (inclusive)"),
     db: Session = Depends(get_db)
 ):
-    """月間の日別統計を取得"""
+    """日別統計を取得（年月指定または任意期間指定）"""
+    if start_date or end_date:
+        if not start_date or not end_date:
+            raise HTTPException(status_code=400, detail="Both start_date and end_date are required")
+        if start_date > end_date:
+            raise HTTPException(status_code=400, detail="Invalid date range")
+        if (end_date - start_date).days + 1 > MAX_DAILY_STATS_DAYS:
+            raise HTTPException(status_code=400, detail=f"Date range must be {MAX_DAILY_STATS_DAYS} days or less")
+        return get_daily_stats_range(db, start_date, end_date)
+    
     if not year or not month:
         now = datetime.now()
         year = year or now.year
@@ -131,4 +173,79 @@ def get_ota_breakdown_data(
         year = year or now.year
         month = month or now.month
     
-    return get_ota_breakdown(db, year, month)
\ No newline at end of file
+    return get_ota_breakdown(db, year, month)
+
+# トレンドで一度に取得できる最大日数
+MAX_TREND_DAYS = 3660
+
+@router.get("/trend")
+def get_trend(
+    from_date: date = Query(..., alias="from", description="Start date (inclusive)"),
+    to_date: date = Query(..., alias="to", description="End date (inclusive)"),
+    granularity: str = Query(default="month", pattern="^(day|week|month)$"),
+    db: Session = Depends(get_db)
+):
+    """売上・稼働率・ADR・RevPARの推移を施設別・全体で取得"""
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="Invalid date range")
+    if (to_date - from_date).days + 1 > MAX_TREND_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be {MAX_TREND_DAYS} days or less")
+    
+    return get_revenue_trend(db, from_date, to_date, granularity)
+
+CUBE_DIMENSION_PATTERN = "^(year_month|facility|ota_type|ota_name)$"
+YEAR_MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+@router.get("/ota-cube")
+def get_ota_cube(
+    from_month: str = Query(..., alias="from", pattern=YEAR_MONTH_PATTERN, description="Start month (YYYY-MM)"),
+    to_month: str = Query(..., alias="to", pattern=YEAR_MONTH_PATTERN, description="End month (YYYY-MM)"),
+    rows: str = Query(default="ota_name", pattern=CUBE_DIMENSION_PATTERN),
+    columns: Optional[str] = Query(default=None, pattern=CUBE_DIMENSION_PATTERN),
+    facility_id: Optional[int] = Query(default=None),
+    ota_type: Optional[str] = Query(default=None),
+    ota_name: Optional[str] = Query(default=None),
+    db: Session = Depends(get_db)
+):
+    """OTA×施設×月の集計テーブルを任意の軸でピボット"""
+    if from_month > to_month:
+        raise HTTPException(status_code=400, detail="Invalid month range")
+    
+    return pivot_revenue_cube(
+        db, from_month, to_month,
+        rows=rows, columns=columns,
+        facility_id=facility_id, ota_type=ota_type, ota_name=ota_name
+    )
+
+@router.get("/pace")
+def get_pace(
+    stay_month: str = Query(..., pattern=YEAR_MONTH_PATTERN, description="Stay month (YYYY-MM)"),
+    db: Session = Depends(get_db)
+):
+    """宿泊月のブッキングペース（月初日N日前時点のオンザブック）を前年同月と比較して取得"""
+    year, month = (int(part) for part in stay_month.split("-"))
+    return get_booking_pace(db, year, month)
+
+@router.get("/booking-issues", response_model=BookingIssueList)
+def list_booking_issues(
+    issue_type: Optional[str] = Query(default=None, pattern="^(double_booking|orphan_gap)$"),
+    facility_id: Optional[int] = Query(default=None),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    """予約の重複・孤立泊の検出結果を取得（CSV同期のたびに更新）"""
+    return {
+        "counts": count_booking_issues(db),
+        "items": get_booking_issues(db, issue_type=issue_type, facility_id=facility_id, skip=skip, limit=limit)
+    }
+
+@router.post("/booking-issues/detect", response_model=BookingIssueList)
+def run_booking_issue_detection(db: Session = Depends(get_db)):
+    """予約の重複・孤立泊を再検出"""
+    detect_booking_issues(db)
+    db.commit()
+    return {
+        "counts": count_booking_issues(db),
+        "items": get_booking_issues(db)
+    }
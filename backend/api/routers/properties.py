@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List
+from datetime import date
+from email.utils import format_datetime, parsedate_to_datetime
 
 from ..database import get_db
 from ..schemas import Facility, FacilityCreate
 from ..crud import get_facilities, get_facility, create_facility
+from ..services.availability_index import search_available_facilities
+from ..services.ical_feed import get_calendar_feed
 
 router = APIRouter(prefix="/api/properties", tags=["properties"])
 
@@ -17,6 +21,22 @@ def list_facilities(
     """施設一覧を取得"""
     return get_facilities(db, skip=skip, limit=limit)
 
+@router.get("/availability")
+def search_availability(
+    start: date = Query(..., description="Check-in date"),
+    end: date = Query(..., description="Check-out date"),
+    guests: int = Query(default=1, ge=1, description="Number of guests"),
+    db: Session = Depends(get_db)
+):
+    """期間内（チェックイン日〜チェックアウト日）に空いている施設を検索"""
+    if start >= end:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    
+    try:
+        return search_available_facilities(db, start, end, guests)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/{facility_id}", response_model=Facility)
 def get_facility_detail(facility_id: int, db: Session = Depends(get_db)):
     """施設詳細を取得"""
@@ -25,6 +45,41 @@ def get_facility_detail(facility_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Facility not found")
     return facility
 
+def _is_not_modified(request: Request, etag: str, last_modified) -> bool:
+    """条件付きリクエストの判定（If-None-Match を優先）"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+@router.get("/{facility_id}/calendar.ics")
+def get_facility_calendar(facility_id: int, request: Request, db: Session = Depends(get_db)):
+    """施設の予約済み期間をiCal形式で配信（施設ごとにキャッシュ、変更がなければ304）"""
+    feed = get_calendar_feed(db, facility_id)
+    if not feed:
+        raise HTTPException(status_code=404, detail="Facility not found")
+    
+    headers = {
+        "ETag": feed["etag"],
+        "Last-Modified": format_datetime(feed["last_modified"], usegmt=True),
+        "Cache-Control": "no-cache"
+    }
+    if _is_not_modified(request, feed["etag"], feed["last_modified"]):
+        return Response(status_code=304, headers=headers)
+    
+    return Response(
+        content=feed["content"],
+        media_type="text/calendar; charset=utf-8",
+        headers=headers
+    )
+
 @router.post("", response_model=Facility)
 def create_new_facility(
     facility: FacilityCreate,
@@ -1,32 +1,38 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Annotated
-from datetime import date
+from datetime import date, datetime
+import csv
+import io
+import json
 
-from ..database import get_db
-from ..schemas import Reservation, ReservationCreate, ReservationUpdate
+from ..database import get_db, SessionLocal
+from ..schemas import (
+    Reservation, ReservationCreate, ReservationUpdate,
+    ReservationBatchRequest, ReservationBatchResponse
+)
 from ..crud import (
-    get_reservations, get_reservation, create_reservation, 
-    update_reservation, get_or_create_facility
+    get_reservations, get_reservations_as_of, get_reservation, create_reservation, 
+    update_reservation, get_or_create_facility,
+    facility_name_from_room_type, apply_reservation_batch, MAX_BATCH_SIZE,
+    EXPORT_COLUMNS, iter_reservation_rows,
+    delete_reservation as crud_delete_reservation
 )
 
 router = APIRouter(prefix="/api/reservations", tags=["reservations"])
 
-@router.get("", response_model=List[Reservation])
-def list_reservations(
-    skip: int = 0,
-    limit: int = 100,
-    ota_name: Annotated[Optional[List[str]], Query()] = None,
-    facility_id: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る（後方互換性のため残す）
-    room_type: Annotated[Optional[str], Query()] = None,  # 部屋タイプフィルター追加
-    check_in_date_from: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る
-    check_in_date_to: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る
-    guest_name: Annotated[Optional[str], Query()] = None,
-    sort_by: Annotated[Optional[str], Query()] = None,  # ソートキー
-    sort_order: Annotated[Optional[str], Query()] = None,  # ソート順序
-    db: Session = Depends(get_db)
-):
-    """予約一覧を取得"""
+def _parse_reservation_filters(
+    ota_name: Optional[List[str]],
+    facility_id: Optional[str],
+    room_type: Optional[str],
+    check_in_date_from: Optional[str],
+    check_in_date_to: Optional[str],
+    guest_name: Optional[str],
+    sort_by: Optional[str],
+    sort_order: Optional[str]
+) -> dict:
+    """クエリパラメータ（文字列）を検索条件に変換"""
     # 空文字列をNoneに変換
     if ota_name and all(name == "" for name in ota_name):
         ota_name = None
@@ -56,20 +62,134 @@ def list_reservations(
             date_to = date.fromisoformat(check_in_date_to)
         except ValueError:
             date_to = None
-        
-    reservations = get_reservations(
-        db, skip=skip, limit=limit,
-        ota_name=ota_name,
-        facility_id=facility_id_int,
-        room_type=room_type,
-        check_in_date_from=date_from,
-        check_in_date_to=date_to,
-        guest_name=guest_name,
-        sort_by=sort_by,
-        sort_order=sort_order
+    
+    return {
+        "ota_name": ota_name,
+        "facility_id": facility_id_int,
+        "room_type": room_type,
+        "check_in_date_from": date_from,
+        "check_in_date_to": date_to,
+        "guest_name": guest_name,
+        "sort_by": sort_by,
+        "sort_order": sort_order
+    }
+
+@router.get("", response_model=List[Reservation])
+def list_reservations(
+    skip: int = 0,
+    limit: int = 100,
+    ota_name: Annotated[Optional[List[str]], Query()] = None,
+    facility_id: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る（後方互換性のため残す）
+    room_type: Annotated[Optional[str], Query()] = None,  # 部屋タイプフィルター追加
+    check_in_date_from: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る
+    check_in_date_to: Annotated[Optional[str], Query()] = None,  # 文字列として受け取る
+    guest_name: Annotated[Optional[str], Query()] = None,
+    sort_by: Annotated[Optional[str], Query()] = None,  # ソートキー
+    sort_order: Annotated[Optional[str], Query()] = None,  # ソート順序
+    as_of: Annotated[Optional[datetime], Query()] = None,  # 指定時点（UTC）の内容で取得
+    db: Session = Depends(get_db)
+):
+    """予約一覧を取得（as_of 指定時は予約履歴からその時点の内容を取得）"""
+    filters = _parse_reservation_filters(
+        ota_name, facility_id, room_type,
+        check_in_date_from, check_in_date_to,
+        guest_name, sort_by, sort_order
     )
+    if as_of:
+        return get_reservations_as_of(db, as_of, skip=skip, limit=limit, **filters)
+    reservations = get_reservations(db, skip=skip, limit=limit, **filters)
     return reservations
 
+# エクスポート時に1回で書き出す行数
+EXPORT_CHUNK_ROWS = 500
+
+def _format_export_value(value):
+    """エクスポート用に値を文字列化"""
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def _stream_reservation_export(format: str, encoding: str, filters: dict):
+    """予約データをCSV/NDJSONとして逐次生成
+    
+    レスポンス送信中もDBを参照するため、リクエストとは別のセッションを使う
+    """
+    errors = "replace" if encoding == "cp932" else "strict"
+    
+    # ヘッダーを先に送信してすぐにダウンロードを開始させる
+    if format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        # Excelで文字化けしないようUTF-8の場合はBOMを付与
+        prefix = "\ufeff" if encoding == "utf-8" else ""
+        yield (prefix + buffer.getvalue()).encode(encoding, errors)
+    
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        pending = 0
+        
+        for row in iter_reservation_rows(db, **filters):
+            if format == "csv":
+                writer.writerow([_format_export_value(v) for v in row])
+            else:
+                record = {
+                    name: (value.isoformat() if isinstance(value, (date, datetime)) else value)
+                    for name, value in zip(EXPORT_COLUMNS, row)
+                }
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write("\n")
+            
+            pending += 1
+            if pending >= EXPORT_CHUNK_ROWS:
+                yield buffer.getvalue().encode(encoding, errors)
+                buffer.seek(0)
+                buffer.truncate(0)
+                pending = 0
+        
+        if pending:
+            yield buffer.getvalue().encode(encoding, errors)
+    finally:
+        db.close()
+
+@router.get("/export")
+def export_reservations(
+    format: Annotated[str, Query(pattern="^(csv|ndjson)$")] = "csv",
+    encoding: Annotated[str, Query(pattern="^(utf-8|cp932)$")] = "utf-8",
+    ota_name: Annotated[Optional[List[str]], Query()] = None,
+    facility_id: Annotated[Optional[str], Query()] = None,
+    room_type: Annotated[Optional[str], Query()] = None,
+    check_in_date_from: Annotated[Optional[str], Query()] = None,
+    check_in_date_to: Annotated[Optional[str], Query()] = None,
+    guest_name: Annotated[Optional[str], Query()] = None,
+    sort_by: Annotated[Optional[str], Query()] = None,
+    sort_order: Annotated[Optional[str], Query()] = None
+):
+    """予約データをCSVまたはNDJSONでストリーミング出力（一覧と同じ検索条件）"""
+    filters = _parse_reservation_filters(
+        ota_name, facility_id, room_type,
+        check_in_date_from, check_in_date_to,
+        guest_name, sort_by, sort_order
+    )
+    
+    if format == "csv":
+        media_type = f"text/csv; charset={'shift_jis' if encoding == 'cp932' else 'utf-8'}"
+    else:
+        # NDJSONはUTF-8固定
+        encoding = "utf-8"
+        media_type = "application/x-ndjson; charset=utf-8"
+    
+    filename = f"reservations_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}"
+    return StreamingResponse(
+        _stream_reservation_export(format, encoding, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
 @router.get("/{reservation_id}", response_model=Reservation)
 def get_reservation_detail(reservation_id: int, db: Session = Depends(get_db)):
     """予約詳細を取得"""
@@ -87,12 +207,33 @@ def create_new_reservation(
     # 施設の取得または作成
     facility = get_or_create_facility(
         db,
-        name=reservation.room_type.split(" - ")[0] if " - " in reservation.room_type else reservation.room_type,
+        name=facility_name_from_room_type(reservation.room_type),
         room_type_identifier=reservation.room_type
     )
     
     return create_reservation(db, reservation, facility_id=facility.id)
 
+@router.post("/batch", response_model=ReservationBatchResponse)
+def batch_reservations(
+    batch: ReservationBatchRequest,
+    db: Session = Depends(get_db)
+):
+    """予約の作成・更新・削除を1トランザクションで一括実行"""
+    total = len(batch.creates) + len(batch.updates) + len(batch.deletes)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="No operations specified")
+    if total > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many operations ({total}). Maximum is {MAX_BATCH_SIZE}"
+        )
+    
+    try:
+        return apply_reservation_batch(db, batch)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=f"Batch failed and was rolled back: {str(e)}")
+
 @router.put("/{reservation_id}", response_model=Reservation)
 def update_existing_reservation(
     reservation_id: str,
@@ -111,13 +252,7 @@ def delete_reservation(
     db: Session = Depends(get_db)
 ):
     """予約を削除"""
-    from ..models import Reservation as ReservationModel
-    
-    reservation = db.query(ReservationModel).filter(ReservationModel.id == reservation_id).first()
-    if not reservation:
+    if not crud_delete_reservation(db, reservation_id):
         raise HTTPException(status_code=404, detail="Reservation not found")
     
-    db.delete(reservation)
-    db.commit()
-    
     return {"message": "Reservation deleted successfully"}
\ No newline at end of file
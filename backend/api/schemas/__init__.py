@@ -1,7 +1,11 @@
-from .reservation import Reservation, ReservationCreate, ReservationUpdate, ReservationFilter
+from .reservation import (
+    Reservation, ReservationCreate, ReservationUpdate, ReservationFilter,
+    ReservationPartialUpdate, ReservationBatchUpdate, ReservationBatchRequest,
+    ReservationBatchItemResult, ReservationBatchResponse
+)
 from .property import Facility, FacilityCreate
 from .sync_log import SyncLog, SyncLogCreate
-from .dashboard import DashboardStats
+from .dashboard import DashboardStats, DashboardSummary, BookingIssue, BookingIssueList
 from .cleaning import (
     # Enums
     TaskStatus,
@@ -36,9 +40,11 @@ from .cleaning import (
 __all__ = [
     # Existing
     "Reservation", "ReservationCreate", "ReservationUpdate", "ReservationFilter",
+    "ReservationPartialUpdate", "ReservationBatchUpdate", "ReservationBatchRequest",
+    "ReservationBatchItemResult", "ReservationBatchResponse",
     "Facility", "FacilityCreate",
     "SyncLog", "SyncLogCreate",
-    "DashboardStats",
+    "DashboardStats", "DashboardSummary", "BookingIssue", "BookingIssueList",
     # Cleaning Enums
     "TaskStatus",
     "ShiftStatus",
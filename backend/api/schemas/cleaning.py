@@ -188,6 +188,16 @@ class CleaningShift(CleaningShiftBase):
     class Config:
         from_attributes = True
 
+class CleaningShiftBatchCreate(BaseModel):
+    """シフト一括作成リクエスト"""
+    shifts: List[CleaningShiftCreate] = Field(..., min_length=1, max_length=1000)
+
+class CleaningShiftBatchResponse(BaseModel):
+    """シフト一括作成レスポンス"""
+    created_count: int
+    task_count: int  # 報酬を再計算したタスク数
+    shifts: List[CleaningShift]
+
 # 施設清掃設定関連のスキーマ
 class FacilityCleaningSettingsBase(BaseModel):
     """施設清掃設定基本情報"""
@@ -258,12 +268,18 @@ class StaffPerformance(BaseModel):
     total_earnings: float
 
 class TaskAutoAssignRequest(BaseModel):
-    """タスク自動割当リクエスト"""
-    task_ids: List[int]
-    date: date
+    """タスク自動割当リクエスト
+
+    task_ids を省略した場合は start_date〜end_date（省略時は date の1日）の未割当タスクを対象にする
+    """
+    task_ids: List[int] = []
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    target_date: Optional[date] = Field(None, alias="date")
     consider_skills: bool = True
-    consider_distance: bool = True
+    consider_distance: bool = True  # 位置情報がないため現在は未使用
     consider_availability: bool = True
+    dry_run: bool = False  # Trueの場合は割当計画だけを返す
 
 class TaskAutoAssignResponse(BaseModel):
     """タスク自動割当レスポンス"""
@@ -271,7 +287,10 @@ class TaskAutoAssignResponse(BaseModel):
     assigned_count: int
     failed_count: int
     assignments: List[Dict[str, Any]]
+    unassigned: List[Dict[str, Any]] = []  # 割り当てられなかったタスクと理由
     errors: List[str] = []
+    dry_run: bool = False
+    solve_ms: float = 0
 
 class StaffMonthlyStats(BaseModel):
     """スタッフ月次統計"""
@@ -284,4 +303,38 @@ class StaffMonthlyStats(BaseModel):
     group_tasks: int  # グループでの担当数
     individual_tasks: int  # 個人での担当数
     total_hours: float  # 総作業時間
-    dates_worked: List[date]  # 出勤日リスト
\ No newline at end of file
+    dates_worked: List[date]  # 出勤日リスト
+
+# 同期アラート関連のスキーマ
+class CleaningAlert(BaseModel):
+    """清掃タスク同期アラート"""
+    id: int
+    alert_type: str
+    task_id: Optional[int] = None
+    reservation_id: Optional[int] = None
+    alert_date: Optional[date] = None
+    message: str
+    details: Dict[str, Any] = {}
+    status: str  # open/acknowledged
+    occurrences: int
+    first_detected_at: Optional[datetime] = None
+    last_detected_at: Optional[datetime] = None
+    acknowledged_at: Optional[datetime] = None
+    acknowledged_by: Optional[str] = None
+    sync_id: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+class CleaningAlertList(BaseModel):
+    """清掃タスク同期アラート一覧（ページング）"""
+    total: int  # 条件に一致する件数
+    skip: int
+    limit: int
+    counts: Dict[str, int]  # ステータスごとの件数（全体）
+    items: List[CleaningAlert]
+
+class CleaningAlertAcknowledge(BaseModel):
+    """アラート一括確認リクエスト"""
+    alert_ids: List[int] = Field(..., min_length=1)
+    acknowledged_by: Optional[str] = Field(None, max_length=100)
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
+from datetime import date, datetime
 from .reservation import Reservation
 from .sync_log import SyncLog
 
@@ -10,4 +11,37 @@ class DashboardStats(BaseModel):
     total_guests_today: int
     occupancy_rate: float
     recent_reservations: List[Reservation]
-    sync_status: Optional[SyncLog] = None
\ No newline at end of file
+    sync_status: Optional[SyncLog] = None
+
+class DashboardSummary(BaseModel):
+    year: int
+    month: int
+    as_of: Optional[datetime] = None
+    stats: DashboardStats
+    monthly_stats: Dict[str, Any]
+    monthly_comparison: Dict[str, Any]
+    daily_stats: List[Dict[str, Any]]
+    ota_breakdown: List[Dict[str, Any]]
+    meta: Dict[str, Any]  # 読み込み・各ウィジェットの処理時間（ms）
+
+
+class BookingIssue(BaseModel):
+    id: int
+    issue_type: str  # double_booking/orphan_gap
+    facility_id: int
+    facility_name: Optional[str] = None
+    reservation_id: int
+    reservation_code: Optional[str] = None
+    guest_name: Optional[str] = None
+    other_reservation_id: int
+    other_reservation_code: Optional[str] = None
+    other_guest_name: Optional[str] = None
+    start_date: date
+    end_date: date
+    nights: int
+    detected_at: Optional[datetime] = None
+    sync_id: Optional[int] = None
+
+class BookingIssueList(BaseModel):
+    counts: Dict[str, int]
+    items: List[BookingIssue]
@@ -1,6 +1,6 @@
 from pydantic import BaseModel
 from datetime import date, datetime
-from typing import Optional
+from typing import Optional, List
 from .property import Facility
 
 # Reservation Schemas
@@ -81,4 +81,80 @@ class ReservationFilter(BaseModel):
     facility_id: Optional[int] = None
     check_in_date_from: Optional[date] = None
     check_in_date_to: Optional[date] = None
-    guest_name: Optional[str] = None
\ No newline at end of file
+    guest_name: Optional[str] = None
+
+# Batch Schemas
+class ReservationPartialUpdate(BaseModel):
+    """部分更新用（指定されたフィールドのみ更新）"""
+    reservation_type: Optional[str] = None
+    reservation_number: Optional[str] = None
+    ota_name: Optional[str] = None
+    ota_type: Optional[str] = None
+    room_type: Optional[str] = None
+    check_in_date: Optional[date] = None
+    check_out_date: Optional[date] = None
+    reservation_date: Optional[datetime] = None
+    guest_name: Optional[str] = None
+    guest_name_kana: Optional[str] = None
+    guest_phone: Optional[str] = None
+    guest_email: Optional[str] = None
+    num_adults: Optional[int] = None
+    num_children: Optional[int] = None
+    num_infants: Optional[int] = None
+    total_amount: Optional[float] = None
+    commission: Optional[float] = None
+    net_amount: Optional[float] = None
+    adult_rate: Optional[float] = None
+    child_rate: Optional[float] = None
+    infant_rate: Optional[float] = None
+    adult_amount: Optional[float] = None
+    child_amount: Optional[float] = None
+    infant_amount: Optional[float] = None
+    nights: Optional[int] = None
+    rooms: Optional[int] = None
+    meal_plan: Optional[str] = None
+    payment_method: Optional[str] = None
+    booker_name: Optional[str] = None
+    booker_name_kana: Optional[str] = None
+    plan_name: Optional[str] = None
+    plan_code: Optional[str] = None
+    checkin_time: Optional[str] = None
+    cancel_date: Optional[date] = None
+    option_items: Optional[str] = None
+    option_amount: Optional[float] = None
+    point_amount: Optional[float] = None
+    point_discount: Optional[float] = None
+    postal_code: Optional[str] = None
+    address: Optional[str] = None
+    member_number: Optional[str] = None
+    company_info: Optional[str] = None
+    reservation_route: Optional[str] = None
+    notes: Optional[str] = None
+    questions_answers: Optional[str] = None
+    change_history: Optional[str] = None
+    memo: Optional[str] = None
+
+class ReservationBatchUpdate(ReservationPartialUpdate):
+    id: str  # 主キー（数値）または予約ID
+
+class ReservationBatchRequest(BaseModel):
+    creates: List[ReservationCreate] = []
+    updates: List[ReservationBatchUpdate] = []
+    deletes: List[str] = []  # 主キー（数値）または予約ID
+    all_or_nothing: bool = False  # Trueの場合、1件でもエラーがあれば全件ロールバック
+
+class ReservationBatchItemResult(BaseModel):
+    index: int  # 各操作リスト内の位置
+    operation: str  # create/update/delete
+    status: str  # created/updated/deleted/error
+    id: Optional[int] = None
+    reservation_id: Optional[str] = None
+    error: Optional[str] = None
+
+class ReservationBatchResponse(BaseModel):
+    success: bool
+    created_count: int = 0
+    updated_count: int = 0
+    deleted_count: int = 0
+    error_count: int = 0
+    results: List[ReservationBatchItemResult] = []
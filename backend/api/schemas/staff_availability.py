@@ -1,7 +1,7 @@
 """スタッフ出勤可能日のスキーマ定義"""
 
 from pydantic import BaseModel, Field
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class StaffAvailabilityBase(BaseModel):
@@ -19,6 +19,31 @@ class StaffAvailabilityUpdate(BaseModel):
     """更新用スキーマ"""
     availability_days: Dict[int, bool]
 
+class StaffAvailabilityBulkItem(BaseModel):
+    """一括更新の1スタッフ分"""
+    staff_id: int
+    availability_days: Dict[int, bool] = Field(default_factory=dict)  # 指定のない日は変更しない（新規は出勤可能）
+
+class StaffAvailabilityBulkUpsert(BaseModel):
+    """特定月の出勤可能日の一括作成・更新リクエスト"""
+    items: List[StaffAvailabilityBulkItem] = Field(..., min_length=1)
+
+class StaffAvailabilityMatrixRow(BaseModel):
+    """出勤可能ビットマップの1スタッフ分"""
+    staff_id: int
+    staff_name: str
+    registered: bool  # 出勤可能日が登録済みか（未登録は全日出勤可能）
+    mask: int  # ビットi = i+1日
+
+class StaffAvailabilityMatrix(BaseModel):
+    """特定月のスタッフ × 日の出勤可能ビットマップ"""
+    year: int
+    month: int
+    days_in_month: int
+    staff: List[StaffAvailabilityMatrixRow]
+    matrix: List[List[int]]  # [スタッフ][日-1] = 1（出勤可能）/0
+    available_counts: List[int]  # 日ごとの出勤可能人数
+
 class StaffAvailability(StaffAvailabilityBase):
     """レスポンス用スキーマ"""
     id: int
@@ -0,0 +1,151 @@
+"""施設の空き状況インデックス
+
+施設ごとに「予約で埋まっている宿泊日」をビットマップ（Pythonの整数、ビットi = 基準日+i日目の夜）で
+メモリに保持し、期間の空き検索をビット演算だけで行う。
+ビットマップは宿泊日テーブルから作成し、予約変更がコミットされた施設だけを次回検索時に作り直す
+（コミットの通知は reservation_changes が行う）。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Any, Iterable, List, Optional, Set
+from datetime import date, timedelta
+import threading
+import time
+
+from ..models import Facility, ReservationNight
+from .reservation_nights import CHUNK_SIZE
+
+# インデックスの対象期間（本日から何日先まで）
+HORIZON_DAYS = 730
+
+class AvailabilityIndex:
+    """施設ごとの宿泊日ビットマップ"""
+
+    def __init__(self, horizon_days: int = HORIZON_DAYS):
+        self.horizon_days = horizon_days
+        self.base_date: Optional[date] = None
+        self._facilities: Dict[int, Dict[str, Any]] = {}
+        self._bitmaps: Dict[int, int] = {}
+        self._dirty: Set[int] = set()
+        self._stale = True
+        self._lock = threading.Lock()
+
+    @property
+    def end_date(self) -> date:
+        """インデックスで扱える最終チェックアウト日"""
+        return self.base_date + timedelta(days=self.horizon_days)
+
+    def mark_dirty(self, facility_ids: Iterable[int]) -> None:
+        """施設のビットマップを次回検索時に作り直す"""
+        with self._lock:
+            self._dirty.update(i for i in facility_ids if i is not None)
+
+    def mark_stale(self) -> None:
+        """施設一覧ごと次回検索時に作り直す"""
+        with self._lock:
+            self._stale = True
+
+    def _load_bitmaps(self, db: Session, facility_ids: Optional[List[int]] = None) -> Dict[int, int]:
+        """宿泊日テーブルから施設ごとのビットマップを作成"""
+        query = db.query(ReservationNight.facility_id, ReservationNight.stay_date).filter(
+            and_(
+                ReservationNight.facility_id.isnot(None),
+                ReservationNight.stay_date >= self.base_date,
+                ReservationNight.stay_date < self.end_date
+            )
+        )
+        if facility_ids is not None:
+            query = query.filter(ReservationNight.facility_id.in_(facility_ids))
+
+        bitmaps = {facility_id: 0 for facility_id in facility_ids or []}
+        for facility_id, stay_date in query.all():
+            bitmaps[facility_id] = bitmaps.get(facility_id, 0) | (1 << (stay_date - self.base_date).days)
+        return bitmaps
+
+    def _rebuild(self, db: Session) -> None:
+        self.base_date = date.today()
+        self._facilities = {
+            facility.id: {
+                "id": facility.id,
+                "name": facility.name,
+                "max_guests": facility.max_guests
+            }
+            for facility in db.query(
+                Facility.id, Facility.name, Facility.max_guests
+            ).filter(Facility.is_active == True).order_by(Facility.name).all()
+        }
+        self._bitmaps = self._load_bitmaps(db)
+        self._dirty.clear()
+        self._stale = False
+
+    def refresh(self, db: Session) -> None:
+        """未反映の変更があればビットマップを更新（日付が変わった場合は全体を作り直す）"""
+        with self._lock:
+            if self._stale or self.base_date != date.today():
+                self._rebuild(db)
+            elif self._dirty:
+                dirty = sorted(self._dirty)
+                self._dirty.clear()
+                self._bitmaps.update(self._load_bitmaps(db, dirty))
+
+    def covers(self, start_date: date, end_date: date) -> bool:
+        """期間がインデックスの対象期間内か"""
+        return self.base_date <= start_date and end_date <= self.end_date
+
+    def search(self, start_date: date, end_date: date, guests: int = 1) -> List[Dict[str, Any]]:
+        """チェックイン日〜チェックアウト日に空いている施設を取得（宿泊人数で絞り込み）"""
+        offset = (start_date - self.base_date).days
+        mask = ((1 << (end_date - start_date).days) - 1) << offset
+        with self._lock:
+            return [
+                facility
+                for facility_id, facility in self._facilities.items()
+                if not self._bitmaps.get(facility_id, 0) & mask
+                and (facility["max_guests"] is None or facility["max_guests"] >= guests)
+            ]
+
+availability_index = AvailabilityIndex()
+
+def get_night_facility_ids(db: Session, reservation_ids: Iterable[int]) -> Set[int]:
+    """指定予約の宿泊日が属する施設を取得（宿泊日テーブルの現在の内容から）"""
+    ids = sorted({i for i in reservation_ids if i is not None})
+    facility_ids = set()
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = db.query(ReservationNight.facility_id).filter(
+            ReservationNight.reservation_id.in_(ids[i:i + CHUNK_SIZE])
+        ).distinct().all()
+        facility_ids.update(row[0] for row in rows if row[0] is not None)
+    return facility_ids
+
+def search_available_facilities(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    guests: int = 1
+) -> Dict[str, Any]:
+    """期間内に空いている施設を検索
+    
+    Raises:
+        ValueError: 期間がインデックスの対象期間外の場合
+    """
+    availability_index.refresh(db)
+    if not availability_index.covers(start_date, end_date):
+        raise ValueError(
+            f"Date range must be between {availability_index.base_date.isoformat()} "
+            f"and {availability_index.end_date.isoformat()}"
+        )
+
+    started = time.perf_counter()
+    facilities = availability_index.search(start_date, end_date, guests)
+    search_us = round((time.perf_counter() - started) * 1_000_000, 1)
+
+    return {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "nights": (end_date - start_date).days,
+        "guests": guests,
+        "available_count": len(facilities),
+        "facilities": facilities,
+        "search_us": search_us
+    }
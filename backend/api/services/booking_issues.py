@@ -0,0 +1,170 @@
+"""予約の重複（ダブルブッキング）・孤立泊の検出サービス
+
+有効な予約を施設・チェックイン日順に1回だけ並べ、施設ごとに先頭から走査して
+宿泊中の予約と重なる予約、および前の予約との間に残った短い空きを検出する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete, and_, or_
+from typing import Dict, Any, Iterable, List, Optional
+from datetime import date, datetime
+from itertools import groupby
+import logging
+
+from ..models import Reservation, BookingIssue
+from ..models.reservation import CANCELLED_TYPE
+from .reservation_nights import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 孤立泊とみなす空きの最大泊数
+ORPHAN_GAP_MAX_NIGHTS = 1
+
+def find_booking_issues(
+    rows: List,
+    since: date,
+    orphan_gap_max_nights: int = ORPHAN_GAP_MAX_NIGHTS
+) -> List[Dict[str, Any]]:
+    """予約の重複・孤立泊を検出
+
+    Args:
+        rows: (id, facility_id, check_in_date, check_out_date) の有効な予約
+        since: この日以降の重複・空きだけを対象にする
+        orphan_gap_max_nights: 孤立泊とみなす空きの最大泊数
+
+    Returns:
+        検出結果（BookingIssue の行データ）
+    """
+    issues = []
+    ordered = sorted(rows, key=lambda r: (r.facility_id, r.check_in_date, r.check_out_date, r.id))
+
+    for facility_id, facility_rows in groupby(ordered, key=lambda r: r.facility_id):
+        staying = []  # 走査位置のチェックイン日に宿泊中の予約
+        latest = None  # チェックアウト日が最も遅い予約
+
+        for row in facility_rows:
+            # 前の予約との間の空き（どの予約とも重ならない場合）
+            if latest is not None and latest.check_out_date < row.check_in_date:
+                gap = (row.check_in_date - latest.check_out_date).days
+                if gap <= orphan_gap_max_nights and latest.check_out_date >= since:
+                    issues.append({
+                        "issue_type": "orphan_gap",
+                        "facility_id": facility_id,
+                        "reservation_id": latest.id,
+                        "other_reservation_id": row.id,
+                        "start_date": latest.check_out_date,
+                        "end_date": row.check_in_date,
+                        "nights": gap
+                    })
+
+            # チェックアウト済みの予約を外し、残りと重なりを記録
+            staying = [other for other in staying if other.check_out_date > row.check_in_date]
+            for other in staying:
+                end_date = min(other.check_out_date, row.check_out_date)
+                if end_date > since:
+                    issues.append({
+                        "issue_type": "double_booking",
+                        "facility_id": facility_id,
+                        "reservation_id": other.id,
+                        "other_reservation_id": row.id,
+                        "start_date": row.check_in_date,
+                        "end_date": end_date,
+                        "nights": (end_date - row.check_in_date).days
+                    })
+            staying.append(row)
+
+            if latest is None or row.check_out_date > latest.check_out_date:
+                latest = row
+
+    return issues
+
+def _load_active_rows(db: Session, since: date, facility_ids: Optional[List[int]] = None) -> List:
+    """検出対象の有効な予約（since 以降にチェックアウト）を取得"""
+    query = db.query(
+        Reservation.id,
+        Reservation.facility_id,
+        Reservation.check_in_date,
+        Reservation.check_out_date
+    ).filter(
+        and_(
+            Reservation.facility_id.isnot(None),
+            Reservation.reservation_type != CANCELLED_TYPE,
+            Reservation.check_in_date < Reservation.check_out_date,
+            Reservation.check_out_date >= since
+        )
+    )
+    if facility_ids is None:
+        return query.all()
+
+    rows = []
+    for i in range(0, len(facility_ids), CHUNK_SIZE):
+        rows.extend(query.filter(Reservation.facility_id.in_(facility_ids[i:i + CHUNK_SIZE])).all())
+    return rows
+
+def _insert_issues(db: Session, issues: List[Dict[str, Any]], sync_id: Optional[int]) -> Dict[str, int]:
+    detected_at = datetime.utcnow()
+    if issues:
+        db.execute(
+            insert(BookingIssue),
+            [{**issue, "detected_at": detected_at, "sync_id": sync_id} for issue in issues]
+        )
+
+    counts = {"double_booking": 0, "orphan_gap": 0}
+    for issue in issues:
+        counts[issue["issue_type"]] += 1
+    return counts
+
+def detect_booking_issues(db: Session, sync_id: Optional[int] = None, since: Optional[date] = None) -> Dict[str, int]:
+    """重複・孤立泊を検出して検出結果テーブルを作り直す（コミットはしない）
+
+    Returns:
+        種類ごとの検出件数
+    """
+    since = since or date.today()
+    issues = find_booking_issues(_load_active_rows(db, since), since)
+
+    db.execute(delete(BookingIssue))
+    counts = _insert_issues(db, issues, sync_id)
+    logger.info(f"Booking issues detected: {counts}")
+    return counts
+
+def refresh_booking_issues(
+    db: Session,
+    facility_ids: Iterable[int],
+    reservation_ids: Iterable[int],
+    deleted: bool = False
+) -> None:
+    """変更された予約に関係する検出結果を作り直す（コミットはしない）
+
+    検出は施設ごとに独立しているため、変更前後の施設だけを再検出すれば全件の作り直しと同じ結果になる。
+
+    Args:
+        facility_ids: 変更前後に予約が属していた施設
+        reservation_ids: 変更された予約の主キー
+        deleted: 削除の場合True（予約行を削除する前に呼び出し、再検出の対象から外す）
+    """
+    facility_ids = sorted({i for i in facility_ids if i is not None})
+    ids = sorted({i for i in reservation_ids if i is not None})
+
+    # 対象施設の検出結果と、変更された予約を含む検出結果を削除
+    for i in range(0, len(facility_ids), CHUNK_SIZE):
+        db.execute(delete(BookingIssue).where(BookingIssue.facility_id.in_(facility_ids[i:i + CHUNK_SIZE])))
+    for i in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[i:i + CHUNK_SIZE]
+        db.execute(
+            delete(BookingIssue).where(
+                or_(
+                    BookingIssue.reservation_id.in_(chunk),
+                    BookingIssue.other_reservation_id.in_(chunk)
+                )
+            )
+        )
+    if not facility_ids:
+        return
+
+    since = date.today()
+    rows = _load_active_rows(db, since, facility_ids)
+    if deleted:
+        excluded = set(ids)
+        rows = [row for row in rows if row.id not in excluded]
+    _insert_issues(db, find_booking_issues(rows, since), None)
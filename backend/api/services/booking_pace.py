@@ -0,0 +1,219 @@
+"""ブッキングペース（オンザブック推移）集計サービス
+
+宿泊月ごとに「宿泊月初日のN日前の時点で何泊・いくら予約が入っていたか」を、
+予約日・キャンセル日・宿泊日から算出する。
+予約ごとの計上・取消をリードタイム×宿泊月の差分行列に積み、NumPyの累積和で推移に変換する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from typing import Dict, Any, List, Tuple
+from datetime import date
+import threading
+import numpy as np
+
+from ..models import Reservation
+from ..models.reservation import CANCELLED_TYPE
+from ..crud.dashboard import month_range
+
+# 推移を追うリードタイムの範囲（宿泊月初日の何日前か。負の値は月に入ってからの日数）
+MAX_LEAD_DAYS = 365
+MIN_LEAD_DAYS = -31
+
+PACE_MEASURES = ("reservations", "nights", "revenue")
+
+# 宿泊月ごとの集計結果キャッシュ（予約変更時に破棄）
+_pace_cache: Dict[Tuple[int, int], Dict[str, List]] = {}
+_pace_cache_version = 0
+_pace_cache_lock = threading.Lock()
+
+def invalidate_pace_cache() -> None:
+    """ペースのキャッシュを破棄
+
+    予約の変更は日付変更前後の両方の月に影響し、キャンセル済み予約は宿泊日テーブルにも
+    残らないため、影響月を特定せず全月分を破棄する（再計算は月単位で数ms程度）。
+    """
+    global _pace_cache_version
+    with _pace_cache_lock:
+        _pace_cache.clear()
+        _pace_cache_version += 1
+
+def _to_ordinals(values, default: int = -1) -> np.ndarray:
+    """日付（datetimeも可）の配列を日の通し番号に変換（Noneはdefault）"""
+    return np.array(
+        [
+            value.toordinal() if value is not None else default
+            for value in values
+        ],
+        dtype=np.int64
+    )
+
+def compute_pace_matrix(rows: List, months: List[Tuple[int, int]]) -> Dict[str, np.ndarray]:
+    """予約データからリードタイム×宿泊月のオンザブック行列を作成
+
+    Args:
+        rows: (check_in_date, check_out_date, reservation_date, cancel_date, reservation_type, total_amount)
+        months: 対象の宿泊月
+
+    Returns:
+        集計値ごとの行列。行はリードタイム（MIN_LEAD_DAYS〜MAX_LEAD_DAYS の昇順）、列は months の順。
+        リードタイムNの値は「月初日のN日前の終わり時点」で有効な予約の合計。
+    """
+    lead_count = MAX_LEAD_DAYS - MIN_LEAD_DAYS + 1
+    month_count = len(months)
+    empty = {measure: np.zeros((lead_count, month_count)) for measure in PACE_MEASURES}
+    if not rows or not months:
+        return empty
+
+    check_in, check_out, booked_at, cancelled_at, reservation_type, amount = zip(*rows)
+    check_in = _to_ordinals(check_in)
+    check_out = _to_ordinals(check_out)
+    booked = _to_ordinals(booked_at)
+    cancelled = _to_ordinals(cancelled_at)
+    amount = np.array([value or 0 for value in amount], dtype=float)
+    is_cancelled = np.array([value == CANCELLED_TYPE for value in reservation_type])
+
+    # 予約日のない予約、取消日のないキャンセルは時系列に載せられないため除外
+    valid = (booked >= 0) & ~(is_cancelled & (cancelled < 0))
+
+    ranges = [month_range(year, month) for year, month in months]
+    month_start = np.array([start.toordinal() for start, _ in ranges], dtype=np.int64)
+    month_end = np.array([end.toordinal() + 1 for _, end in ranges], dtype=np.int64)
+
+    # 予約×宿泊月の月内泊数と按分売上（行: 予約, 列: 宿泊月）
+    total_nights = check_out - check_in
+    nights_in_month = np.clip(
+        np.minimum(check_out[:, None], month_end[None, :])
+        - np.maximum(check_in[:, None], month_start[None, :]),
+        0, None
+    )
+    revenue_in_month = np.divide(
+        amount[:, None] * nights_in_month,
+        total_nights[:, None],
+        out=np.zeros(nights_in_month.shape),
+        where=total_nights[:, None] > 0
+    )
+
+    # 計上・取消時点のリードタイム（範囲外は端に寄せる）
+    booked_lead = np.clip(month_start[None, :] - booked[:, None], MIN_LEAD_DAYS, MAX_LEAD_DAYS)
+    cancel_lead = np.clip(month_start[None, :] - cancelled[:, None], MIN_LEAD_DAYS, MAX_LEAD_DAYS)
+
+    counted = valid[:, None] & (nights_in_month > 0)
+    # キャンセルは計上より後に取り消された分だけ、取消時点で差し引く
+    removed = counted & is_cancelled[:, None] & (cancel_lead < booked_lead)
+    counted &= ~is_cancelled[:, None] | removed
+
+    month_index = np.broadcast_to(np.arange(month_count)[None, :], nights_in_month.shape)
+    weights = {
+        "reservations": np.ones(nights_in_month.shape),
+        "nights": nights_in_month.astype(float),
+        "revenue": revenue_in_month
+    }
+
+    result = {}
+    for measure in PACE_MEASURES:
+        delta = np.bincount(
+            (booked_lead[counted] - MIN_LEAD_DAYS) * month_count + month_index[counted],
+            weights=weights[measure][counted],
+            minlength=lead_count * month_count
+        )
+        delta -= np.bincount(
+            (cancel_lead[removed] - MIN_LEAD_DAYS) * month_count + month_index[removed],
+            weights=weights[measure][removed],
+            minlength=lead_count * month_count
+        )
+        delta = delta.reshape(lead_count, month_count)
+        # リードタイムN以上で計上・取消された分の合計 = N日前時点のオンザブック
+        result[measure] = np.cumsum(delta[::-1], axis=0)[::-1]
+
+    return result
+
+def _load_pace_rows(db: Session, months: List[Tuple[int, int]]) -> List:
+    """対象月と重なる予約（キャンセル含む）を取得"""
+    ranges = [month_range(year, month) for year, month in months]
+    return db.query(
+        Reservation.check_in_date,
+        Reservation.check_out_date,
+        Reservation.reservation_date,
+        Reservation.cancel_date,
+        Reservation.reservation_type,
+        Reservation.total_amount
+    ).filter(
+        and_(
+            Reservation.check_in_date.isnot(None),
+            Reservation.check_out_date.isnot(None),
+            or_(*[
+                and_(
+                    Reservation.check_in_date <= end_date,
+                    Reservation.check_out_date > start_date
+                )
+                for start_date, end_date in ranges
+            ])
+        )
+    ).all()
+
+def get_month_pace(db: Session, months: List[Tuple[int, int]]) -> Dict[Tuple[int, int], Dict[str, List]]:
+    """宿泊月ごとのオンザブック推移を取得（キャッシュにない月だけまとめて計算）
+
+    Returns:
+        宿泊月ごとに、リードタイムの降順（時系列順）に並べた各集計値の配列
+    """
+    with _pace_cache_lock:
+        cached = {month: _pace_cache[month] for month in months if month in _pace_cache}
+        version = _pace_cache_version
+
+    missing = [month for month in dict.fromkeys(months) if month not in cached]
+    if missing:
+        matrix = compute_pace_matrix(_load_pace_rows(db, missing), missing)
+        computed = {}
+        for i, month in enumerate(missing):
+            computed[month] = {
+                "reservations": matrix["reservations"][::-1, i].astype(int).tolist(),
+                "nights": matrix["nights"][::-1, i].astype(int).tolist(),
+                "revenue": np.round(matrix["revenue"][::-1, i], 0).tolist()
+            }
+        with _pace_cache_lock:
+            # 計算中に予約が変更された場合は古い結果をキャッシュしない
+            if version == _pace_cache_version:
+                _pace_cache.update(computed)
+        cached.update(computed)
+
+    return cached
+
+def _percent_change(current: float, previous: float) -> float:
+    return ((current - previous) / previous * 100) if previous > 0 else 0
+
+def get_booking_pace(db: Session, year: int, month: int) -> Dict[str, Any]:
+    """宿泊月のブッキングペースを前年同月と比較して取得"""
+    current_month = (year, month)
+    last_year_month = (year - 1, month)
+    pace = get_month_pace(db, [current_month, last_year_month])
+    current = pace[current_month]
+    last_year = pace[last_year_month]
+
+    lead_days = list(range(MAX_LEAD_DAYS, MIN_LEAD_DAYS - 1, -1))
+
+    # 本日時点のリードタイムで前年同時期と比較
+    month_start, _ = month_range(year, month)
+    as_of_lead = min(max((month_start - date.today()).days, MIN_LEAD_DAYS), MAX_LEAD_DAYS)
+    index = lead_days.index(as_of_lead)
+    comparison = {
+        "lead_days": as_of_lead,
+        "current": {measure: current[measure][index] for measure in PACE_MEASURES},
+        "last_year": {measure: last_year[measure][index] for measure in PACE_MEASURES}
+    }
+    comparison["variance"] = {
+        f"{measure}_vs_last_year": _percent_change(
+            comparison["current"][measure], comparison["last_year"][measure]
+        )
+        for measure in PACE_MEASURES
+    }
+
+    return {
+        "stay_month": f"{year:04d}-{month:02d}",
+        "last_year_month": f"{year - 1:04d}-{month:02d}",
+        "lead_days": lead_days,
+        "current": current,
+        "last_year": last_year,
+        "comparison": comparison
+    }
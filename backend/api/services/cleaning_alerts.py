@@ -0,0 +1,89 @@
+"""清掃タスク同期アラートの保存
+
+同期で生成したアラートを cleaning_alerts に保存する。
+種類と対象（タスク、タスク作成前は予約）から作る dedupe_key で既存の行とまとめ、
+同じアラートが再度生成されても行は増やさず、検出回数と最終検出日時だけを更新する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert
+from typing import Dict, Any, List, Optional
+from datetime import date, datetime
+import logging
+
+from ..models import CleaningAlert
+from ..models.cleaning_alert import ALERT_OPEN
+from .reservation_nights import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+def alert_dedupe_key(alert: Dict[str, Any]) -> str:
+    """アラートの重複判定キー（種類 + 対象）"""
+    details = alert.get("details") or {}
+    if details.get("task_id") is not None:
+        return f"{alert['type']}:task:{details['task_id']}"
+    return f"{alert['type']}:reservation:{details.get('reservation_id')}"
+
+def _alert_date(details: Dict[str, Any]) -> Optional[date]:
+    value = details.get("scheduled_date") or details.get("checkout_date")
+    return date.fromisoformat(value) if value else None
+
+def record_cleaning_alerts(db: Session, alerts: List[Dict[str, Any]], sync_id: Optional[int] = None) -> Dict[str, int]:
+    """アラートを保存（コミットはしない）
+
+    既存のアラートは検出回数・最終検出日時を更新し、内容が変わっていれば未確認に戻す。
+
+    Returns:
+        新規作成・更新した件数
+    """
+    # 同じキーのアラートは後のものを使う
+    by_key = {alert_dedupe_key(alert): alert for alert in alerts}
+    if not by_key:
+        return {"created": 0, "updated": 0}
+
+    keys = sorted(by_key)
+    existing: Dict[str, CleaningAlert] = {}
+    for i in range(0, len(keys), CHUNK_SIZE):
+        for row in db.query(CleaningAlert).filter(CleaningAlert.dedupe_key.in_(keys[i:i + CHUNK_SIZE])).all():
+            existing[row.dedupe_key] = row
+
+    now = datetime.utcnow()
+    rows = []
+    for key, alert in by_key.items():
+        details = alert.get("details") or {}
+        row = existing.get(key)
+        if row is None:
+            rows.append({
+                "alert_type": alert["type"],
+                "dedupe_key": key,
+                "task_id": details.get("task_id"),
+                "reservation_id": details.get("reservation_id"),
+                "alert_date": _alert_date(details),
+                "message": alert["message"],
+                "details": details,
+                "status": ALERT_OPEN,
+                "occurrences": 1,
+                "first_detected_at": now,
+                "last_detected_at": now,
+                "sync_id": sync_id
+            })
+            continue
+
+        row.occurrences += 1
+        row.last_detected_at = now
+        if sync_id is not None:
+            row.sync_id = sync_id
+        if row.message != alert["message"] or row.details != details:
+            # 内容が変わった（新しい変更）場合は未確認に戻す
+            row.message = alert["message"]
+            row.details = details
+            row.alert_date = _alert_date(details) or row.alert_date
+            row.status = ALERT_OPEN
+            row.acknowledged_at = None
+            row.acknowledged_by = None
+
+    if rows:
+        db.execute(insert(CleaningAlert), rows)
+
+    logger.info(f"Cleaning alerts recorded: {len(rows)} new, {len(existing)} updated")
+    return {"created": len(rows), "updated": len(existing)}
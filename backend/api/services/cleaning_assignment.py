@@ -0,0 +1,456 @@
+"""清掃タスクの自動割当サービス
+
+対象期間の未割当タスクを、スタッフ・グループの対応可能施設、出勤可能日、1日の受け持ち上限、
+既存シフトを制約として、日ごとに最小コスト割当問題として解く。
+受け持ち上限は担当者×枠（何件目か）の列に展開し、件数が増えるほどコストを上げて負荷を分散する。
+割当不可の組み合わせには十分大きなコストを置き、割当件数の最大化を優先させる。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Any, List, Optional, Tuple
+from datetime import date, datetime, time
+from collections import defaultdict
+import time as time_module
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from ..models.cleaning import (
+    Staff, StaffGroup, StaffGroupMember, CleaningTask, CleaningShift,
+    FacilityCleaningSettings, TaskStatus, ShiftStatus
+)
+from .facility_eligibility import eligibility_index
+from .staff_schedule import staff_schedule_cache
+
+# 稼働時間の登録がない場合の1日の稼働時間（分）
+DEFAULT_WORK_MINUTES = 480
+# 1日の受け持ち上限の算出に使う1件あたりの作業時間（分）
+STANDARD_TASK_MINUTES = 300
+
+DEFAULT_START_TIME = time(11, 0)
+DEFAULT_END_TIME = time(16, 0)
+
+# コストの重み（報酬1,000円 = 1）
+WAGE_WEIGHT = 1.0
+LOAD_WEIGHT = 2.0  # 同じ日の受け持ち1件ごとの加算
+SKILL_WEIGHT = 1.0  # スキルレベル1段階ごとの減算（優先度1のタスクで最大）
+PREFERRED_WEIGHT = 3.0  # 施設の優先スタッフの減算
+
+# 割当不可の組み合わせのコスト（実際のコストの合計より十分大きい値）
+INFEASIBLE_COST = 1e9
+
+def daily_capacity(work_minutes: int) -> int:
+    """稼働分数から1日の受け持ち上限（件数）を算出（稼働日は最低1件）"""
+    if work_minutes <= 0:
+        return 0
+    return max(1, work_minutes // STANDARD_TASK_MINUTES)
+
+def _round_cost(value) -> float:
+    """コストを丸める（-0.0 は 0.0 にそろえる）"""
+    return round(float(value), 3) + 0.0
+
+def plan_day(
+    tasks: List[Dict[str, Any]],
+    resources: List[Dict[str, Any]],
+    consider_skills: bool = True
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """1日分のタスクを担当者に割り当てる
+
+    Args:
+        tasks: id / facility_id / priority / preferred_staff_ids のタスク
+        resources: type（staff / group）/ id / name / skill_level / rate / facilities
+            （None は全施設）/ capacity（残りの受け持ち件数）/ load（既存の受け持ち件数）の担当者
+        consider_skills: 優先度の高いタスクにスキルの高い担当者を寄せるか
+
+    Returns:
+        割当（タスク・担当者・コストの内訳）と、割り当てられなかったタスク（理由付き）
+    """
+    if not tasks:
+        return [], []
+
+    facility_ids = sorted({task["facility_id"] for task in tasks})
+    facility_index = {facility_id: i for i, facility_id in enumerate(facility_ids)}
+    task_facility = np.array([facility_index[task["facility_id"]] for task in tasks], dtype=np.int64)
+    priority = np.array([task.get("priority") or 3 for task in tasks], dtype=float)
+
+    # 担当者×施設の対応可否
+    eligible_by_facility = np.ones((len(resources), len(facility_ids)), dtype=bool)
+    for r, resource in enumerate(resources):
+        if resource["facilities"] is not None:
+            eligible_by_facility[r] = [facility_id in resource["facilities"] for facility_id in facility_ids]
+    eligible = eligible_by_facility[:, task_facility].T  # タスク×担当者
+
+    capacity = np.array([resource["capacity"] for resource in resources], dtype=np.int64)
+    load = np.array([resource["load"] for resource in resources], dtype=float)
+    skill = np.array([resource.get("skill_level") or 1 for resource in resources], dtype=float)
+    wage = np.array([resource.get("rate") or 0 for resource in resources], dtype=float) / 1000 * WAGE_WEIGHT
+    preferred = np.array(
+        [
+            [
+                resource["type"] == "staff" and resource["id"] in task["preferred_staff_ids"]
+                for resource in resources
+            ]
+            for task in tasks
+        ],
+        dtype=bool
+    ).reshape(len(tasks), len(resources))
+
+    # コストの内訳（タスク×担当者）
+    wage_cost = np.broadcast_to(wage[None, :], eligible.shape)
+    skill_cost = (
+        -SKILL_WEIGHT * (skill[None, :] - 1) * (6 - priority[:, None]) / 5
+        if consider_skills else np.zeros(eligible.shape)
+    )
+    preferred_cost = -PREFERRED_WEIGHT * preferred
+    base_cost = wage_cost + skill_cost + preferred_cost
+
+    # 担当者を受け持ち枠ごとの列に展開（k件目の枠は既存分と合わせた件数に応じて加算）
+    slots = np.maximum(capacity, 0)
+    slot_resource = np.repeat(np.arange(len(resources)), slots)
+    slot_number = np.arange(len(slot_resource)) - np.repeat(np.cumsum(slots) - slots, slots)
+    load_cost = LOAD_WEIGHT * (load[slot_resource] + slot_number)
+    cost = np.where(
+        eligible[:, slot_resource],
+        base_cost[:, slot_resource] + load_cost[None, :],
+        INFEASIBLE_COST
+    )
+
+    rows, cols = linear_sum_assignment(cost)
+
+    assignments = []
+    assigned = set()
+    for t, col in zip(rows.tolist(), cols.tolist()):
+        if cost[t, col] >= INFEASIBLE_COST:
+            continue
+        r = slot_resource[col]
+        resource = resources[r]
+        assigned.add(t)
+        assignments.append({
+            "task_id": tasks[t]["id"],
+            "facility_id": tasks[t]["facility_id"],
+            "resource_type": resource["type"],
+            "resource_id": resource["id"],
+            "resource_name": resource["name"],
+            "slot": int(load[r] + slot_number[col]) + 1,
+            "cost": _round_cost(cost[t, col]),
+            "cost_breakdown": {
+                "wage": _round_cost(wage_cost[t, r]),
+                "load": _round_cost(load_cost[col]),
+                "skill": _round_cost(skill_cost[t, r]),
+                "preferred": _round_cost(preferred_cost[t, r])
+            },
+            "candidates": int(eligible[t].sum())
+        })
+
+    unassigned = []
+    for t, task in enumerate(tasks):
+        if t in assigned:
+            continue
+        if not eligible[t].any():
+            reason = "no_available_staff"
+        else:
+            reason = "capacity_exhausted"
+        unassigned.append({
+            "task_id": task["id"],
+            "facility_id": task["facility_id"],
+            "reason": reason,
+            "candidates": int(eligible[t].sum())
+        })
+
+    return assignments, unassigned
+
+def _load_tasks(
+    db: Session,
+    task_ids: Optional[List[int]],
+    start_date: Optional[date],
+    end_date: Optional[date]
+) -> Tuple[List[CleaningTask], List[Dict[str, Any]]]:
+    """割当対象のタスクを取得（対象外のタスクは理由付きで返す）"""
+    skipped = []
+    query = db.query(CleaningTask)
+    if task_ids:
+        tasks = query.filter(CleaningTask.id.in_(task_ids)).all()
+        found = {task.id for task in tasks}
+        skipped.extend(
+            {"task_id": task_id, "reason": "not_found"}
+            for task_id in dict.fromkeys(task_ids) if task_id not in found
+        )
+    else:
+        tasks = query.filter(
+            and_(
+                CleaningTask.scheduled_date >= start_date,
+                CleaningTask.scheduled_date <= end_date,
+                CleaningTask.status == TaskStatus.UNASSIGNED
+            )
+        ).all()
+
+    targets = []
+    for task in tasks:
+        if task.status != TaskStatus.UNASSIGNED:
+            skipped.append({"task_id": task.id, "facility_id": task.facility_id, "reason": "already_assigned"})
+        else:
+            targets.append(task)
+    return targets, skipped
+
+def _load_active_shifts(db: Session, start_date: date, end_date: date) -> List:
+    """対象期間の有効なシフトを取得"""
+    return db.query(
+        CleaningShift.staff_id,
+        CleaningShift.group_id,
+        CleaningShift.task_id,
+        CleaningShift.assigned_date
+    ).filter(
+        and_(
+            CleaningShift.assigned_date >= start_date,
+            CleaningShift.assigned_date <= end_date,
+            CleaningShift.status != ShiftStatus.CANCELLED
+        )
+    ).all()
+
+def build_assignment_plan(
+    db: Session,
+    task_ids: Optional[List[int]] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    consider_skills: bool = True,
+    consider_availability: bool = True
+) -> Dict[str, Any]:
+    """対象タスクの割当計画を作成（DBは変更しない）
+
+    task_ids を指定した場合はそのタスク、省略した場合は期間内の未割当タスクを対象にする。
+    タスクは清掃予定日ごとに割り当てる。
+    """
+    started = time_module.perf_counter()
+    tasks, skipped = _load_tasks(db, task_ids, start_date, end_date)
+
+    # 自動割当対象外の施設を除外し、施設の優先スタッフを取得
+    facility_ids = sorted({task.facility_id for task in tasks})
+    settings = {
+        row.facility_id: row
+        for row in db.query(
+            FacilityCleaningSettings.facility_id,
+            FacilityCleaningSettings.auto_assign,
+            FacilityCleaningSettings.preferred_staff_ids
+        ).filter(FacilityCleaningSettings.facility_id.in_(facility_ids)).all()
+    } if facility_ids else {}
+    targets = []
+    for task in tasks:
+        setting = settings.get(task.facility_id)
+        if setting is not None and setting.auto_assign is False:
+            skipped.append({"task_id": task.id, "facility_id": task.facility_id, "reason": "auto_assign_disabled"})
+        else:
+            targets.append(task)
+
+    if not targets:
+        return {
+            "assignments": [],
+            "unassigned": skipped,
+            "days": 0,
+            "solve_ms": round((time_module.perf_counter() - started) * 1000, 1)
+        }
+
+    first_date = min(task.scheduled_date for task in targets)
+    last_date = max(task.scheduled_date for task in targets)
+
+    eligibility_index.refresh(db)
+    staff_list = db.query(Staff).filter(Staff.is_active == True).all()
+    groups = db.query(StaffGroup).filter(StaffGroup.is_active == True).all()
+    members = defaultdict(list)
+    for group_id, staff_id in db.query(StaffGroupMember.group_id, StaffGroupMember.staff_id).filter(
+        StaffGroupMember.left_date.is_(None)
+    ).all():
+        members[group_id].append(staff_id)
+
+    # 稼働時間・出勤可能日（キャッシュにない分だけ読み込む）
+    if consider_availability:
+        schedules = staff_schedule_cache.preload(db, [staff.id for staff in staff_list], first_date, last_date)
+
+    # 既存シフトによる日ごとの受け持ち件数（グループのシフトはメンバーの受け持ちにも数える）
+    staff_load = defaultdict(int)
+    group_load = defaultdict(int)
+    for shift in _load_active_shifts(db, first_date, last_date):
+        if shift.group_id is not None:
+            group_load[(shift.group_id, shift.assigned_date)] += 1
+            for staff_id in members.get(shift.group_id, []):
+                staff_load[(staff_id, shift.assigned_date)] += 1
+        elif shift.staff_id is not None:
+            staff_load[(shift.staff_id, shift.assigned_date)] += 1
+
+    staff_by_id = {staff.id: staff for staff in staff_list}
+
+    def staff_capacity(staff_id: int, day: date) -> int:
+        if not consider_availability:
+            return daily_capacity(DEFAULT_WORK_MINUTES)
+        if not schedules.is_day_available(staff_id, day):
+            return 0
+        minutes = schedules.work_minutes(staff_id, day)
+        return daily_capacity(DEFAULT_WORK_MINUTES if minutes is None else minutes)
+
+    tasks_by_day = defaultdict(list)
+    for task in sorted(targets, key=lambda t: (t.scheduled_date, t.priority or 3, t.id)):
+        setting = settings.get(task.facility_id)
+        tasks_by_day[task.scheduled_date].append({
+            "id": task.id,
+            "facility_id": task.facility_id,
+            "priority": task.priority,
+            "preferred_staff_ids": set((setting.preferred_staff_ids if setting else None) or [])
+        })
+
+    assignments = []
+    unassigned = list(skipped)
+    for day, day_tasks in sorted(tasks_by_day.items()):
+        # スタッフの残りの受け持ち件数
+        remaining = {
+            staff.id: staff_capacity(staff.id, day) - staff_load[(staff.id, day)]
+            for staff in staff_list
+        }
+        resources = [
+            {
+                "type": "staff",
+                "id": staff.id,
+                "name": staff.name,
+                "skill_level": staff.skill_level,
+                "rate": staff.rate_per_property,
+                "facilities": eligibility_index.facilities_of("staff", staff.id),
+                "capacity": remaining[staff.id],
+                "load": staff_load[(staff.id, day)]
+            }
+            for staff in staff_list if remaining[staff.id] > 0
+        ]
+        # グループは全メンバーが出勤できる日だけ、メンバーの残り件数の範囲で割り当てる
+        for group in groups:
+            group_members = [staff_id for staff_id in members.get(group.id, []) if staff_id in staff_by_id]
+            if not group_members:
+                continue
+            capacity = min(
+                [(group.max_properties_per_day or 1) - group_load[(group.id, day)]]
+                + [remaining[staff_id] for staff_id in group_members]
+            )
+            if capacity <= 0:
+                continue
+            resources.append({
+                "type": "group",
+                "id": group.id,
+                "name": group.name,
+                "skill_level": max(staff_by_id[staff_id].skill_level or 1 for staff_id in group_members),
+                "rate": group.rate_per_property,
+                "facilities": eligibility_index.facilities_of("group", group.id),
+                "capacity": capacity,
+                "load": group_load[(group.id, day)],
+                "members": group_members
+            })
+
+        day_assignments, day_unassigned = plan_day(day_tasks, resources, consider_skills)
+
+        # グループとメンバー個人の両方に割り当てて上限を超えたメンバーがいれば、
+        # グループの割当を確定してスタッフ個人の割当だけを解き直す
+        used = defaultdict(int)
+        for assignment in day_assignments:
+            if assignment["resource_type"] == "group":
+                for staff_id in members[assignment["resource_id"]]:
+                    used[staff_id] += 1
+            else:
+                used[assignment["resource_id"]] += 1
+        if any(count > remaining.get(staff_id, 0) for staff_id, count in used.items()):
+            group_assignments = [a for a in day_assignments if a["resource_type"] == "group"]
+            group_used = defaultdict(int)
+            for assignment in group_assignments:
+                for staff_id in members[assignment["resource_id"]]:
+                    group_used[staff_id] += 1
+            staff_resources = []
+            for resource in resources:
+                if resource["type"] != "staff":
+                    continue
+                capacity = resource["capacity"] - group_used[resource["id"]]
+                if capacity > 0:
+                    staff_resources.append({
+                        **resource,
+                        "capacity": capacity,
+                        "load": resource["load"] + group_used[resource["id"]]
+                    })
+            group_task_ids = {a["task_id"] for a in group_assignments}
+            staff_assignments, day_unassigned = plan_day(
+                [task for task in day_tasks if task["id"] not in group_task_ids],
+                staff_resources,
+                consider_skills
+            )
+            day_assignments = group_assignments + staff_assignments
+
+        for assignment in day_assignments:
+            assignment["date"] = day
+        for item in day_unassigned:
+            item["date"] = day
+        assignments.extend(day_assignments)
+        unassigned.extend(day_unassigned)
+
+    # 対応可能な担当者がそもそもいない施設は理由を区別する
+    active_staff_ids = set(staff_by_id)
+    active_group_ids = {group.id for group in groups if members.get(group.id)}
+    facility_candidates = {}
+    for item in unassigned:
+        if item.get("reason") != "no_available_staff":
+            continue
+        facility_id = item["facility_id"]
+        if facility_id not in facility_candidates:
+            facility_candidates[facility_id] = bool(
+                active_staff_ids.intersection(eligibility_index.eligible_ids("staff", facility_id))
+                or active_group_ids.intersection(eligibility_index.eligible_ids("group", facility_id))
+            )
+        if not facility_candidates[facility_id]:
+            item["reason"] = "no_eligible_staff"
+
+    return {
+        "assignments": sorted(assignments, key=lambda a: (a["date"], a["task_id"])),
+        "unassigned": unassigned,
+        "days": len(tasks_by_day),
+        "solve_ms": round((time_module.perf_counter() - started) * 1000, 1)
+    }
+
+def apply_assignment_plan(db: Session, plan: Dict[str, Any], created_by: str = "auto_assign") -> List[CleaningShift]:
+    """割当計画のシフトを一括作成し、タスクを割当済みにする（コミットはしない）"""
+    if not plan["assignments"]:
+        return []
+
+    task_ids = [assignment["task_id"] for assignment in plan["assignments"]]
+    tasks = {task.id: task for task in db.query(CleaningTask).filter(CleaningTask.id.in_(task_ids)).all()}
+    staff_ids = {a["resource_id"] for a in plan["assignments"] if a["resource_type"] == "staff"}
+    group_ids = {a["resource_id"] for a in plan["assignments"] if a["resource_type"] == "group"}
+    staff_by_id = {
+        staff.id: staff for staff in db.query(Staff).filter(Staff.id.in_(staff_ids)).all()
+    } if staff_ids else {}
+    groups_by_id = {
+        group.id: group for group in db.query(StaffGroup).filter(StaffGroup.id.in_(group_ids)).all()
+    } if group_ids else {}
+
+    now = datetime.utcnow()
+    shifts = []
+    for assignment in plan["assignments"]:
+        task = tasks[assignment["task_id"]]
+        shift = CleaningShift(
+            task_id=task.id,
+            assigned_date=assignment["date"],
+            scheduled_start_time=task.scheduled_start_time or DEFAULT_START_TIME,
+            scheduled_end_time=task.scheduled_end_time or DEFAULT_END_TIME,
+            status=ShiftStatus.SCHEDULED,
+            num_assigned_staff=1,
+            created_by=created_by
+        )
+        if assignment["resource_type"] == "group":
+            group = groups_by_id[assignment["resource_id"]]
+            shift.group_id = group.id
+            shift.calculated_wage = group.rate_per_property
+            shift.transportation_fee = group.transportation_fee
+            shift.total_payment = group.rate_per_property + (group.transportation_fee or 0)
+        else:
+            staff = staff_by_id[assignment["resource_id"]]
+            shift.staff_id = staff.id
+            shift.calculated_wage = staff.rate_per_property
+            shift.transportation_fee = staff.transportation_fee
+            shift.total_payment = staff.rate_per_property + (staff.transportation_fee or 0)
+        task.status = TaskStatus.ASSIGNED
+        task.updated_at = now
+        shifts.append(shift)
+
+    db.add_all(shifts)
+    db.flush()
+    return shifts
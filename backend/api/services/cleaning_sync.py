@@ -1,22 +1,43 @@
 """清掃タスク同期サービス
 
-予約データと清掃タスクを同期し、変更を検知してアラートを生成する
+予約データと清掃タスクを同期し、変更を検知してアラートを生成する。
+前回の同期以降に更新された予約（Reservation.updated_at が処理済み位置以降）だけを処理し、
+処理済み位置は cleaning_sync_state に保存する。CSV同期の最後に自動で呼び出される。
+差分の計算（読み取りのみ）と反映を分けており、プレビューは差分の計算だけを行う。
+同期で生成したアラートは cleaning_alerts に保存する（cleaning_alerts サービス）。
 """
 
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from typing import List, Dict, Any, Tuple
+from sqlalchemy import and_
+from typing import List, Dict, Any, Iterable, Optional
 from datetime import datetime, date, time, timedelta
 from enum import Enum
 
 from ..models.cleaning import (
     CleaningTask as CleaningTaskModel,
     CleaningShift as CleaningShiftModel,
-    TaskStatus,
-    ShiftStatus
+    CleaningSyncState,
+    FacilityCleaningSettings,
+    Staff,
+    TaskStatus
 )
-from ..models.reservation import Reservation
+from ..models.reservation import Reservation, CANCELLED_TYPE
 from ..models.property import Facility
+from ..crud.property import get_or_create_facilities
+from .reservation_changes import apply_reservation_changes
+from .cleaning_alerts import record_cleaning_alerts
+from .reservation_nights import CHUNK_SIZE
+
+DEFAULT_FACILITY_NAME = "デフォルト施設"
+
+# 同期の対象外（作業が終わった）タスク
+CLOSED_STATUSES = (TaskStatus.COMPLETED, TaskStatus.VERIFIED)
+
+# 処理済み位置より少し前から読み直す（更新日時の記録とコミットの順序のずれを吸収する）
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# 処理済み位置の行ID（1行のみ）
+SYNC_STATE_ID = 1
 
 
 class AlertType(Enum):
@@ -30,206 +51,384 @@ class AlertType(Enum):
 
 class CleaningSyncService:
     """清掃タスク同期サービス"""
-    
+
     def __init__(self, db: Session):
         self.db = db
         self.alerts: List[Dict[str, Any]] = []
-        
-    def sync_all_tasks(self) -> Dict[str, Any]:
-        """全清掃タスクを最新の予約データと同期
-        
+        self.resolved_reservation_ids: List[int] = []  # 施設を補完した予約
+
+    def sync_all_tasks(self, sync_id: Optional[int] = None, full: bool = False) -> Dict[str, Any]:
+        """清掃タスクを最新の予約データと同期
+
+        前回の同期以降に更新された予約だけを処理する。
+        初回または full=True の場合は今日以降にチェックアウトする全予約を処理する。
+
+        Args:
+            sync_id: きっかけになったCSV同期のID
+            full: 処理済み位置を使わずに全件同期する
+
         Returns:
             同期結果とアラートのサマリー
         """
+        plan = self._build_plan(full)
+
+        # 新規タスクの作成
+        self._create_tasks_from_reservations(plan["creates"])
+
+        # タスクのキャンセル・変更
+        for task in plan["cancels"]:
+            task.status = TaskStatus.CANCELLED
+        for task, values in plan["modifications"]:
+            for key, value in values.items():
+                setattr(task, key, value)
+
+        # 施設を補完した予約を派生データに反映し、処理済み位置を更新してコミット
+        apply_reservation_changes(self.db, self.resolved_reservation_ids)
+
+        now = datetime.utcnow()
+        state = plan["state"]
+        if state is None:
+            state = CleaningSyncState(id=SYNC_STATE_ID)
+            self.db.add(state)
+        watermark = plan["watermark"]
+        if watermark is not None and (
+            state.last_reservation_updated_at is None or watermark > state.last_reservation_updated_at
+        ):
+            state.last_reservation_updated_at = watermark
+        if sync_id is not None:
+            state.last_sync_id = sync_id
+        state.last_run_at = now
+        if not plan["incremental"]:
+            state.last_full_sync_at = now
+
+        # アラートを保存（同じ種類・対象のアラートはまとめる）
+        alerts_recorded = record_cleaning_alerts(self.db, self.alerts, sync_id)
+        self.db.commit()
+
+        return {
+            **self._summary(plan, sync_id, state.last_reservation_updated_at),
+            "alerts_recorded": alerts_recorded
+        }
+
+    def get_sync_preview(self, full: bool = False) -> Dict[str, Any]:
+        """同期のプレビュー（読み取りだけで、同期した場合の変更内容とアラートを返す）
+
+        次回の sync_all_tasks と同じ対象・同じ判定で差分を計算する。書き込みは行わない。
+        """
+        plan = self._build_plan(full)
+        state = plan["state"]
+        return {
+            **self._summary(plan, None, state.last_reservation_updated_at if state else None),
+            "preview": True
+        }
+
+    def _summary(self, plan: Dict[str, Any], sync_id: Optional[int], watermark: Optional[datetime]) -> Dict[str, Any]:
+        """同期結果のサマリー作成"""
+        stats = plan["stats"]
+        stats["total_alerts"] = len(self.alerts)
+        return {
+            "success": True,
+            "mode": "incremental" if plan["incremental"] else "full",
+            "sync_id": sync_id,
+            "watermark": watermark.isoformat() if watermark else None,
+            "stats": stats,
+            "alerts": self.alerts,
+            "sync_time": datetime.now().isoformat()
+        }
+
+    def _build_plan(self, full: bool) -> Dict[str, Any]:
+        """予約と清掃タスクの差分から同期内容を計算（読み取りのみ）
+
+        作成するタスクの予約・キャンセルするタスク・変更するタスクと変更内容を求め、
+        アラートを self.alerts に追加する。
+        """
         # 統計情報の初期化
         stats = {
+            "reservations_checked": 0,
             "tasks_created": 0,
             "tasks_cancelled": 0,
             "tasks_modified": 0,
             "conflicts_detected": 0,
             "total_alerts": 0
         }
-        
-        # 1. アクティブな予約を全て取得（今日以降のチェックアウト）
+
         today = date.today()
-        active_reservations = self.db.query(Reservation).filter(
-            and_(
-                Reservation.check_out_date >= today,
-                Reservation.reservation_type != "キャンセル"
-            )
-        ).all()
-        
-        # 2. 既存の清掃タスクを全て取得（完了済み以外）
-        existing_tasks = self.db.query(CleaningTaskModel).filter(
+        state = self.db.get(CleaningSyncState, SYNC_STATE_ID)
+        incremental = not full and state is not None and state.last_reservation_updated_at is not None
+
+        # 1. 対象の予約を取得（前回以降に更新された予約、全件同期では今日以降のチェックアウト）
+        if incremental:
+            reservations = self.db.query(Reservation).filter(
+                Reservation.updated_at >= state.last_reservation_updated_at - WATERMARK_OVERLAP
+            ).all()
+        else:
+            reservations = self.db.query(Reservation).filter(
+                Reservation.check_out_date >= today
+            ).all()
+        watermark = max(
+            (r.updated_at for r in reservations if r.updated_at is not None),
+            default=None
+        )
+
+        # 2. 対象予約の清掃タスクを取得
+        tasks_by_reservation = self._load_tasks(r.id for r in reservations)
+        if not incremental:
+            # 予約のチェックアウト日が過去に移った未完了タスクも対象にする
+            open_reservation_ids = {
+                row[0] for row in self.db.query(CleaningTaskModel.reservation_id).filter(
+                    and_(
+                        CleaningTaskModel.scheduled_date >= today,
+                        CleaningTaskModel.status.notin_(CLOSED_STATUSES)
+                    )
+                ).distinct().all()
+            }
+            extra_ids = open_reservation_ids - tasks_by_reservation.keys()
+            extra_reservations = self._load_reservations(extra_ids)
+            reservations.extend(extra_reservations)
+            tasks_by_reservation.update(self._load_tasks(r.id for r in extra_reservations))
+        stats["reservations_checked"] = len(reservations)
+
+        # 予約が削除された未完了タスク
+        orphan_tasks = self.db.query(CleaningTaskModel).outerjoin(
+            Reservation, Reservation.id == CleaningTaskModel.reservation_id
+        ).filter(
             and_(
+                Reservation.id.is_(None),
                 CleaningTaskModel.scheduled_date >= today,
-                CleaningTaskModel.status != TaskStatus.COMPLETED,
-                CleaningTaskModel.status != TaskStatus.VERIFIED
+                CleaningTaskModel.status.notin_(CLOSED_STATUSES + (TaskStatus.CANCELLED,))
             )
         ).all()
-        
-        # 予約IDをキーとしたマップを作成
-        reservation_map = {r.id: r for r in active_reservations}
-        task_map = {t.reservation_id: t for t in existing_tasks}
-        
-        # 3. 新規タスクの作成（予約があるがタスクがない）
-        for reservation in active_reservations:
-            if reservation.id not in task_map:
-                task = self._create_task_from_reservation(reservation)
-                if task:
-                    stats["tasks_created"] += 1
+
+        # 変更対象になりうるタスクの施設名・割当スタッフをまとめて取得
+        open_tasks = [
+            task
+            for tasks in tasks_by_reservation.values()
+            for task in tasks
+            if self._is_open(task, today)
+        ] + orphan_tasks
+        staff_names = self._load_assigned_staff_names(
+            task.id for task in open_tasks if task.status == TaskStatus.ASSIGNED
+        )
+        facility_names = self._load_facility_names(
+            {task.facility_id for task in open_tasks}
+            | {r.facility_id for r in reservations if r.facility_id}
+        )
+
+        # 3. 新規タスク（今日以降にチェックアウトする有効な予約でタスクがない）
+        creates = [
+            r for r in reservations
+            if r.id not in tasks_by_reservation
+            and r.reservation_type != CANCELLED_TYPE
+            and r.check_out_date >= today
+        ]
+        for reservation in creates:
+            stats["tasks_created"] += 1
+            self._add_alert(
+                AlertType.TASK_CREATED,
+                f"新規清掃タスクを作成: {reservation.room_type or '施設'} - {reservation.check_out_date}",
+                {
+                    "reservation_id": reservation.id,
+                    "facility_name": reservation.room_type,
+                    "checkout_date": str(reservation.check_out_date),
+                    "guest_name": reservation.guest_name
+                }
+            )
+
+        # 4. キャンセル検知
+        cancels = list(orphan_tasks)
+        modifications = []
+        for reservation in reservations:
+            for task in tasks_by_reservation.get(reservation.id, []):
+                if not self._is_open(task, today) or task.status == TaskStatus.CANCELLED:
+                    continue
+
+                if reservation.reservation_type == CANCELLED_TYPE:
+                    # 予約がキャンセルされた
+                    cancels.append(task)
+                    continue
+
+                # 5. 日時・施設の変更の検知
+                changes = []
+                values = {}
+
+                # チェックアウト日の変更
+                if task.checkout_date != reservation.check_out_date:
+                    changes.append(f"チェックアウト日: {task.checkout_date} → {reservation.check_out_date}")
+                    values["checkout_date"] = reservation.check_out_date
+                    values["scheduled_date"] = reservation.check_out_date
+
+                # 施設の変更
+                if reservation.facility_id and task.facility_id != reservation.facility_id:
+                    changes.append(
+                        f"施設: {facility_names.get(task.facility_id, task.facility_id)} → "
+                        f"{facility_names.get(reservation.facility_id, reservation.facility_id)}"
+                    )
+                    values["facility_id"] = reservation.facility_id
+
+                if not changes:
+                    continue
+
+                modifications.append((task, values))
+                stats["tasks_modified"] += 1
+
+                # 割当済みの場合は特別な警告
+                if task.status == TaskStatus.ASSIGNED:
+                    stats["conflicts_detected"] += 1
                     self._add_alert(
-                        AlertType.TASK_CREATED,
-                        f"新規清掃タスクを作成: {reservation.room_type or '施設'} - {reservation.check_out_date}",
+                        AlertType.STAFF_REASSIGN_NEEDED,
+                        f"割当済みタスクの内容が変更されました。再確認が必要です。",
                         {
-                            "reservation_id": reservation.id,
-                            "facility_name": reservation.room_type,
-                            "checkout_date": str(reservation.check_out_date),
-                            "guest_name": reservation.guest_name
+                            "task_id": task.id,
+                            "scheduled_date": str(values.get("scheduled_date", task.scheduled_date)),
+                            "changes": changes,
+                            "assigned_staff": staff_names.get(task.id, [])
                         }
                     )
-        
-        # 4. キャンセル検知とタスクの処理
-        for task in existing_tasks:
-            reservation = reservation_map.get(task.reservation_id)
-            
-            if not reservation or reservation.reservation_type == "キャンセル":
-                # 予約がキャンセルされた
-                if task.status == TaskStatus.ASSIGNED:
-                    # 既に割当済みの場合は警告
-                    stats["conflicts_detected"] += 1
+                else:
                     self._add_alert(
-                        AlertType.CONFLICT_DETECTED,
-                        f"割当済みタスクの予約がキャンセルされました",
+                        AlertType.TASK_MODIFIED,
+                        f"タスク内容を更新: {', '.join(changes)}",
                         {
                             "task_id": task.id,
-                            "facility_id": task.facility_id,
-                            "scheduled_date": str(task.scheduled_date),
-                            "assigned_staff": self._get_assigned_staff_names(task.id)
+                            "scheduled_date": str(values.get("scheduled_date", task.scheduled_date)),
+                            "changes": changes
                         }
                     )
-                
-                # タスクをキャンセル状態に
-                task.status = TaskStatus.CANCELLED
-                stats["tasks_cancelled"] += 1
-                self._add_alert(
-                    AlertType.TASK_CANCELLED,
-                    f"予約キャンセルによりタスクをキャンセル",
-                    {"task_id": task.id, "scheduled_date": str(task.scheduled_date)}
-                )
-            
-            # 5. 日時変更の検知
-            elif reservation:
-                modified = False
-                changes = []
-                
-                # チェックアウト日の変更
-                if task.checkout_date != reservation.check_out_date:
-                    changes.append(f"チェックアウト日: {task.checkout_date} → {reservation.check_out_date}")
-                    task.checkout_date = reservation.check_out_date
-                    task.scheduled_date = reservation.check_out_date
-                    modified = True
-                
-                # 施設の変更（room_type変更）
-                if reservation.room_type and task.facility_id:
-                    facility = self.db.query(Facility).filter(Facility.id == task.facility_id).first()
-                    if facility and facility.name != reservation.room_type:
-                        changes.append(f"施設: {facility.name} → {reservation.room_type}")
-                        # 新しい施設を検索または作成
-                        new_facility = self._get_or_create_facility(reservation.room_type)
-                        task.facility_id = new_facility.id
-                        modified = True
-                
-                if modified:
-                    stats["tasks_modified"] += 1
-                    
-                    # 割当済みの場合は特別な警告
-                    if task.status == TaskStatus.ASSIGNED:
-                        stats["conflicts_detected"] += 1
-                        self._add_alert(
-                            AlertType.STAFF_REASSIGN_NEEDED,
-                            f"割当済みタスクの内容が変更されました。再確認が必要です。",
-                            {
-                                "task_id": task.id,
-                                "changes": changes,
-                                "assigned_staff": self._get_assigned_staff_names(task.id)
-                            }
-                        )
-                    else:
-                        self._add_alert(
-                            AlertType.TASK_MODIFIED,
-                            f"タスク内容を更新: {', '.join(changes)}",
-                            {"task_id": task.id, "changes": changes}
-                        )
-        
-        # 6. 変更をコミット
-        self.db.commit()
-        
-        # 結果のサマリー作成
-        stats["total_alerts"] = len(self.alerts)
-        
+
+        for task in cancels:
+            self._add_cancel_alerts(task, stats, staff_names)
+
         return {
-            "success": True,
+            "state": state,
+            "incremental": incremental,
+            "watermark": watermark,
             "stats": stats,
-            "alerts": self.alerts,
-            "sync_time": datetime.now().isoformat()
+            "creates": creates,
+            "cancels": cancels,
+            "modifications": modifications
         }
-    
-    def _create_task_from_reservation(self, reservation: Reservation) -> CleaningTaskModel:
-        """予約から清掃タスクを作成"""
-        # facility_idの解決
-        facility_id = reservation.facility_id
-        if not facility_id:
-            if reservation.room_type:
-                facility = self._get_or_create_facility(reservation.room_type)
-                facility_id = facility.id
-                reservation.facility_id = facility_id
-            else:
-                # デフォルト施設を使用
-                facility = self._get_or_create_facility("デフォルト施設")
-                facility_id = facility.id
-                reservation.facility_id = facility_id
-        
-        # タスク作成
-        task = CleaningTaskModel(
-            reservation_id=reservation.id,
-            facility_id=facility_id,
-            checkout_date=reservation.check_out_date,
-            checkout_time=time(10, 0),  # デフォルト10:00
-            scheduled_date=reservation.check_out_date,
-            scheduled_start_time=time(11, 0),  # デフォルト11:00開始
-            scheduled_end_time=time(16, 0),  # デフォルト16:00終了
-            estimated_duration_minutes=300,  # デフォルト5時間
-            priority=3,
-            status=TaskStatus.UNASSIGNED
+
+    @staticmethod
+    def _is_open(task: CleaningTaskModel, today: date) -> bool:
+        """同期で変更しうるタスクか（今日以降の未完了タスク）"""
+        return task.scheduled_date >= today and task.status not in CLOSED_STATUSES
+
+    def _load_reservations(self, reservation_ids: Iterable[int]) -> List[Reservation]:
+        """予約をまとめて取得"""
+        ids = sorted(reservation_ids)
+        reservations = []
+        for i in range(0, len(ids), CHUNK_SIZE):
+            reservations.extend(
+                self.db.query(Reservation).filter(Reservation.id.in_(ids[i:i + CHUNK_SIZE])).all()
+            )
+        return reservations
+
+    def _load_tasks(self, reservation_ids: Iterable[int]) -> Dict[int, List[CleaningTaskModel]]:
+        """予約ごとの清掃タスクをまとめて取得（完了済みを含む）"""
+        ids = sorted(set(reservation_ids))
+        tasks: Dict[int, List[CleaningTaskModel]] = {}
+        for i in range(0, len(ids), CHUNK_SIZE):
+            for task in self.db.query(CleaningTaskModel).filter(
+                CleaningTaskModel.reservation_id.in_(ids[i:i + CHUNK_SIZE])
+            ).order_by(CleaningTaskModel.id).all():
+                tasks.setdefault(task.reservation_id, []).append(task)
+        return tasks
+
+    def _load_facility_names(self, facility_ids: Iterable[int]) -> Dict[int, str]:
+        """施設名をまとめて取得"""
+        ids = sorted(i for i in facility_ids if i is not None)
+        names = {}
+        for i in range(0, len(ids), CHUNK_SIZE):
+            names.update(
+                self.db.query(Facility.id, Facility.name).filter(Facility.id.in_(ids[i:i + CHUNK_SIZE])).all()
+            )
+        return names
+
+    def _create_tasks_from_reservations(self, reservations: List[Reservation]) -> List[Reservation]:
+        """予約から清掃タスクをまとめて作成
+
+        Returns:
+            タスクを作成した予約
+        """
+        if not reservations:
+            return []
+
+        # facility_idの解決（部屋タイプ名の施設、なければデフォルト施設）
+        unresolved = [r for r in reservations if not r.facility_id]
+        if unresolved:
+            facilities = get_or_create_facilities(
+                self.db, (r.room_type or DEFAULT_FACILITY_NAME for r in unresolved)
+            )
+            for reservation in unresolved:
+                reservation.facility_id = facilities[reservation.room_type or DEFAULT_FACILITY_NAME].id
+                self.resolved_reservation_ids.append(reservation.id)
+
+        # 施設の標準清掃時間
+        durations = dict(
+            self.db.query(
+                FacilityCleaningSettings.facility_id,
+                FacilityCleaningSettings.standard_duration_minutes
+            ).filter(
+                FacilityCleaningSettings.facility_id.in_({r.facility_id for r in reservations})
+            ).all()
         )
-        
-        self.db.add(task)
-        self.db.flush()  # IDを取得
-        return task
-    
-    def _get_or_create_facility(self, name: str) -> Facility:
-        """施設を取得または作成"""
-        facility = self.db.query(Facility).filter(Facility.name == name).first()
-        if not facility:
-            facility = Facility(name=name, is_active=True)
-            self.db.add(facility)
-            self.db.flush()
-        return facility
-    
-    def _get_assigned_staff_names(self, task_id: int) -> List[str]:
-        """タスクに割り当てられたスタッフ名のリストを取得"""
-        shifts = self.db.query(CleaningShiftModel).filter(
-            CleaningShiftModel.task_id == task_id
-        ).all()
-        
-        staff_names = []
-        for shift in shifts:
-            if shift.staff and shift.staff.name:
-                staff_names.append(shift.staff.name)
-        
+
+        self.db.add_all([
+            CleaningTaskModel(
+                reservation_id=reservation.id,
+                facility_id=reservation.facility_id,
+                checkout_date=reservation.check_out_date,
+                checkout_time=time(10, 0),  # デフォルト10:00
+                scheduled_date=reservation.check_out_date,
+                scheduled_start_time=time(11, 0),  # デフォルト11:00開始
+                scheduled_end_time=time(16, 0),  # デフォルト16:00終了
+                estimated_duration_minutes=durations.get(reservation.facility_id) or 300,  # デフォルト5時間
+                priority=3,
+                status=TaskStatus.UNASSIGNED
+            )
+            for reservation in reservations
+        ])
+        self.db.flush()
+        return reservations
+
+    def _add_cancel_alerts(self, task: CleaningTaskModel, stats: Dict[str, int], staff_names: Dict[int, List[str]]):
+        """予約キャンセル（削除）によるタスクキャンセルのアラートを追加"""
+        if task.status == TaskStatus.ASSIGNED:
+            # 既に割当済みの場合は警告
+            stats["conflicts_detected"] += 1
+            self._add_alert(
+                AlertType.CONFLICT_DETECTED,
+                f"割当済みタスクの予約がキャンセルされました",
+                {
+                    "task_id": task.id,
+                    "facility_id": task.facility_id,
+                    "scheduled_date": str(task.scheduled_date),
+                    "assigned_staff": staff_names.get(task.id, [])
+                }
+            )
+
+        stats["tasks_cancelled"] += 1
+        self._add_alert(
+            AlertType.TASK_CANCELLED,
+            f"予約キャンセルによりタスクをキャンセル",
+            {"task_id": task.id, "scheduled_date": str(task.scheduled_date)}
+        )
+
+    def _load_assigned_staff_names(self, task_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """タスクごとに割り当てられたスタッフ名のリストをまとめて取得"""
+        ids = sorted(set(task_ids))
+        staff_names: Dict[int, List[str]] = {}
+        for i in range(0, len(ids), CHUNK_SIZE):
+            rows = self.db.query(CleaningShiftModel.task_id, Staff.name).join(
+                Staff, Staff.id == CleaningShiftModel.staff_id
+            ).filter(
+                CleaningShiftModel.task_id.in_(ids[i:i + CHUNK_SIZE])
+            ).order_by(CleaningShiftModel.id).all()
+            for task_id, name in rows:
+                if name:
+                    staff_names.setdefault(task_id, []).append(name)
         return staff_names
-    
+
     def _add_alert(self, alert_type: AlertType, message: str, details: Dict[str, Any] = None):
         """アラートを追加"""
         alert = {
@@ -239,20 +438,3 @@ class CleaningSyncService:
             "details": details or {}
         }
         self.alerts.append(alert)
-    
-    def get_sync_preview(self) -> Dict[str, Any]:
-        """同期のプレビュー（実際には変更を行わない）
-        
-        Returns:
-            同期した場合の変更内容のプレビュー
-        """
-        # トランザクションを開始するが、最後にロールバック
-        savepoint = self.db.begin_nested()
-        
-        try:
-            result = self.sync_all_tasks()
-            savepoint.rollback()  # 変更を破棄
-            return result
-        except Exception as e:
-            savepoint.rollback()
-            raise e
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""ダッシュボード一括集計サービス
+
+ダッシュボード画面の各ウィジェット（本日の統計・月間統計・予算/前年比較・日別統計・OTA別内訳）を、
+対象月・前年同月・本日の予約をそれぞれ1回だけ読み込み、メモリ上で算出する。
+各ウィジェットの値は個別エンドポイントと同じ定義で計算する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Any, List, Optional
+from datetime import date, datetime, timedelta
+from collections import defaultdict
+import time
+
+from ..models import Reservation, ReservationVersion
+from ..models.reservation import CANCELLED_TYPE
+from ..crud.dashboard import (
+    month_range, get_room_inventory,
+    build_monthly_stats, build_monthly_comparison
+)
+from ..crud.sync_log import get_latest_sync_log
+from .reservation_versions import as_of_filter
+
+# メモリ上の集計に使うカラム
+SLICE_COLUMNS = (
+    Reservation.id,
+    Reservation.facility_id,
+    Reservation.reservation_type,
+    Reservation.check_in_date,
+    Reservation.check_out_date,
+    Reservation.ota_name,
+    Reservation.num_adults,
+    Reservation.num_children,
+    Reservation.num_infants,
+    Reservation.total_amount
+)
+
+# 時点指定の集計で予約履歴から読み込むカラム（予約テーブルと同名）
+VERSION_SLICE_COLUMNS = (ReservationVersion.reservation_pk.label("id"),) + tuple(
+    getattr(ReservationVersion, column.key) for column in SLICE_COLUMNS[1:]
+)
+
+def _load_slice(db: Session, start_date: date, end_date: date, as_of: Optional[datetime] = None) -> List:
+    """期間と重なる予約（キャンセル含む）を取得（as_of 指定時は予約履歴から）"""
+    if as_of:
+        return db.query(*VERSION_SLICE_COLUMNS).filter(
+            and_(
+                as_of_filter(as_of),
+                ReservationVersion.check_in_date <= end_date,
+                ReservationVersion.check_out_date >= start_date
+            )
+        ).all()
+    return db.query(*SLICE_COLUMNS).filter(
+        and_(
+            Reservation.check_in_date <= end_date,
+            Reservation.check_out_date >= start_date
+        )
+    ).all()
+
+def _guest_count(r) -> Optional[int]:
+    """宿泊者数（SQLの加算と同じくNULLを含む場合はNone）"""
+    if r.num_adults is None or r.num_children is None or r.num_infants is None:
+        return None
+    return r.num_adults + r.num_children + r.num_infants
+
+def _nightly_revenue(r) -> float:
+    """1泊あたりの売上（宿泊日テーブルと同じく泊数で均等に按分）"""
+    nights = (r.check_out_date - r.check_in_date).days
+    return (r.total_amount or 0) / nights if nights > 0 else 0
+
+def _nights_in_range(r, start_date: date, end_date: date) -> int:
+    """期間内（両端を含む）の泊数"""
+    return max(
+        0, (min(r.check_out_date, end_date + timedelta(days=1)) - max(r.check_in_date, start_date)).days
+    )
+
+def _compute_today_stats(rows: List, today: date, total_facilities: int) -> Dict[str, Any]:
+    """本日のチェックイン・チェックアウト・宿泊者数・稼働率"""
+    checkin_facilities = set()
+    checkout_facilities = set()
+    occupied_facilities = set()
+    total_guests_today = 0
+    
+    for r in rows:
+        if r.check_in_date == today and r.facility_id is not None:
+            checkin_facilities.add(r.facility_id)
+        if r.check_out_date == today and r.facility_id is not None:
+            checkout_facilities.add(r.facility_id)
+        if r.check_in_date <= today < r.check_out_date:
+            total_guests_today += _guest_count(r) or 0
+            if r.reservation_type != CANCELLED_TYPE and r.facility_id is not None:
+                occupied_facilities.add(r.facility_id)
+    
+    total_facilities = total_facilities or 1
+    occupancy_rate = len(occupied_facilities) / total_facilities * 100
+    
+    return {
+        "today_checkins": len(checkin_facilities),
+        "today_checkouts": len(checkout_facilities),
+        "total_guests_today": int(total_guests_today),
+        "occupancy_rate": round(occupancy_rate, 1)
+    }
+
+def _compute_monthly_stats(rows: List, year: int, month: int, total_rooms: int) -> Dict[str, Any]:
+    """月間統計（月内に切り取った泊数・按分売上で算出）"""
+    start_date, end_date = month_range(year, month)
+    
+    total_reservations = 0
+    total_revenue = 0
+    total_room_nights = 0
+    for r in rows:
+        if r.reservation_type == CANCELLED_TYPE or r.check_out_date <= start_date:
+            continue
+        total_reservations += 1
+        nights = _nights_in_range(r, start_date, end_date)
+        total_revenue += _nightly_revenue(r) * nights
+        total_room_nights += nights
+    
+    return build_monthly_stats(
+        year, month,
+        days_in_month=(end_date - start_date).days + 1,
+        total_reservations=total_reservations,
+        total_revenue=total_revenue,
+        total_room_nights=total_room_nights,
+        total_rooms=total_rooms
+    )
+
+def _compute_daily_stats(rows: List, year: int, month: int) -> List[Dict[str, Any]]:
+    """日別のチェックイン数・稼働室数・売上（各宿泊日に按分）"""
+    start_date, end_date = month_range(year, month)
+    
+    checkins = defaultdict(int)
+    revenue = defaultdict(float)
+    occupied = defaultdict(set)
+    for r in rows:
+        if r.reservation_type == CANCELLED_TYPE:
+            continue
+        if start_date <= r.check_in_date <= end_date:
+            checkins[r.check_in_date] += 1
+        nightly_revenue = _nightly_revenue(r)
+        stay_date = max(r.check_in_date, start_date)
+        last_night = min(r.check_out_date - timedelta(days=1), end_date)
+        while stay_date <= last_night:
+            revenue[stay_date] += nightly_revenue
+            if r.facility_id is not None:
+                occupied[stay_date].add(r.facility_id)
+            stay_date += timedelta(days=1)
+    
+    daily_stats = []
+    current_date = start_date
+    while current_date <= end_date:
+        daily_stats.append({
+            "date": current_date.isoformat(),
+            "checkins": checkins.get(current_date, 0),
+            "occupied_rooms": len(occupied.get(current_date, ())),
+            "revenue": revenue.get(current_date, 0)
+        })
+        current_date += timedelta(days=1)
+    
+    return daily_stats
+
+def _compute_ota_breakdown(rows: List, year: int, month: int) -> List[Dict[str, Any]]:
+    """OTA別の予約数・売上・宿泊者数（月内に宿泊日がある予約、売上は月内の按分額）"""
+    start_date, end_date = month_range(year, month)
+    
+    groups = {}
+    for r in rows:
+        if r.reservation_type == CANCELLED_TYPE:
+            continue
+        nights = _nights_in_range(r, start_date, end_date)
+        if nights == 0:
+            continue
+        group = groups.setdefault(r.ota_name, {"count": 0, "revenue": 0, "guests": 0})
+        group["count"] += 1
+        group["revenue"] += _nightly_revenue(r) * nights
+        group["guests"] += (r.num_adults or 0) + (r.num_children or 0) + (r.num_infants or 0)
+    
+    breakdown = []
+    for ota_name, group in groups.items():
+        total_revenue = group["revenue"] or 0
+        breakdown.append({
+            "ota_name": ota_name or "直接予約",
+            "reservation_count": group["count"],
+            "total_revenue": total_revenue,
+            "total_guests": group["guests"] or 0,
+            "average_revenue": (total_revenue / group["count"]) if group["count"] > 0 else 0
+        })
+    
+    # 売上高で降順ソート
+    breakdown.sort(key=lambda x: x['total_revenue'], reverse=True)
+    
+    return breakdown
+
+def get_dashboard_summary(
+    db: Session,
+    year: int,
+    month: int,
+    as_of: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """ダッシュボードの全ウィジェットを一括で算出
+    
+    as_of を指定すると予約履歴からその時点の予約台帳で集計する
+    （本日の統計は as_of の日付が基準。最近の予約・同期状態は現在のもの）。
+    
+    Returns:
+        各ウィジェットのデータと、読み込み・各ウィジェットの処理時間（ms）を含むメタデータ
+    """
+    timings = {}
+    
+    def timed(name, func, *args):
+        started = time.perf_counter()
+        result = func(*args)
+        timings[name] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+    
+    today = as_of.date() if as_of else date.today()
+    start_date, end_date = month_range(year, month)
+    last_year_start, last_year_end = month_range(year - 1, month)
+    
+    # 予約データの読み込み（対象月・前年同月・本日）
+    load_started = time.perf_counter()
+    month_rows = _load_slice(db, start_date, end_date, as_of)
+    last_year_rows = _load_slice(db, last_year_start, last_year_end, as_of)
+    if start_date <= today <= end_date:
+        today_rows = month_rows
+    else:
+        today_rows = _load_slice(db, today, today, as_of)
+    total_facilities = get_room_inventory(db)
+    load_ms = round((time.perf_counter() - load_started) * 1000, 2)
+    
+    stats = timed("stats", _compute_today_stats, today_rows, today, total_facilities)
+    stats["recent_reservations"] = db.query(Reservation).order_by(
+        Reservation.created_at.desc()
+    ).limit(10).all()
+    stats["sync_status"] = get_latest_sync_log(db)
+    
+    monthly_stats = timed("monthly_stats", _compute_monthly_stats, month_rows, year, month, total_facilities)
+    
+    def compute_comparison():
+        last_year_stats = _compute_monthly_stats(last_year_rows, year - 1, month, total_facilities)
+        return build_monthly_comparison(year, month, monthly_stats, last_year_stats)
+    monthly_comparison = timed("monthly_comparison", compute_comparison)
+    
+    daily_stats = timed("daily_stats", _compute_daily_stats, month_rows, year, month)
+    ota_breakdown = timed("ota_breakdown", _compute_ota_breakdown, month_rows, year, month)
+    
+    return {
+        "year": year,
+        "month": month,
+        "as_of": as_of,
+        "stats": stats,
+        "monthly_stats": monthly_stats,
+        "monthly_comparison": monthly_comparison,
+        "daily_stats": daily_stats,
+        "ota_breakdown": ota_breakdown,
+        "meta": {
+            "reservation_rows": len(month_rows) + len(last_year_rows) + (0 if today_rows is month_rows else len(today_rows)),
+            "load_ms": load_ms,
+            "widget_ms": timings
+        }
+    }
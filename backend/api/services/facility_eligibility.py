@@ -0,0 +1,185 @@
+"""スタッフ・グループの対応可能施設インデックス
+
+対応可能施設テーブル（staff_facilities / group_facilities）から、施設ごとに対応できる
+スタッフ・グループの集合をビットセット（Pythonの整数、ビットi = i番目のスタッフ）でメモリに保持する。
+対応可能施設が未登録のスタッフ・グループは全施設に対応できるものとして扱う。
+スタッフ・グループ・対応可能施設の変更がコミットされたら次回参照時に作り直す。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, insert, text
+from typing import Dict, List, Optional, Set
+from itertools import chain
+import json
+import threading
+import logging
+
+from ..models import Facility
+from ..models.cleaning import Staff, StaffGroup, StaffFacility, GroupFacility
+
+logger = logging.getLogger(__name__)
+
+# インデックスの対象（自動割当の担当者の種類と同じ）
+KINDS = ("staff", "group")
+
+# 旧形式（JSON配列カラム）の対応可能施設 → 対応可能施設テーブル
+LEGACY_FACILITY_COLUMNS = (
+    ("cleaning_staff", StaffFacility, "staff_id"),
+    ("cleaning_staff_groups", GroupFacility, "group_id")
+)
+
+_MODIFIED_KEY = "facility_eligibility_modified"
+
+class FacilityEligibilityIndex:
+    """施設 → 対応可能なスタッフ・グループのビットセット"""
+
+    def __init__(self):
+        self._ids: Dict[str, List[int]] = {kind: [] for kind in KINDS}
+        self._facility_masks: Dict[str, Dict[int, int]] = {kind: {} for kind in KINDS}
+        self._unrestricted: Dict[str, int] = {kind: 0 for kind in KINDS}
+        self._facilities: Dict[str, Dict[int, Set[int]]] = {kind: {} for kind in KINDS}
+        self._stale = True
+        self._lock = threading.Lock()
+
+    def mark_stale(self) -> None:
+        """次回参照時に作り直す"""
+        with self._lock:
+            self._stale = True
+
+    def _build(self, kind: str, ids: List[int], links: List) -> None:
+        positions = {owner_id: i for i, owner_id in enumerate(ids)}
+        facility_masks: Dict[int, int] = {}
+        facilities: Dict[int, Set[int]] = {}
+        for owner_id, facility_id in links:
+            if owner_id not in positions:
+                continue
+            facility_masks[facility_id] = facility_masks.get(facility_id, 0) | (1 << positions[owner_id])
+            facilities.setdefault(owner_id, set()).add(facility_id)
+
+        unrestricted = 0
+        for owner_id, i in positions.items():
+            if owner_id not in facilities:
+                unrestricted |= 1 << i
+
+        self._ids[kind] = ids
+        self._facility_masks[kind] = facility_masks
+        self._unrestricted[kind] = unrestricted
+        self._facilities[kind] = facilities
+
+    def refresh(self, db: Session) -> None:
+        """変更があれば作り直す"""
+        with self._lock:
+            if not self._stale:
+                return
+            self._build(
+                "staff",
+                [row[0] for row in db.query(Staff.id).order_by(Staff.id).all()],
+                db.query(StaffFacility.staff_id, StaffFacility.facility_id).all()
+            )
+            self._build(
+                "group",
+                [row[0] for row in db.query(StaffGroup.id).order_by(StaffGroup.id).all()],
+                db.query(GroupFacility.group_id, GroupFacility.facility_id).all()
+            )
+            self._stale = False
+
+    def facility_mask(self, kind: str, facility_id: int) -> int:
+        """施設に対応できるスタッフ（グループ）のビットセット"""
+        with self._lock:
+            return self._facility_masks[kind].get(facility_id, 0) | self._unrestricted[kind]
+
+    def decode(self, kind: str, mask: int) -> List[int]:
+        """ビットセットをID（昇順）に変換"""
+        with self._lock:
+            ids = self._ids[kind]
+        result = []
+        while mask:
+            low = mask & -mask
+            result.append(ids[low.bit_length() - 1])
+            mask ^= low
+        return result
+
+    def eligible_ids(self, kind: str, facility_id: int) -> List[int]:
+        """施設に対応できるスタッフ（グループ）のID"""
+        return self.decode(kind, self.facility_mask(kind, facility_id))
+
+    def facilities_of(self, kind: str, owner_id: int) -> Optional[Set[int]]:
+        """スタッフ（グループ）の対応可能施設（未登録は全施設対応としてNone）"""
+        with self._lock:
+            return self._facilities[kind].get(owner_id)
+
+eligibility_index = FacilityEligibilityIndex()
+
+def get_eligible_staff_ids(db: Session, facility_id: int) -> List[int]:
+    """施設に対応できるスタッフのIDを取得"""
+    eligibility_index.refresh(db)
+    return eligibility_index.eligible_ids("staff", facility_id)
+
+def get_eligible_group_ids(db: Session, facility_id: int) -> List[int]:
+    """施設に対応できるスタッフグループのIDを取得"""
+    eligibility_index.refresh(db)
+    return eligibility_index.eligible_ids("group", facility_id)
+
+def copy_legacy_facility_links(db: Session) -> int:
+    """旧形式の available_facilities（JSON配列）を対応可能施設テーブルに移す（コミットはしない）
+
+    対応可能施設テーブルが空で、旧カラムが残っているテーブルだけを対象にする。
+    存在しない施設のIDは除外し、移した後の旧カラムはNULLにする。
+
+    Returns:
+        作成した行数
+    """
+    inspector = inspect(db.get_bind())
+    facility_ids = {row[0] for row in db.query(Facility.id).all()}
+
+    total = 0
+    for table_name, link_class, owner_column in LEGACY_FACILITY_COLUMNS:
+        columns = {column["name"] for column in inspector.get_columns(table_name)}
+        if "available_facilities" not in columns or db.query(link_class).first() is not None:
+            continue
+
+        rows = []
+        for owner_id, value in db.execute(
+            text(f"SELECT id, available_facilities FROM {table_name}")
+        ).all():
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    value = None
+            if not isinstance(value, list):
+                continue
+            for facility_id in dict.fromkeys(value):
+                try:
+                    facility_id = int(facility_id)
+                except (TypeError, ValueError):
+                    continue
+                if facility_id in facility_ids:
+                    rows.append({owner_column: owner_id, "facility_id": facility_id})
+        if rows:
+            db.execute(insert(link_class), rows)
+        # 移した後は旧カラムを空にし、再度移されないようにする
+        db.execute(text(f"UPDATE {table_name} SET available_facilities = NULL"))
+        total += len(rows)
+
+    if total:
+        logger.info(f"Copied legacy available_facilities: {total} rows")
+    return total
+
+@event.listens_for(Session, "before_flush")
+def _track_eligibility_changes(session, flush_context, instances):
+    """スタッフ・グループ・対応可能施設の追加・変更・削除を記録"""
+    if any(
+        isinstance(obj, (Staff, StaffGroup, StaffFacility, GroupFacility))
+        for obj in chain(session.new, session.dirty, session.deleted)
+    ):
+        session.info[_MODIFIED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    if session.info.pop(_MODIFIED_KEY, False):
+        eligibility_index.mark_stale()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_MODIFIED_KEY, None)
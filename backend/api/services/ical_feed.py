@@ -0,0 +1,128 @@
+"""施設ごとのiCal（.ics）予約カレンダー配信サービス
+
+施設の有効な予約を終日イベントとして出力した .ics を施設ごとにキャッシュし、
+その施設の予約変更がコミットされたときだけ作り直す。
+ETag / Last-Modified による条件付きリクエストに対応する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Any, Iterable, Optional
+from datetime import date, datetime, timedelta, timezone
+import hashlib
+import threading
+
+from ..models import Facility, Reservation
+from ..models.reservation import CANCELLED_TYPE
+
+# 何日前にチェックアウトした予約まで含めるか
+ICAL_PAST_DAYS = 30
+
+PRODUCT_ID = "-//Vacation Rental PMS//Availability//JA"
+
+# 施設ごとの生成済みカレンダー（無効化後も ETag・最終更新日時の引き継ぎに使う）
+_feed_cache: Dict[int, Dict[str, Any]] = {}
+_feed_cache_version = 0
+_feed_cache_lock = threading.Lock()
+
+def invalidate_calendar_feeds(facility_ids: Optional[Iterable[int]] = None) -> None:
+    """施設のカレンダーを次回取得時に作り直す（facility_ids 省略時は全施設）"""
+    global _feed_cache_version
+    with _feed_cache_lock:
+        _feed_cache_version += 1
+        targets = _feed_cache.keys() if facility_ids is None else facility_ids
+        for facility_id in targets:
+            if facility_id in _feed_cache:
+                _feed_cache[facility_id]["stale"] = True
+
+def _escape_text(value: str) -> str:
+    """iCalendarのTEXT値をエスケープ"""
+    return (
+        value.replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\n", "\\n")
+    )
+
+def render_calendar(db: Session, facility: Facility, today: date) -> bytes:
+    """施設の予約をブロック期間とするiCalendarを生成（ゲスト情報は含めない）"""
+    reservations = db.query(
+        Reservation.reservation_id,
+        Reservation.check_in_date,
+        Reservation.check_out_date
+    ).filter(
+        and_(
+            Reservation.facility_id == facility.id,
+            Reservation.reservation_type != CANCELLED_TYPE,
+            Reservation.check_in_date < Reservation.check_out_date,
+            Reservation.check_out_date >= today - timedelta(days=ICAL_PAST_DAYS)
+        )
+    ).order_by(Reservation.check_in_date, Reservation.reservation_id).all()
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        f"PRODID:{PRODUCT_ID}",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape_text(facility.name or str(facility.id))}"
+    ]
+    for reservation in reservations:
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:{reservation.reservation_id}-{facility.id}@vacation-rental-pms",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{reservation.check_in_date.strftime('%Y%m%d')}",
+            f"DTEND;VALUE=DATE:{reservation.check_out_date.strftime('%Y%m%d')}",
+            "SUMMARY:Reserved",
+            "TRANSP:OPAQUE",
+            "END:VEVENT"
+        ])
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(lines) + "\r\n").encode("utf-8")
+
+def _content_etag(content: bytes) -> str:
+    """DTSTAMPを除いた内容からETagを算出（再生成しても予約が同じなら同じ値）"""
+    body = b"\r\n".join(
+        line for line in content.split(b"\r\n") if not line.startswith(b"DTSTAMP:")
+    )
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def get_calendar_feed(db: Session, facility_id: int) -> Optional[Dict[str, Any]]:
+    """施設のカレンダーを取得（キャッシュがなければ生成）
+
+    Returns:
+        content / etag / last_modified の辞書。施設が存在しない場合はNone
+    """
+    today = date.today()
+    with _feed_cache_lock:
+        cached = _feed_cache.get(facility_id)
+        version = _feed_cache_version
+    if cached and not cached["stale"] and cached["rendered_on"] == today:
+        return cached
+
+    facility = db.query(Facility).filter(Facility.id == facility_id).first()
+    if not facility:
+        return None
+
+    content = render_calendar(db, facility, today)
+    etag = _content_etag(content)
+    # 内容が変わっていなければ最終更新日時を引き継ぐ
+    if cached and cached["etag"] == etag:
+        last_modified = cached["last_modified"]
+    else:
+        last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+
+    feed = {
+        "content": content,
+        "etag": etag,
+        "last_modified": last_modified,
+        "rendered_on": today,
+        # 生成中に予約変更がコミットされた場合は次回作り直す
+        "stale": False
+    }
+    with _feed_cache_lock:
+        feed["stale"] = version != _feed_cache_version
+        _feed_cache[facility_id] = feed
+    return feed
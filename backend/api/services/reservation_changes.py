@@ -0,0 +1,85 @@
+"""予約変更時の派生データ更新
+
+予約の作成・更新・キャンセル・削除を行う処理（CSV同期・予約CRUD・一括API）は
+コミット前にここを呼び出し、予約から派生するテーブルを同じトランザクションで更新する。
+メモリ上のキャッシュ（空き状況インデックス・iCalカレンダー・ブッキングペース）は、
+変更のあった施設をセッションに記録しておき、コミット後に無効化する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event
+from typing import Iterable
+from itertools import chain
+
+from ..models import Facility
+
+from .reservation_nights import refresh_reservation_nights, remove_reservation_nights
+from .revenue_cube import get_cube_months, refresh_revenue_cube
+from .booking_pace import invalidate_pace_cache
+from .reservation_versions import record_reservation_versions
+from .availability_index import availability_index, get_night_facility_ids
+from .ical_feed import invalidate_calendar_feeds
+from .booking_issues import refresh_booking_issues
+
+# コミット待ちの変更を記録するセッション情報のキー
+_CHANGED_FACILITIES_KEY = "reservation_changed_facilities"
+_FACILITIES_MODIFIED_KEY = "facilities_modified"
+_RESERVATIONS_CHANGED_KEY = "reservations_changed"
+
+def apply_reservation_changes(
+    db: Session,
+    reservation_ids: Iterable[int],
+    deleted: bool = False
+) -> None:
+    """予約変更を派生データに反映（コミットはしない）
+    
+    Args:
+        db: データベースセッション
+        reservation_ids: 変更された予約の主キー
+        deleted: 削除の場合True（予約行を削除する前に呼び出すこと）
+    """
+    reservation_ids = {i for i in reservation_ids if i is not None}
+    if not reservation_ids:
+        return
+    
+    # 変更前の宿泊月・施設（日付・施設の変更や削除で集計から外れる分）
+    cube_months = get_cube_months(db, reservation_ids)
+    facility_ids = get_night_facility_ids(db, reservation_ids)
+    
+    if deleted:
+        remove_reservation_nights(db, reservation_ids)
+    else:
+        refresh_reservation_nights(db, reservation_ids)
+        cube_months |= get_cube_months(db, reservation_ids)
+        facility_ids |= get_night_facility_ids(db, reservation_ids)
+    
+    refresh_booking_issues(db, facility_ids, reservation_ids, deleted=deleted)
+    db.info.setdefault(_CHANGED_FACILITIES_KEY, set()).update(facility_ids)
+    db.info[_RESERVATIONS_CHANGED_KEY] = True
+    refresh_revenue_cube(db, cube_months)
+    record_reservation_versions(db, reservation_ids, deleted=deleted)
+
+@event.listens_for(Session, "before_flush")
+def _track_facility_changes(session, flush_context, instances):
+    """施設の追加・変更・削除を記録"""
+    if any(isinstance(obj, Facility) for obj in chain(session.new, session.dirty, session.deleted)):
+        session.info[_FACILITIES_MODIFIED_KEY] = True
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    """コミットされた変更をメモリ上のキャッシュに反映"""
+    facility_ids = session.info.pop(_CHANGED_FACILITIES_KEY, None)
+    if facility_ids:
+        availability_index.mark_dirty(facility_ids)
+        invalidate_calendar_feeds(facility_ids)
+    if session.info.pop(_FACILITIES_MODIFIED_KEY, False):
+        availability_index.mark_stale()
+        invalidate_calendar_feeds()
+    if session.info.pop(_RESERVATIONS_CHANGED_KEY, False):
+        invalidate_pace_cache()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGED_FACILITIES_KEY, None)
+    session.info.pop(_FACILITIES_MODIFIED_KEY, None)
+    session.info.pop(_RESERVATIONS_CHANGED_KEY, None)
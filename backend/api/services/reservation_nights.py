@@ -0,0 +1,129 @@
+"""宿泊日ファクトテーブル（reservation_nights）の差分更新サービス"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete
+from typing import Iterable, List, Dict, Any
+from datetime import date
+import logging
+import numpy as np
+
+from ..models.reservation import Reservation, CANCELLED_TYPE
+from ..models.reservation_night import ReservationNight
+
+logger = logging.getLogger(__name__)
+
+# IN句に渡すIDの最大件数（SQLiteの変数上限対策）
+CHUNK_SIZE = 500
+
+def _chunks(ids: List[int]):
+    for i in range(0, len(ids), CHUNK_SIZE):
+        yield ids[i:i + CHUNK_SIZE]
+
+# 宿泊日に按分する金額（予約のカラム → 宿泊日テーブルのカラム）
+ALLOCATED_AMOUNTS = {
+    "total_amount": "revenue",
+    "option_amount": "option_amount",
+    "point_amount": "point_amount"
+}
+
+def allocate_nights(reservations: List) -> List[Dict[str, Any]]:
+    """予約から宿泊日ごとの行データを生成し、売上・オプション・ポイントを泊数で均等に按分
+    
+    予約ごとのループを行わず、泊数分の繰り返し配列をまとめて作成する。
+    キャンセル・日付不正の予約は0行。
+    """
+    reservations = [
+        r for r in reservations
+        if r.reservation_type != CANCELLED_TYPE and r.check_in_date and r.check_out_date
+    ]
+    if not reservations:
+        return []
+    
+    check_in = np.array([r.check_in_date.toordinal() for r in reservations], dtype=np.int64)
+    check_out = np.array([r.check_out_date.toordinal() for r in reservations], dtype=np.int64)
+    nights = np.clip(check_out - check_in, 0, None)
+    if nights.sum() == 0:
+        return []
+    
+    # 予約の添字と宿泊日を泊数分展開
+    index = np.repeat(np.arange(len(reservations)), nights)
+    first_row = np.repeat(np.cumsum(nights) - nights, nights)
+    stay_dates = check_in[index] + (np.arange(index.size) - first_row)
+    
+    allocated = {}
+    for source, target in ALLOCATED_AMOUNTS.items():
+        amounts = np.array([getattr(r, source) or 0 for r in reservations], dtype=float)
+        per_night = np.divide(amounts, nights, out=np.zeros_like(amounts), where=nights > 0)
+        allocated[target] = per_night[index].tolist()
+    
+    date_cache = {}
+    rows = []
+    for i, (position, ordinal) in enumerate(zip(index.tolist(), stay_dates.tolist())):
+        reservation = reservations[position]
+        stay_date = date_cache.get(ordinal)
+        if stay_date is None:
+            stay_date = date_cache[ordinal] = date.fromordinal(ordinal)
+        rows.append({
+            "reservation_id": reservation.id,
+            "facility_id": reservation.facility_id,
+            "stay_date": stay_date,
+            "ota_name": reservation.ota_name,
+            "ota_type": reservation.ota_type,
+            "num_adults": reservation.num_adults or 0,
+            "num_children": reservation.num_children or 0,
+            "num_infants": reservation.num_infants or 0,
+            **{target: allocated[target][i] for target in ALLOCATED_AMOUNTS.values()}
+        })
+    
+    return rows
+
+def remove_reservation_nights(db: Session, reservation_ids: Iterable[int]) -> None:
+    """指定予約の宿泊日行を削除"""
+    ids = sorted({i for i in reservation_ids if i is not None})
+    for chunk in _chunks(ids):
+        db.execute(
+            delete(ReservationNight).where(ReservationNight.reservation_id.in_(chunk))
+        )
+
+def refresh_reservation_nights(db: Session, reservation_ids: Iterable[int]) -> int:
+    """指定予約の宿泊日行を作り直す（コミットはしない）
+    
+    Returns:
+        作成した行数
+    """
+    ids = sorted({i for i in reservation_ids if i is not None})
+    if not ids:
+        return 0
+    
+    # 未反映の変更を確定させてから再計算する
+    db.flush()
+    remove_reservation_nights(db, ids)
+    
+    columns = (
+        Reservation.id, Reservation.facility_id, Reservation.reservation_type,
+        Reservation.check_in_date, Reservation.check_out_date,
+        Reservation.ota_name, Reservation.ota_type,
+        Reservation.num_adults, Reservation.num_children, Reservation.num_infants,
+        Reservation.total_amount, Reservation.option_amount, Reservation.point_amount
+    )
+    
+    rows = []
+    for chunk in _chunks(ids):
+        rows.extend(allocate_nights(db.query(*columns).filter(Reservation.id.in_(chunk)).all()))
+    
+    if rows:
+        db.execute(insert(ReservationNight), rows)
+    
+    return len(rows)
+
+def rebuild_all_reservation_nights(db: Session) -> int:
+    """全予約から宿泊日テーブルを再構築（初期データ投入・不整合修復用）"""
+    db.execute(delete(ReservationNight))
+    
+    ids = [row.id for row in db.query(Reservation.id).all()]
+    total = 0
+    for chunk in _chunks(ids):
+        total += refresh_reservation_nights(db, chunk)
+    
+    logger.info(f"Rebuilt reservation_nights: {total} rows from {len(ids)} reservations")
+    return total
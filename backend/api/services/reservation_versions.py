@@ -0,0 +1,169 @@
+"""予約履歴テーブル（reservation_versions）の更新・時点指定検索サービス"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update, and_, or_
+from typing import Iterable, List, Dict, Any, Optional
+from datetime import datetime, date
+import hashlib
+import json
+import logging
+
+from ..models import Reservation, ReservationVersion
+from .reservation_nights import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 履歴に含めない予約テーブルのカラム（変更検知の対象外）
+METADATA_COLUMNS = ("id", "created_at", "updated_at", "sync_id")
+
+# 内容として履歴に保存するカラム
+CONTENT_COLUMNS = [
+    column.name for column in Reservation.__table__.columns
+    if column.name not in METADATA_COLUMNS
+]
+
+# 履歴テーブルに個別カラムとして複製する項目
+INDEXED_COLUMNS = [
+    "reservation_id", "reservation_type", "ota_name", "ota_type", "facility_id", "room_type",
+    "check_in_date", "check_out_date", "guest_name",
+    "num_adults", "num_children", "num_infants", "total_amount"
+]
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+def _content_json(content: Dict[str, Any]) -> str:
+    return json.dumps(content, ensure_ascii=False, sort_keys=True, default=_json_default)
+
+def _version_row(row, valid_from: datetime) -> Dict[str, Any]:
+    """予約1件から履歴行を作成"""
+    content = {name: getattr(row, name) for name in CONTENT_COLUMNS}
+    data = _content_json(content)
+    return {
+        "reservation_pk": row.id,
+        "valid_from": valid_from,
+        "valid_to": None,
+        "content_hash": hashlib.sha256(data.encode("utf-8")).hexdigest(),
+        "sync_id": row.sync_id,
+        **{name: content[name] for name in INDEXED_COLUMNS},
+        "data": _content_json({**content, "created_at": row.created_at})
+    }
+
+def _load_reservation_rows(db: Session, ids: List[int]) -> List:
+    columns = [getattr(Reservation, name) for name in CONTENT_COLUMNS + list(METADATA_COLUMNS)]
+    return db.query(*columns).filter(Reservation.id.in_(ids)).all()
+
+def record_reservation_versions(
+    db: Session,
+    reservation_ids: Iterable[int],
+    deleted: bool = False,
+    now: Optional[datetime] = None
+) -> int:
+    """予約の現在の内容を履歴に記録（内容が変わった予約だけ、コミットはしない）
+
+    Args:
+        reservation_ids: 変更された予約の主キー
+        deleted: 削除の場合True（現在の履歴を閉じるだけ）
+        now: 有効期間の境界時刻（省略時は現在時刻）
+
+    Returns:
+        追加した履歴行数
+    """
+    ids = sorted({i for i in reservation_ids if i is not None})
+    if not ids:
+        return 0
+    now = now or datetime.utcnow()
+
+    if deleted:
+        for i in range(0, len(ids), CHUNK_SIZE):
+            db.execute(
+                update(ReservationVersion).where(
+                    and_(
+                        ReservationVersion.reservation_pk.in_(ids[i:i + CHUNK_SIZE]),
+                        ReservationVersion.valid_to.is_(None)
+                    )
+                ).values(valid_to=now)
+            )
+        return 0
+
+    db.flush()
+
+    total = 0
+    for i in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[i:i + CHUNK_SIZE]
+        current = {
+            row.reservation_pk: (row.id, row.content_hash)
+            for row in db.query(
+                ReservationVersion.id,
+                ReservationVersion.reservation_pk,
+                ReservationVersion.content_hash
+            ).filter(
+                and_(
+                    ReservationVersion.reservation_pk.in_(chunk),
+                    ReservationVersion.valid_to.is_(None)
+                )
+            ).all()
+        }
+
+        closed_ids = []
+        new_rows = []
+        for row in _load_reservation_rows(db, chunk):
+            version = _version_row(row, now)
+            existing = current.get(row.id)
+            if existing and existing[1] == version["content_hash"]:
+                continue
+            if existing:
+                closed_ids.append(existing[0])
+            new_rows.append(version)
+
+        if closed_ids:
+            db.execute(
+                update(ReservationVersion).where(
+                    ReservationVersion.id.in_(closed_ids)
+                ).values(valid_to=now)
+            )
+        if new_rows:
+            db.execute(insert(ReservationVersion), new_rows)
+        total += len(new_rows)
+
+    return total
+
+def initialize_reservation_versions(db: Session) -> int:
+    """履歴のない予約に初期履歴を作成（有効開始は最終更新日時）"""
+    versioned = {pk for (pk,) in db.query(ReservationVersion.reservation_pk).distinct().all()}
+    ids = [pk for (pk,) in db.query(Reservation.id).all() if pk not in versioned]
+
+    total = 0
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = [
+            _version_row(row, row.updated_at or row.created_at or datetime.utcnow())
+            for row in _load_reservation_rows(db, ids[i:i + CHUNK_SIZE])
+        ]
+        if rows:
+            db.execute(insert(ReservationVersion), rows)
+        total += len(rows)
+
+    logger.info(f"Initialized reservation_versions: {total} rows")
+    return total
+
+def as_of_filter(as_of: datetime):
+    """指定時点で有効だった履歴行の条件"""
+    return and_(
+        ReservationVersion.valid_from <= as_of,
+        or_(
+            ReservationVersion.valid_to.is_(None),
+            ReservationVersion.valid_to > as_of
+        )
+    )
+
+def version_to_reservation(version: ReservationVersion) -> Dict[str, Any]:
+    """履歴行を予約レスポンスと同じ形の辞書に変換"""
+    data = json.loads(version.data)
+    return {
+        **data,
+        "id": version.reservation_pk,
+        "updated_at": version.valid_from,
+        "sync_id": version.sync_id
+    }
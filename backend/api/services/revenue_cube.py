@@ -0,0 +1,226 @@
+"""OTA×施設×月の売上集計テーブル（revenue_cube）の更新・ピボットサービス"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, delete, func, extract, and_, or_
+from typing import Iterable, Dict, Any, Optional, Set, Tuple
+import logging
+
+from ..models import Facility, ReservationNight, RevenueCube
+from ..crud.dashboard import month_range
+from .reservation_nights import CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# ピボットに使える軸と集計値
+CUBE_DIMENSIONS = ("year_month", "facility", "ota_type", "ota_name")
+CUBE_MEASURES = ("reservations", "nights", "revenue", "guests")
+
+def _format_year_month(year: int, month: int) -> str:
+    return f"{int(year):04d}-{int(month):02d}"
+
+def get_cube_months(db: Session, reservation_ids: Iterable[int]) -> Set[Tuple[int, int]]:
+    """指定予約の宿泊日が含まれる月を取得（宿泊日テーブルの現在の内容から）"""
+    ids = sorted({i for i in reservation_ids if i is not None})
+    stay_year = extract('year', ReservationNight.stay_date)
+    stay_month = extract('month', ReservationNight.stay_date)
+    
+    months = set()
+    for i in range(0, len(ids), CHUNK_SIZE):
+        rows = db.query(stay_year, stay_month).filter(
+            ReservationNight.reservation_id.in_(ids[i:i + CHUNK_SIZE])
+        ).distinct().all()
+        months.update((int(year), int(month)) for year, month in rows)
+    return months
+
+def refresh_revenue_cube(db: Session, months: Iterable[Tuple[int, int]]) -> int:
+    """指定月の集計行を宿泊日テーブルから作り直す（コミットはしない）
+    
+    Returns:
+        作成した行数
+    """
+    months = sorted(set(months))
+    if not months:
+        return 0
+    
+    db.flush()
+    db.execute(
+        delete(RevenueCube).where(
+            RevenueCube.year_month.in_([_format_year_month(y, m) for y, m in months])
+        )
+    )
+    
+    stay_year = extract('year', ReservationNight.stay_date).label('stay_year')
+    stay_month = extract('month', ReservationNight.stay_date).label('stay_month')
+    
+    # 予約×月で集計してから軸ごとに合算（宿泊者数は予約ごとに1回だけ数える）
+    per_reservation = db.query(
+        stay_year,
+        stay_month,
+        ReservationNight.facility_id,
+        ReservationNight.ota_type,
+        ReservationNight.ota_name,
+        ReservationNight.reservation_id,
+        func.count(ReservationNight.id).label('nights'),
+        func.sum(ReservationNight.revenue).label('revenue'),
+        func.max(
+            func.coalesce(ReservationNight.num_adults, 0)
+            + func.coalesce(ReservationNight.num_children, 0)
+            + func.coalesce(ReservationNight.num_infants, 0)
+        ).label('guests')
+    ).filter(
+        or_(*[
+            ReservationNight.stay_date.between(*month_range(year, month))
+            for year, month in months
+        ])
+    ).group_by(
+        stay_year, stay_month,
+        ReservationNight.facility_id, ReservationNight.ota_type, ReservationNight.ota_name,
+        ReservationNight.reservation_id
+    ).subquery()
+    
+    cube_rows = db.query(
+        per_reservation.c.stay_year,
+        per_reservation.c.stay_month,
+        per_reservation.c.facility_id,
+        per_reservation.c.ota_type,
+        per_reservation.c.ota_name,
+        func.count().label('reservations'),
+        func.sum(per_reservation.c.nights).label('nights'),
+        func.sum(per_reservation.c.revenue).label('revenue'),
+        func.sum(per_reservation.c.guests).label('guests')
+    ).group_by(
+        per_reservation.c.stay_year,
+        per_reservation.c.stay_month,
+        per_reservation.c.facility_id,
+        per_reservation.c.ota_type,
+        per_reservation.c.ota_name
+    ).all()
+    
+    rows = [
+        {
+            "year_month": _format_year_month(row.stay_year, row.stay_month),
+            "facility_id": row.facility_id,
+            "ota_type": row.ota_type,
+            "ota_name": row.ota_name,
+            "reservations": row.reservations or 0,
+            "nights": row.nights or 0,
+            "revenue": row.revenue or 0,
+            "guests": row.guests or 0
+        }
+        for row in cube_rows
+    ]
+    if rows:
+        db.execute(insert(RevenueCube), rows)
+    
+    return len(rows)
+
+def rebuild_revenue_cube(db: Session) -> int:
+    """宿泊日テーブル全体から集計テーブルを再構築（初期データ投入・不整合修復用）"""
+    db.execute(delete(RevenueCube))
+    
+    stay_year = extract('year', ReservationNight.stay_date)
+    stay_month = extract('month', ReservationNight.stay_date)
+    months = [
+        (int(year), int(month))
+        for year, month in db.query(stay_year, stay_month).distinct().all()
+    ]
+    
+    total = 0
+    for i in range(0, len(months), 12):
+        total += refresh_revenue_cube(db, months[i:i + 12])
+    
+    logger.info(f"Rebuilt revenue_cube: {total} rows for {len(months)} months")
+    return total
+
+def pivot_revenue_cube(
+    db: Session,
+    start_month: str,
+    end_month: str,
+    rows: str = "ota_name",
+    columns: Optional[str] = None,
+    facility_id: Optional[int] = None,
+    ota_type: Optional[str] = None,
+    ota_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """集計テーブルを任意の軸でピボット
+    
+    Args:
+        start_month, end_month: 対象月（YYYY-MM、両端を含む）
+        rows: 行の軸（CUBE_DIMENSIONS のいずれか）
+        columns: 列の軸（省略時は合計列のみ）
+        facility_id, ota_type, ota_name: 絞り込み条件
+    
+    Returns:
+        行・列のキーと、集計値ごとの行列・行合計・列合計・総計
+        （予約数は月をまたぐ予約を各月で数えるため、月をまたいだ合計は延べ数）
+    """
+    query = db.query(
+        RevenueCube.year_month,
+        RevenueCube.facility_id,
+        Facility.name.label('facility_name'),
+        RevenueCube.ota_type,
+        RevenueCube.ota_name,
+        RevenueCube.reservations,
+        RevenueCube.nights,
+        RevenueCube.revenue,
+        RevenueCube.guests
+    ).outerjoin(
+        Facility, RevenueCube.facility_id == Facility.id
+    ).filter(
+        and_(
+            RevenueCube.year_month >= start_month,
+            RevenueCube.year_month <= end_month
+        )
+    )
+    if facility_id is not None:
+        query = query.filter(RevenueCube.facility_id == facility_id)
+    if ota_type:
+        query = query.filter(RevenueCube.ota_type == ota_type)
+    if ota_name:
+        query = query.filter(RevenueCube.ota_name == ota_name)
+    
+    def dimension_key(row, dimension):
+        if dimension is None:
+            return "合計"
+        if dimension == "facility":
+            return row.facility_name or "未設定"
+        if dimension == "ota_name":
+            return row.ota_name or "直接予約"
+        return getattr(row, dimension) or "未設定"
+    
+    cells: Dict[Tuple[str, str], Dict[str, float]] = {}
+    for row in query.all():
+        key = (dimension_key(row, rows), dimension_key(row, columns))
+        cell = cells.setdefault(key, dict.fromkeys(CUBE_MEASURES, 0))
+        for measure in CUBE_MEASURES:
+            cell[measure] += getattr(row, measure) or 0
+    
+    row_keys = sorted({key[0] for key in cells})
+    column_keys = sorted({key[1] for key in cells})
+    
+    values = {}
+    row_totals = {}
+    column_totals = {}
+    totals = {}
+    for measure in CUBE_MEASURES:
+        matrix = [
+            [cells[(r, c)][measure] if (r, c) in cells else 0 for c in column_keys]
+            for r in row_keys
+        ]
+        values[measure] = matrix
+        row_totals[measure] = [sum(line) for line in matrix]
+        column_totals[measure] = [sum(column) for column in zip(*matrix)]
+        totals[measure] = sum(row_totals[measure])
+    
+    return {
+        "start_month": start_month,
+        "end_month": end_month,
+        "rows": rows,
+        "columns": columns,
+        "row_keys": row_keys,
+        "column_keys": column_keys,
+        "values": values,
+        "row_totals": row_totals,
+        "column_totals": column_totals,
+        "totals": totals
+    }
@@ -0,0 +1,127 @@
+"""売上・稼働率トレンド集計サービス
+
+宿泊日テーブルから期間内の全泊を1クエリで取得し、pandasで期間単位に集計する。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import and_
+from typing import Dict, Any, List
+from datetime import date
+import numpy as np
+import pandas as pd
+
+from ..models.property import Facility
+from ..models.reservation_night import ReservationNight
+
+# 集計単位とpandasの期間頻度の対応（週は月曜始まり）
+GRANULARITY_FREQ = {
+    "day": "D",
+    "week": "W-SUN",
+    "month": "M"
+}
+
+def _bucket_starts(dates: pd.Series, granularity: str) -> pd.Series:
+    """日付を集計単位の開始日に丸める"""
+    if granularity == "day":
+        return dates
+    return dates.dt.to_period(GRANULARITY_FREQ[granularity]).dt.start_time
+
+def _safe_divide(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """0除算を0として割り算"""
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+def _build_series(room_nights: np.ndarray, revenue: np.ndarray, available: np.ndarray) -> Dict[str, List]:
+    """延べ宿泊数・売上・販売可能室数から各指標の系列を作成"""
+    return {
+        "room_nights": room_nights.astype(int).tolist(),
+        "revenue": np.round(revenue, 0).tolist(),
+        "occupancy_rate": np.round(_safe_divide(room_nights, available) * 100, 1).tolist(),
+        "adr": np.round(_safe_divide(revenue, room_nights), 0).tolist(),
+        "revpar": np.round(_safe_divide(revenue, available), 0).tolist()
+    }
+
+def get_revenue_trend(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    granularity: str = "month"
+) -> Dict[str, Any]:
+    """期間内の売上・稼働率・ADR・RevPARの推移を施設別・全体で取得
+    
+    各系列は periods と同じ順序の配列で返す。
+    """
+    # 期間内の全日付と集計単位ごとの日数（期間の端で切り取る）
+    calendar = pd.Series(pd.date_range(start_date, end_date, freq="D"))
+    calendar_buckets = _bucket_starts(calendar, granularity)
+    days_per_period = calendar.groupby(calendar_buckets).size()
+    periods = days_per_period.index
+    days = days_per_period.to_numpy()
+    
+    # 期間内の全泊を取得
+    rows = db.query(
+        ReservationNight.facility_id,
+        ReservationNight.stay_date,
+        ReservationNight.revenue
+    ).filter(
+        and_(
+            ReservationNight.stay_date >= start_date,
+            ReservationNight.stay_date <= end_date
+        )
+    ).all()
+    nights = pd.DataFrame.from_records(rows, columns=["facility_id", "stay_date", "revenue"])
+    nights["stay_date"] = pd.to_datetime(nights["stay_date"])
+    nights["revenue"] = nights["revenue"].fillna(0).astype(float)
+    nights["period"] = _bucket_starts(nights["stay_date"], granularity)
+    
+    # 全体
+    overall = nights.groupby("period").agg(
+        room_nights=("revenue", "size"),
+        revenue=("revenue", "sum")
+    ).reindex(periods, fill_value=0)
+    
+    active_facilities = db.query(Facility.id, Facility.name, Facility.is_active).all()
+    inventory = sum(1 for f in active_facilities if f.is_active)
+    
+    # 施設別（稼働中の施設＋期間内に宿泊のある施設）
+    by_facility = nights.dropna(subset=["facility_id"]).groupby(["facility_id", "period"]).agg(
+        room_nights=("revenue", "size"),
+        revenue=("revenue", "sum")
+    )
+    facility_ids_with_nights = set(by_facility.index.get_level_values("facility_id").astype(int))
+    facilities = [
+        f for f in sorted(active_facilities, key=lambda f: f.id)
+        if f.is_active or f.id in facility_ids_with_nights
+    ]
+    facility_index = [f.id for f in facilities]
+    
+    room_nights_matrix = by_facility["room_nights"].unstack("period").reindex(
+        index=facility_index, columns=periods, fill_value=0
+    ).fillna(0).to_numpy()
+    revenue_matrix = by_facility["revenue"].unstack("period").reindex(
+        index=facility_index, columns=periods, fill_value=0
+    ).fillna(0).to_numpy()
+    
+    facility_series = []
+    for i, facility in enumerate(facilities):
+        facility_series.append({
+            "facility_id": facility.id,
+            "facility_name": facility.name,
+            **_build_series(room_nights_matrix[i], revenue_matrix[i], days)
+        })
+    
+    return {
+        "from": start_date.isoformat(),
+        "to": end_date.isoformat(),
+        "granularity": granularity,
+        "periods": [p.date().isoformat() for p in periods],
+        "days": days.astype(int).tolist(),
+        "room_inventory": inventory,
+        "overall": _build_series(
+            overall["room_nights"].to_numpy(),
+            overall["revenue"].to_numpy(),
+            days * inventory
+        ),
+        "facilities": facility_series
+    }
@@ -0,0 +1,283 @@
+"""スタッフの稼働時間・出勤可能日キャッシュ
+
+Staff.available_schedule（曜日ごとの開始・終了時刻のJSON）を週の分（月曜0:00からの分数）の
+区間に変換し、月別の出勤可能日（StaffAvailability のビットマスク）とあわせてスタッフごとにメモリに保持する。
+preload は読み込んだ内容のスナップショットを返し、その is_available 等はクエリなしで繰り返し呼び出せる。
+スタッフ・出勤可能日の変更がコミットされたら、そのスタッフの分を次回の preload で読み直す。
+"""
+
+from sqlalchemy.orm import Session
+from sqlalchemy import event, and_
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
+from datetime import date, datetime, time
+from bisect import bisect_right
+from itertools import chain
+import threading
+
+from ..models.cleaning import Staff
+from ..models.staff_availability import StaffAvailability, ALL_DAYS_MASK
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+MINUTES_PER_DAY = 24 * 60
+
+# コミット待ちの変更を記録するセッション情報のキー
+_CHANGED_STAFF_KEY = "staff_schedule_changed"
+
+def _parse_time(value: Optional[str]) -> Optional[time]:
+    try:
+        return datetime.strptime(value[:5], "%H:%M").time()
+    except (TypeError, ValueError):
+        return None
+
+def _minute_of_day(value: time) -> int:
+    return value.hour * 60 + value.minute
+
+class WeeklySchedule:
+    """週の稼働区間（月曜0:00からの分数の [開始, 終了) を昇順に並べたもの）"""
+
+    __slots__ = ("starts", "ends", "minutes_by_weekday")
+
+    def __init__(self, intervals: List[Tuple[int, int]]):
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+        self.minutes_by_weekday = [0] * 7
+        for start, end in intervals:
+            self.minutes_by_weekday[start // MINUTES_PER_DAY] += end - start
+
+    def covers(self, start: int, end: int) -> bool:
+        """週の分 [start, end) が1つの稼働区間に収まるか"""
+        i = bisect_right(self.starts, start) - 1
+        return i >= 0 and end <= self.ends[i]
+
+def compile_weekly_schedule(schedule: Optional[Dict[str, Any]]) -> Optional[WeeklySchedule]:
+    """稼働時間（曜日ごとの開始・終了時刻）を週の稼働区間に変換
+
+    終了が開始以前の曜日や時刻が読めない曜日は稼働なしとして扱う。
+
+    Returns:
+        週の稼働区間。どの曜日も登録がなければNone（制限なし）
+    """
+    intervals = []
+    for weekday, name in enumerate(WEEKDAYS):
+        hours = (schedule or {}).get(name) or {}
+        start = _parse_time(hours.get("start"))
+        end = _parse_time(hours.get("end"))
+        if start is None or end is None or end <= start:
+            continue
+        offset = weekday * MINUTES_PER_DAY
+        intervals.append((offset + _minute_of_day(start), offset + _minute_of_day(end)))
+    if not intervals:
+        return None
+    return WeeklySchedule(intervals)
+
+def work_minutes_by_weekday(schedule: Optional[Dict[str, Any]]) -> Optional[List[int]]:
+    """稼働時間から曜日ごとの稼働分数を算出
+
+    Returns:
+        月曜始まりの稼働分数（時刻の登録がない曜日は0）。どの曜日も登録がなければNone（制限なし）
+    """
+    compiled = compile_weekly_schedule(schedule)
+    return list(compiled.minutes_by_weekday) if compiled else None
+
+def _months(start_date: date, end_date: date) -> List[Tuple[int, int]]:
+    months = []
+    year, month = start_date.year, start_date.month
+    while (year, month) <= (end_date.year, end_date.month):
+        months.append((year, month))
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return months
+
+class StaffSchedules:
+    """preload 時点のスタッフの稼働区間と出勤可能日（以後のキャッシュの無効化の影響を受けない）"""
+
+    __slots__ = ("_schedules", "_masks")
+
+    def __init__(
+        self,
+        schedules: Dict[int, Optional[WeeklySchedule]],
+        masks: Dict[Tuple[int, int, int], int]
+    ):
+        self._schedules = schedules
+        self._masks = masks
+
+    def is_day_available(self, staff_id: int, day: date) -> bool:
+        """出勤可能日として登録されているか"""
+        return bool(self._masks[(staff_id, day.year, day.month)] >> (day.day - 1) & 1)
+
+    def work_minutes(self, staff_id: int, day: date) -> Optional[int]:
+        """その日の稼働分数（稼働時間の登録がなければNone）"""
+        schedule = self._schedules[staff_id]
+        return None if schedule is None else schedule.minutes_by_weekday[day.weekday()]
+
+    def is_available(
+        self,
+        staff_id: int,
+        day: date,
+        start: Optional[time] = None,
+        end: Optional[time] = None
+    ) -> bool:
+        """その日（start〜end の時間帯）に稼働できるか
+
+        出勤不可の日でなく、稼働時間の登録がないか、その曜日の稼働区間に時間帯が収まる場合にTrue。
+        時間帯を省略した場合はその曜日に稼働時間があればTrue。
+        """
+        if not self.is_day_available(staff_id, day):
+            return False
+        schedule = self._schedules[staff_id]
+        if schedule is None:
+            return True
+        offset = day.weekday() * MINUTES_PER_DAY
+        if start is None or end is None:
+            return schedule.minutes_by_weekday[day.weekday()] > 0
+        return schedule.covers(offset + _minute_of_day(start), offset + _minute_of_day(end))
+
+class StaffScheduleCache:
+    """スタッフごとの週の稼働区間と月別の出勤可能日"""
+
+    def __init__(self):
+        self._schedules: Dict[int, Optional[WeeklySchedule]] = {}
+        self._masks: Dict[Tuple[int, int, int], int] = {}
+        # 無効化の世代（読み込み中に無効化されたスタッフの結果を書き戻さないため）
+        self._generation = 0
+        self._staff_generations: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def _staff_generation(self, staff_id: int) -> Tuple[int, int]:
+        return self._generation, self._staff_generations.get(staff_id, 0)
+
+    def invalidate(self, staff_ids: Optional[Iterable[int]] = None) -> None:
+        """スタッフの分を次回参照時に読み直す（staff_ids 省略時は全スタッフ）"""
+        with self._lock:
+            if staff_ids is None:
+                self._schedules.clear()
+                self._masks.clear()
+                self._generation += 1
+                return
+            ids = set(staff_ids)
+            for staff_id in ids:
+                self._schedules.pop(staff_id, None)
+                self._staff_generations[staff_id] = self._staff_generations.get(staff_id, 0) + 1
+            for key in [key for key in self._masks if key[0] in ids]:
+                del self._masks[key]
+
+    def preload(
+        self,
+        db: Session,
+        staff_ids: Iterable[int],
+        start_date: date,
+        end_date: date
+    ) -> StaffSchedules:
+        """スタッフの稼働区間と期間内の月の出勤可能日をまとめて読み込む（読み込み済みの分は除く）
+
+        読み込み中に無効化されたスタッフの分は古い内容の可能性があるため書き戻さず、読み直す。
+
+        Returns:
+            対象スタッフ・期間の内容のスナップショット（参照中に無効化されても欠けない）
+        """
+        ids = sorted(set(staff_ids))
+        months = _months(start_date, end_date)
+        while True:
+            with self._lock:
+                generations = {staff_id: self._staff_generation(staff_id) for staff_id in ids}
+                missing_schedules = [i for i in ids if i not in self._schedules]
+                missing_masks = {
+                    (staff_id, year, month)
+                    for staff_id in ids
+                    for year, month in months
+                    if (staff_id, year, month) not in self._masks
+                }
+                if not missing_schedules and not missing_masks:
+                    return StaffSchedules(
+                        {staff_id: self._schedules[staff_id] for staff_id in ids},
+                        {
+                            (staff_id, year, month): self._masks[(staff_id, year, month)]
+                            for staff_id in ids
+                            for year, month in months
+                        }
+                    )
+
+            schedules, masks = self._load(db, missing_schedules, missing_masks, months)
+
+            with self._lock:
+                for staff_id, schedule in schedules.items():
+                    if self._staff_generation(staff_id) == generations[staff_id]:
+                        self._schedules[staff_id] = schedule
+                for key, mask in masks.items():
+                    if self._staff_generation(key[0]) == generations[key[0]]:
+                        self._masks[key] = mask
+
+    def _load(
+        self,
+        db: Session,
+        staff_ids: List[int],
+        mask_keys: Set[Tuple[int, int, int]],
+        months: List[Tuple[int, int]]
+    ) -> Tuple[Dict[int, Optional[WeeklySchedule]], Dict[Tuple[int, int, int], int]]:
+        schedules = {staff_id: None for staff_id in staff_ids}
+        if staff_ids:
+            for staff_id, schedule in db.query(Staff.id, Staff.available_schedule).filter(
+                Staff.id.in_(staff_ids)
+            ).all():
+                schedules[staff_id] = compile_weekly_schedule(schedule)
+
+        # 登録のない月は全日出勤可能
+        masks = {key: ALL_DAYS_MASK for key in mask_keys}
+        if mask_keys:
+            first, last = months[0], months[-1]
+            for staff_id, year, month, available_days in db.query(
+                StaffAvailability.staff_id,
+                StaffAvailability.year,
+                StaffAvailability.month,
+                StaffAvailability.available_days
+            ).filter(
+                and_(
+                    StaffAvailability.staff_id.in_({key[0] for key in mask_keys}),
+                    StaffAvailability.year * 12 + StaffAvailability.month >= first[0] * 12 + first[1],
+                    StaffAvailability.year * 12 + StaffAvailability.month <= last[0] * 12 + last[1]
+                )
+            ).all():
+                if (staff_id, year, month) in masks:
+                    masks[(staff_id, year, month)] = available_days
+        return schedules, masks
+
+staff_schedule_cache = StaffScheduleCache()
+
+def is_available(
+    db: Session,
+    staff_id: int,
+    day: date,
+    start: Optional[time] = None,
+    end: Optional[time] = None
+) -> bool:
+    """スタッフがその日（start〜end の時間帯）に稼働できるか（キャッシュになければ読み込む）"""
+    schedules = staff_schedule_cache.preload(db, [staff_id], day, day)
+    return schedules.is_available(staff_id, day, start, end)
+
+def mark_staff_schedule_changed(db: Session, staff_ids: Iterable[int]) -> None:
+    """ORMを経由しない更新（一括UPDATE等）で変わったスタッフを記録し、コミット後にキャッシュから外す"""
+    db.info.setdefault(_CHANGED_STAFF_KEY, set()).update(staff_ids)
+
+@event.listens_for(Session, "before_flush")
+def _track_schedule_changes(session, flush_context, instances):
+    """スタッフ・出勤可能日の追加・変更・削除を記録"""
+    changed: Set[int] = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Staff):
+            if obj.id is not None:
+                changed.add(obj.id)
+        elif isinstance(obj, StaffAvailability):
+            if obj.staff_id is not None:
+                changed.add(obj.staff_id)
+    if changed:
+        session.info.setdefault(_CHANGED_STAFF_KEY, set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed_changes(session):
+    changed = session.info.pop(_CHANGED_STAFF_KEY, None)
+    if changed:
+        staff_schedule_cache.invalidate(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGED_STAFF_KEY, None)
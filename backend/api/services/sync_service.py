@@ -8,6 +8,9 @@ import logging
 
 from .simple_parser import SimpleCSVParser
 from .ota_detector import OTADetectorService
+from .reservation_changes import apply_reservation_changes
+from .booking_issues import detect_booking_issues
+from .cleaning_sync import CleaningSyncService
 from ..schemas import ReservationCreate, SyncLogCreate
 from .. import crud
 
@@ -45,6 +48,7 @@ class SyncService:
             "processed_rows": 0,
             "new_count": 0,
             "updated_count": 0,
+            "unchanged_count": 0,
             "error_count": 0,
             "errors": [],
             "detected_encoding": None,
@@ -80,6 +84,7 @@ class SyncService:
             enhanced_data = self._enhance_with_ota_detection(reservations_data)
             
             # 各予約データの処理
+            changed_ids = []
             for row_data in enhanced_data:
                 try:
                     process_result = self._process_reservation_data(
@@ -88,8 +93,12 @@ class SyncService:
                     
                     if process_result["action"] == "created":
                         result["new_count"] += 1
+                        changed_ids.append(process_result["id"])
                     elif process_result["action"] == "updated":
                         result["updated_count"] += 1
+                        changed_ids.append(process_result["id"])
+                    else:
+                        result["unchanged_count"] += 1
                     
                     result["processed_rows"] += 1
                     
@@ -98,6 +107,9 @@ class SyncService:
                     result["error_count"] += 1
                     result["errors"].append(f"予約ID {row_data.get('reservation_id', 'unknown')}: {str(e)}")
             
+            # 作成・更新分の派生データ（宿泊日テーブル等）をまとめて反映
+            apply_reservation_changes(db, changed_ids)
+            
             # コミット
             db.commit()
             
@@ -113,6 +125,23 @@ class SyncService:
             )
             
             result["success"] = True
+            
+            # 同期後の予約で重複・孤立泊を検出（失敗しても同期結果には影響させない）
+            try:
+                result["booking_issues"] = detect_booking_issues(db, sync_id=sync_id)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Booking issue detection failed: {str(e)}")
+            
+            # 同期で更新された予約を清掃タスクに反映（失敗しても同期結果には影響させない）
+            try:
+                cleaning_result = CleaningSyncService(db).sync_all_tasks(sync_id=sync_id)
+                result["cleaning_sync"] = cleaning_result["stats"]
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Cleaning task sync failed: {str(e)}")
+            
             logger.info(f"Sync completed: {result['new_count']} new, {result['updated_count']} updated, {result['error_count']} errors")
             
         except Exception as e:
@@ -172,6 +201,10 @@ class SyncService:
             row_data["check_in_date"] = datetime.fromisoformat(row_data["check_in_date"]).date()
         if row_data.get("check_out_date") and isinstance(row_data["check_out_date"], str):
             row_data["check_out_date"] = datetime.fromisoformat(row_data["check_out_date"]).date()
+        if row_data.get("cancel_date") and isinstance(row_data["cancel_date"], str):
+            row_data["cancel_date"] = datetime.fromisoformat(row_data["cancel_date"]).date()
+        if row_data.get("reservation_date") and isinstance(row_data["reservation_date"], str):
+            row_data["reservation_date"] = datetime.fromisoformat(row_data["reservation_date"])
         
         # 既存予約の確認
         existing = crud.get_reservation_by_reservation_id(
@@ -180,24 +213,31 @@ class SyncService:
         )
         
         if existing:
-            # 更新処理
-            for key, value in row_data.items():
-                if hasattr(existing, key):
-                    setattr(existing, key, value)
-            existing.facility_id = facility_id
+            # 内容が変わった項目だけ更新（変更がなければ更新日時も変えない）
+            changes = {
+                key: value for key, value in row_data.items()
+                if hasattr(existing, key) and getattr(existing, key) != value
+            }
+            if existing.facility_id != facility_id:
+                changes["facility_id"] = facility_id
+            if not changes:
+                return {"action": "unchanged", "reservation_id": row_data["reservation_id"], "id": existing.id}
+            
+            for key, value in changes.items():
+                setattr(existing, key, value)
             existing.sync_id = sync_id
             existing.updated_at = datetime.utcnow()
-            return {"action": "updated", "reservation_id": row_data["reservation_id"]}
+            return {"action": "updated", "reservation_id": row_data["reservation_id"], "id": existing.id}
         else:
             # 新規作成処理
             reservation_create = ReservationCreate(**row_data)
-            crud.create_reservation(
+            created = crud.add_reservation(
                 db,
                 reservation_create,
                 facility_id=facility_id,
                 sync_id=sync_id
             )
-            return {"action": "created", "reservation_id": row_data["reservation_id"]}
+            return {"action": "created", "reservation_id": row_data["reservation_id"], "id": created.id}
     
     def validate_csv_file(self, file_path: str) -> Dict[str, any]:
         """CSVファイルの検証"""
@@ -0,0 +1,71 @@
+"""
+清掃タスク自動割当のベンチマークスクリプト
+ランダムに生成したタスクとスタッフで割当問題を解き、所要時間を計測する（DBは使用しない）
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import argparse
+import random
+import time
+from api.services.cleaning_assignment import plan_day
+
+def generate(num_tasks: int, num_staff: int, num_facilities: int, capacity: int, seed: int):
+    rng = random.Random(seed)
+    facility_ids = list(range(1, num_facilities + 1))
+    tasks = [
+        {
+            "id": i,
+            "facility_id": rng.choice(facility_ids),
+            "priority": rng.randint(1, 5),
+            "preferred_staff_ids": {rng.randint(1, num_staff)}
+        }
+        for i in range(1, num_tasks + 1)
+    ]
+    resources = [
+        {
+            "type": "staff",
+            "id": i,
+            "name": f"スタッフ{i}",
+            "skill_level": rng.randint(1, 5),
+            "rate": rng.choice([3000, 3500, 4000]),
+            # 3割は全施設対応、残りは施設の2割に対応
+            "facilities": None if rng.random() < 0.3 else set(rng.sample(facility_ids, max(1, num_facilities // 5))),
+            "capacity": capacity,
+            "load": rng.randint(0, 1)
+        }
+        for i in range(1, num_staff + 1)
+    ]
+    return tasks, resources
+
+def main():
+    parser = argparse.ArgumentParser(description="清掃タスク自動割当のベンチマーク")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--staff", type=int, default=100)
+    parser.add_argument("--facilities", type=int, default=80)
+    parser.add_argument("--days", type=int, default=14, help="タスクを分散させる日数")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # 1日にすべてのタスクが集中する場合（受け持ち上限別）と、期間に分散する場合
+    scenarios = [(f"1日集中・上限{capacity}件", 1, capacity) for capacity in (1, 3, 5)]
+    scenarios.append((f"{args.days}日に分散・上限1件", args.days, 1))
+
+    for label, days, capacity in scenarios:
+        tasks, resources = generate(args.tasks, args.staff, args.facilities, capacity, args.seed)
+        started = time.perf_counter()
+        assigned = 0
+        for day in range(days):
+            day_tasks = tasks[day::days]
+            day_assignments, _ = plan_day(day_tasks, resources)
+            assigned += len(day_assignments)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        print(
+            f"{label}: タスク {args.tasks} 件 × スタッフ {args.staff} 人 → "
+            f"割当 {assigned} 件 / {elapsed_ms:.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""
+宿泊日ファクトテーブル（reservation_nights）再構築スクリプト
+既存の予約データから宿泊日単位の行を作り直し、OTA×施設×月の集計テーブル（revenue_cube）も再集計する
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.database import SessionLocal, engine
+from api.models import Base
+from api.services.reservation_nights import rebuild_all_reservation_nights
+from api.services.revenue_cube import rebuild_revenue_cube
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def main():
+    # テーブルがなければ作成
+    Base.metadata.create_all(bind=engine)
+    
+    db = SessionLocal()
+    try:
+        total = rebuild_all_reservation_nights(db)
+        cube_total = rebuild_revenue_cube(db)
+        db.commit()
+        logger.info(f"完了: {total} 行を作成しました（集計テーブル {cube_total} 行）")
+    except Exception as e:
+        db.rollback()
+        logger.error(f"再構築に失敗しました: {e}")
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""スタッフ月次統計（crud.get_staff_monthly_stats）のテスト
+
+一括取得版の集計結果が、以前のスタッフごとにクエリを発行する実装と一致することを確認する。
+"""
+
+import calendar
+import random
+from datetime import date, time
+
+import pytest
+from sqlalchemy import create_engine, func, and_
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from api.database import Base
+from api.models import Facility, Reservation
+from api.models.cleaning import (
+    Staff, StaffGroup, StaffGroupMember, CleaningTask, CleaningShift, ShiftStatus
+)
+from api.crud.cleaning import get_staff_monthly_stats
+
+YEAR, MONTH = 2026, 5
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+def legacy_staff_monthly_stats(db, year, month, cancelled_status="cancelled"):
+    """以前の実装（スタッフ・シフトごとにクエリを発行）
+
+    cancelled_status に ShiftStatus.CANCELLED を渡すとキャンセル除外の条件を修正した版になる。
+    以前の "cancelled" との比較は、列に保存される列挙名（CANCELLED）と一致せず常に真だった。
+    """
+    _, last_day = calendar.monthrange(year, month)
+    start_date = date(year, month, 1)
+    end_date = date(year, month, last_day)
+
+    stats = []
+    for staff in db.query(Staff).filter(Staff.is_active == True).all():
+        individual_shifts = db.query(CleaningShift).filter(
+            and_(
+                CleaningShift.staff_id == staff.id,
+                CleaningShift.assigned_date >= start_date,
+                CleaningShift.assigned_date <= end_date,
+                CleaningShift.status != cancelled_status
+            )
+        ).all()
+        group_shifts = db.query(CleaningShift).join(
+            StaffGroupMember,
+            and_(
+                CleaningShift.group_id == StaffGroupMember.group_id,
+                StaffGroupMember.staff_id == staff.id,
+                StaffGroupMember.left_date.is_(None)
+            )
+        ).filter(
+            and_(
+                CleaningShift.assigned_date >= start_date,
+                CleaningShift.assigned_date <= end_date,
+                CleaningShift.status != cancelled_status
+            )
+        ).all()
+
+        dates_worked = set()
+        individual_task_count = 0
+        group_task_count = 0
+        total_hours = 0.0
+        for shift in individual_shifts:
+            dates_worked.add(shift.assigned_date)
+            individual_task_count += 1
+            task = db.query(CleaningTask).filter(CleaningTask.id == shift.task_id).first()
+            if task:
+                total_hours += (task.estimated_duration_minutes or 300) / 60.0
+        for shift in group_shifts:
+            dates_worked.add(shift.assigned_date)
+            group_task_count += 1
+            task = db.query(CleaningTask).filter(CleaningTask.id == shift.task_id).first()
+            if task:
+                group_member_count = db.query(func.count(StaffGroupMember.id)).filter(
+                    and_(
+                        StaffGroupMember.group_id == shift.group_id,
+                        StaffGroupMember.left_date.is_(None)
+                    )
+                ).scalar() or 1
+                total_hours += ((task.estimated_duration_minutes or 300) / 60.0) / group_member_count
+
+        stats.append({
+            "staff_id": staff.id,
+            "staff_name": staff.name,
+            "year": year,
+            "month": month,
+            "working_days": len(dates_worked),
+            "total_tasks": individual_task_count + group_task_count,
+            "individual_tasks": individual_task_count,
+            "group_tasks": group_task_count,
+            "total_hours": round(total_hours, 1),
+            "dates_worked": sorted(dates_worked)
+        })
+
+    stats.sort(key=lambda x: x["working_days"], reverse=True)
+    return stats
+
+def _add_task(db, reservation, facility, minutes):
+    task = CleaningTask(
+        reservation_id=reservation.id,
+        facility_id=facility.id,
+        checkout_date=date(YEAR, MONTH, 1),
+        scheduled_date=date(YEAR, MONTH, 1),
+        estimated_duration_minutes=minutes
+    )
+    db.add(task)
+    db.flush()
+    return task
+
+def _add_shift(db, task_id, assigned_date, staff_id=None, group_id=None, status=ShiftStatus.SCHEDULED):
+    db.add(CleaningShift(
+        task_id=task_id,
+        assigned_date=assigned_date,
+        scheduled_start_time=time(11),
+        scheduled_end_time=time(16),
+        status=status,
+        staff_id=staff_id,
+        group_id=group_id
+    ))
+
+def _seed_base(db):
+    facility = Facility(name="Villa A")
+    db.add(facility)
+    db.flush()
+    reservation = Reservation(
+        reservation_id="R1",
+        check_in_date=date(YEAR, MONTH - 1, 30),
+        check_out_date=date(YEAR, MONTH, 1),
+        facility_id=facility.id
+    )
+    db.add(reservation)
+    db.flush()
+    return facility, reservation
+
+def _seed_random(db, seed, staff_count=40):
+    """個人・グループ・キャンセルのシフトを含むデータを作成"""
+    rng = random.Random(seed)
+    facility, reservation = _seed_base(db)
+
+    staff = [Staff(name=f"S{i}", is_active=rng.random() < 0.9) for i in range(staff_count)]
+    db.add_all(staff)
+    db.flush()
+    groups = [StaffGroup(name=f"G{i}") for i in range(staff_count // 6)]
+    db.add_all(groups)
+    db.flush()
+
+    for group in groups:
+        # 退出済みメンバー・重複所属を含める
+        for member in rng.sample(staff, rng.randint(0, 4)):
+            left_date = date(YEAR, 1, 1) if rng.random() < 0.2 else None
+            db.add(StaffGroupMember(group_id=group.id, staff_id=member.id, left_date=left_date))
+        if rng.random() < 0.2:
+            db.add(StaffGroupMember(group_id=group.id, staff_id=staff[0].id))
+
+    tasks = [
+        _add_task(db, reservation, facility, rng.choice([None, 45, 120, 200, 300]))
+        for _ in range(staff_count * 3)
+    ]
+
+    for _ in range(staff_count * 20):
+        assigned_date = date(YEAR, rng.choice([MONTH - 1, MONTH, MONTH, MONTH + 1]), rng.randint(1, 28))
+        kind = rng.random()
+        _add_shift(
+            db,
+            # タスクが存在しないシフトは作業時間に含めない
+            rng.choice(tasks).id if rng.random() < 0.95 else 999999,
+            assigned_date,
+            staff_id=rng.choice(staff).id if kind < 0.7 or kind > 0.95 else None,
+            group_id=rng.choice(groups).id if kind >= 0.7 else None,
+            status=rng.choice(list(ShiftStatus))
+        )
+    db.commit()
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_matches_legacy_implementation(db, seed):
+    _seed_random(db, seed)
+
+    expected = legacy_staff_monthly_stats(db, YEAR, MONTH, cancelled_status=ShiftStatus.CANCELLED)
+    assert get_staff_monthly_stats(db, YEAR, MONTH) == expected
+
+def test_matches_unmodified_legacy_without_cancellations(db):
+    _seed_random(db, 4)
+    db.query(CleaningShift).filter(CleaningShift.status == ShiftStatus.CANCELLED)\
+        .update({CleaningShift.status: ShiftStatus.COMPLETED})
+    db.commit()
+
+    assert get_staff_monthly_stats(db, YEAR, MONTH) == legacy_staff_monthly_stats(db, YEAR, MONTH)
+
+def test_cancelled_shifts_are_excluded(db):
+    facility, reservation = _seed_base(db)
+    staff = Staff(name="S", is_active=True)
+    db.add(staff)
+    db.flush()
+    task = _add_task(db, reservation, facility, 120)
+    _add_shift(db, task.id, date(YEAR, MONTH, 3), staff_id=staff.id)
+    _add_shift(db, task.id, date(YEAR, MONTH, 4), staff_id=staff.id, status=ShiftStatus.CANCELLED)
+    db.commit()
+
+    [stats] = get_staff_monthly_stats(db, YEAR, MONTH)
+    assert stats["individual_tasks"] == 1
+    assert stats["dates_worked"] == [date(YEAR, MONTH, 3)]
+    assert stats["total_hours"] == 2.0
+
+    # 以前の実装はキャンセル済みのシフトも数えていた
+    [legacy] = legacy_staff_monthly_stats(db, YEAR, MONTH)
+    assert legacy["individual_tasks"] == 2
+    assert legacy["total_hours"] == 4.0
+
+def test_group_hours_rounding_and_dates_order(db):
+    facility, reservation = _seed_base(db)
+    staff = [Staff(name=f"S{i}", is_active=True) for i in range(4)]
+    db.add_all(staff)
+    db.flush()
+    group = StaffGroup(name="G")
+    db.add(group)
+    db.flush()
+    for member in staff[:3]:
+        db.add(StaffGroupMember(group_id=group.id, staff_id=member.id))
+    # 退出済みのメンバーは按分の人数にも含めない
+    db.add(StaffGroupMember(group_id=group.id, staff_id=staff[3].id, left_date=date(YEAR, 1, 1)))
+
+    task = _add_task(db, reservation, facility, 100)
+    # 日付の逆順に登録し、個人とグループのシフトを混在させる
+    for day in (20, 11, 5, 2):
+        _add_shift(db, task.id, date(YEAR, MONTH, day), group_id=group.id)
+    _add_shift(db, task.id, date(YEAR, MONTH, 8), staff_id=staff[0].id)
+    db.commit()
+
+    stats = {row["staff_id"]: row for row in get_staff_monthly_stats(db, YEAR, MONTH)}
+    first = stats[staff[0].id]
+    assert first["dates_worked"] == [date(YEAR, MONTH, day) for day in (2, 5, 8, 11, 20)]
+    assert (first["individual_tasks"], first["group_tasks"]) == (1, 4)
+    # 100分 + 100分 × 4件 ÷ 3人 = 3.888… 時間
+    assert first["total_hours"] == 3.9
+    assert stats[staff[1].id]["total_hours"] == 2.2
+    assert stats[staff[3].id]["total_tasks"] == 0
+
+    expected = legacy_staff_monthly_stats(db, YEAR, MONTH, cancelled_status=ShiftStatus.CANCELLED)
+    assert get_staff_monthly_stats(db, YEAR, MONTH) == expected